@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import hashlib
+from fastapi import APIRouter, HTTPException, Depends, Header, Response, status
 from app.services.attendance_service import attendance_service
 from app.core.dependencies import get_current_user
 from pydantic import BaseModel
@@ -14,14 +15,33 @@ class FinishAttendanceSchema(BaseModel):
     - objective_data: Dados objetivos (sinais vitais, exames, observações clínicas)
     - assessment: Avaliação e diagnóstico
     - planning: Plano de tratamento e recomendações
+    
+    Idempotência:
+    - queue_entry_id: ID da entrada da fila em atendimento (opcional). Quando
+      informado, repetir a finalização retorna o registro já criado.
     """
     subjective: str
     objective_data: str
     assessment: str
     planning: str
+    queue_entry_id: str | None = None
+
+
+def _attendance_etag(entry: dict):
+    """
+    ETag do atendimento, derivado do id e do updated_at da entrada da fila.
+    Qualquer alteração na entrada (trigger update_queue_timestamp) gera um novo ETag.
+    """
+    version = f"{entry['id']}:{entry.get('updated_at')}"
+    return f'"{hashlib.sha1(version.encode()).hexdigest()}"'
+
 
 @router.get("/current")
-def get_current_attendance(user_id: str = Depends(get_current_user)):
+async def get_current_attendance(
+    response: Response,
+    user_id: str = Depends(get_current_user),
+    if_none_match: str | None = Header(None)
+):
     """
     Retorna o atendimento ativo do médico autenticado.
     
@@ -29,9 +49,13 @@ def get_current_attendance(user_id: str = Depends(get_current_user)):
     - Apenas médicos podem acessar este endpoint
     - Retorna o paciente que está sendo atendido no momento
     - Um médico pode ter apenas um atendimento ativo por vez
+    
+    GET condicional:
+    - A resposta traz o header ETag (baseado no updated_at da entrada da fila)
+    - Com If-None-Match igual ao ETag atual, retorna 304 sem corpo
     """
     try:
-        current = attendance_service.get_current_attendance(user_id)
+        current = await attendance_service.get_current_attendance(user_id)
 
         if not current:
             raise HTTPException(
@@ -39,8 +63,18 @@ def get_current_attendance(user_id: str = Depends(get_current_user)):
                 detail="Nenhum atendimento ativo no momento."
             )
 
+        etag = _attendance_etag(current)
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        # Atendimento não mudou desde a última consulta do cliente
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        response.headers.update(headers)
         return current
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -48,7 +82,7 @@ def get_current_attendance(user_id: str = Depends(get_current_user)):
         )
 
 @router.post("/finish")
-def finish_attendance(
+async def finish_attendance(
     data: FinishAttendanceSchema,
     user_id: str = Depends(get_current_user)
 ):
@@ -65,20 +99,21 @@ def finish_attendance(
     Processo:
     1. Valida se há atendimento ativo
     2. Cria registro médico com dados SOAP
-    3. Remove paciente da fila
-    4. Retorna registro criado
+    3. Remove paciente da fila (mesma transação do passo 2)
+    4. Retorna registro criado (ou o já existente, em retentativas)
     
     Args:
         data: Dados do atendimento em formato SOAP
         user_id: ID do médico (extraído do token JWT)
     """
     try:
-        finished = attendance_service.finish_attendance(
+        finished = await attendance_service.finish_attendance(
             doctor_id=user_id,
             subjective=data.subjective,
             objective_data=data.objective_data,
             assessment=data.assessment,
-            planning=data.planning
+            planning=data.planning,
+            queue_entry_id=data.queue_entry_id
         )
 
         return {
@@ -8,7 +8,7 @@ router = APIRouter(tags=["Usuário"], prefix="/user")
     summary="Obter informações básicas do usuário autenticado.",
     description="Esta rota valida o JWT fornecido pelo cliente Supabase e retorna o ID do usuário.",
 )
-def read_current_user(user_id: str = Depends(get_current_user)):
+async def read_current_user(user_id: str = Depends(get_current_user)):
     """
     Rota protegida. O 'user_id' é preenchido pela função 'get_current_user' se o token for válido.
     """
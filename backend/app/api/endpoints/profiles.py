@@ -1,18 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from app.core.dependencies import get_current_user
-from app.services.profile_service import profile_service
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from app.core.bulk_import import iter_rows
+from app.core.config import settings
+from app.core.dependencies import get_current_user, require_admin
+from app.core.pagination import next_cursor
+from app.core.responses import FastJSONResponse
+from app.services.profile_service import profile_service, PROFILE_SORT_COLUMN
 
 router = APIRouter(prefix="/profiles", tags=["Perfis"])
 
 @router.get("/")
-def get_all_profiles_endpoint():
+async def get_all_profiles_endpoint(
+    limit: int = Query(settings.LIST_DEFAULT_LIMIT, ge=1, le=settings.LIST_MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None
+):
     """
-    Retorna todos os perfis cadastrados no sistema.
+    Retorna uma página dos perfis cadastrados no sistema.
     Endpoint público (não requer autenticação) para visualização geral.
+    
+    Paginação:
+    - limit: tamanho da página
+    - cursor: valor do header X-Next-Cursor da resposta anterior
+    - fields: colunas desejadas, separadas por vírgula (ex: id,full_name,role)
+    - O header X-Next-Cursor só é enviado quando pode haver mais páginas
+    """
+    try:
+        all_profiles = await profile_service.get_all_profiles(
+            limit=limit,
+            cursor=cursor,
+            fields=fields
+        )
+
+        cursor_next = next_cursor(all_profiles, limit, PROFILE_SORT_COLUMN)
+        headers = {"X-Next-Cursor": cursor_next} if cursor_next else None
+
+        return FastJSONResponse(all_profiles, headers=headers)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    
+@router.post("/import")
+async def import_profiles(
+    request: Request,
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    user_id: str = Depends(require_admin)
+):
+    """
+    Importa perfis em lote (onboarding de clínicas).
+    
+    Regra de Negócio:
+    - Restrito a administradores
+    - Corpo da requisição: arquivo NDJSON ou CSV com as colunas do perfil
+      (id obrigatório; full_name, document_number, date_of_birth, gender,
+      mom_full_name, address, nationality, priority, role)
+    - O arquivo é lido em streaming e gravado em lotes (IMPORT_BATCH_SIZE)
+    - Linhas inválidas não interrompem a importação: retornadas no relatório
+      com o número da linha e o motivo
     """
     try:
-        all_profiles = profile_service.get_all_profiles()
-        return all_profiles
+        report = await profile_service.import_profiles(iter_rows(request.stream(), file_format))
+        return FastJSONResponse(report.as_dict())
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -20,7 +74,7 @@ def get_all_profiles_endpoint():
         )
     
 @router.get("/me")
-def get_my_profile(user_id: str = Depends(get_current_user)):
+async def get_my_profile(user_id: str = Depends(get_current_user)):
     """
     Retorna o perfil do usuário autenticado.
     
@@ -30,7 +84,7 @@ def get_my_profile(user_id: str = Depends(get_current_user)):
     - Perfil deve existir no banco de dados
     """
     try:
-        profile = profile_service.get_profile(user_id)
+        profile = await profile_service.get_profile(user_id)
 
         if not profile:
             raise HTTPException(
@@ -47,7 +101,7 @@ def get_my_profile(user_id: str = Depends(get_current_user)):
         )
     
 @router.get("/{profile_id}")
-def get_profile_by_id(profile_id: str):
+async def get_profile_by_id(profile_id: str):
     """
     Retorna um perfil específico por ID.
     
@@ -57,7 +111,7 @@ def get_profile_by_id(profile_id: str):
     - Utilizado para visualizar perfil de outros usuários (ex: médico vendo perfil do paciente)
     """
     try:
-        profile = profile_service.get_profile(profile_id)
+        profile = await profile_service.get_profile(profile_id)
 
         if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
@@ -1,26 +1,155 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+import asyncio
+import json
+from fastapi import APIRouter, HTTPException, Query, status, Depends, Request
+from fastapi.responses import StreamingResponse
+from app.core.bulk_import import iter_rows
+from app.core.config import settings
+from app.core.responses import FastJSONResponse
+from app.services.poll_hints import call_rate, poll_interval
+from app.services.queue_events import queue_events
+from app.services.queue_index import queue_index
 from app.services.queue_service import queue_service
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, get_stream_user, require_admin
 
 router = APIRouter(prefix="/queue", tags=["Fila"])
 
+
+async def _position_state(user_id: str):
+    """
+    Calcula o estado do paciente na fila.
+    Retorna status: "waiting" (com posição), "called" (sendo atendido), "not_in_queue"
+    """
+    position = await queue_service.get_position(user_id)
+
+    if position is not None:
+        return {"status": "waiting", "position": position}
+
+    if await queue_service.is_being_attended(user_id):
+        return {"status": "called"}
+
+    return {"status": "not_in_queue"}
+
+
+def _next_position_state(user_id: str, current: dict, event: dict):
+    """
+    Deriva o novo estado do paciente a partir de um evento da fila, usando
+    apenas o índice em memória (sem acesso ao banco).
+    
+    Returns:
+        Novo estado, ou None quando não é possível determiná-lo em memória
+        (ex: paciente saiu da fila sem evento próprio recebido, ou evento de
+        outro worker, ainda não refletido no índice deste)
+    """
+    if event.get("profile_id") == user_id:
+        if event.get("type") == "called":
+            return {"status": "called"}
+
+        if event.get("type") in ("cancel", "finished"):
+            return {"status": "not_in_queue"}
+
+    if event.get("remote"):
+        if event.get("profile_id") == user_id or current.get("status") == "waiting":
+            return None
+        return current
+
+    position = queue_index.position(user_id)
+
+    if position is not None:
+        return {"status": "waiting", "position": position}
+
+    if current.get("status") == "waiting":
+        return None
+
+    return current
+
+
+def _format_sse(event: str, data: dict):
+    """Formata uma mensagem no padrão Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _queue_stream(request: Request, user_id: str):
+    """
+    Gera o stream de eventos da fila para um cliente conectado.
+    
+    - "position": estado do paciente, enviado na conexão e sempre que mudar
+    - "queue": notificação de alteração da fila (tipo do evento e total aguardando),
+      usada pelos painéis dos médicos para atualizar a listagem
+    """
+    events = queue_events.subscribe()
+
+    try:
+        state = await _position_state(user_id)
+        yield _format_sse("position", state)
+
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(
+                    events.get(),
+                    timeout=settings.QUEUE_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # Mantém a conexão aberta através de proxies
+                yield ": keep-alive\n\n"
+
+                # Reaproveita o índice (recarregado por outras requisições) para
+                # refletir alterações feitas por outros workers
+                if queue_index.is_stale():
+                    continue
+                event = {}
+            else:
+                yield _format_sse("queue", {"type": event["type"], "waiting": len(queue_index)})
+
+            new_state = _next_position_state(user_id, state, event)
+
+            if new_state is None:
+                new_state = await _position_state(user_id)
+
+            if new_state != state:
+                state = new_state
+                yield _format_sse("position", state)
+
+    finally:
+        queue_events.unsubscribe(events)
+
 @router.get("/")
-def get_queue_endpoint():
+async def get_queue_endpoint():
     """
     Retorna toda a fila de atendimento.
     Endpoint público (não requer autenticação) para visualização geral.
     """
     try:
-        queue = queue_service.get_queue()
-        return queue
+        queue = await queue_service.get_queue()
+
+        return FastJSONResponse(queue)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
     
+@router.get("/ordered")
+async def get_ordered_queue_endpoint(user_id: str = Depends(get_current_user)):
+    """
+    Retorna a fila de espera já ordenada para o painel de médicos/admin.
+    
+    Regra de Negócio:
+    - Ordem de atendimento: prioritários primeiro, depois por horário de check-in
+    - Cada entrada traz rank (posição), wait_seconds (tempo de espera),
+      priority e o resumo do perfil do paciente (patient)
+    - Requer autenticação (expõe dados pessoais dos pacientes)
+    - Uma chamada substitui as consultas de posição/perfil por paciente
+    """
+    try:
+        return await queue_service.get_ordered_queue()
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @router.post("/checkin")
-def checkin_in_queue(user_id: str = Depends(get_current_user)):
+async def checkin_in_queue(user_id: str = Depends(get_current_user)):
     """
     Realiza check-in do paciente autenticado na fila.
     
@@ -30,7 +159,7 @@ def checkin_in_queue(user_id: str = Depends(get_current_user)):
     - Check-in registra automaticamente data/hora no timezone de Fortaleza
     """
     try:
-        result = queue_service.checkin_queue(user_id)
+        result = await queue_service.checkin_queue(user_id)
         return result
     except Exception as e:
         raise HTTPException(
@@ -39,7 +168,7 @@ def checkin_in_queue(user_id: str = Depends(get_current_user)):
         )
     
 @router.delete("/checkin")
-def cancel_checkin(user_id: str = Depends(get_current_user)):
+async def cancel_checkin(user_id: str = Depends(get_current_user)):
     """
     Cancela o check-in do paciente autenticado.
     
@@ -49,7 +178,7 @@ def cancel_checkin(user_id: str = Depends(get_current_user)):
     - Remove completamente a entrada da fila
     """
     try:
-        result = queue_service.cancel_checkin(user_id)
+        result = await queue_service.cancel_checkin(user_id)
 
         if not result:
             raise HTTPException(status_code=404, detail="Nenhum check-in encontrado para este usuário.")
@@ -62,8 +191,34 @@ def cancel_checkin(user_id: str = Depends(get_current_user)):
             detail=str(e)
         )
     
+@router.post("/import")
+async def import_checkins(
+    request: Request,
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    user_id: str = Depends(require_admin)
+):
+    """
+    Importa check-ins pré-agendados em lote (ex: consultas do dia).
+    
+    Regra de Negócio:
+    - Restrito a administradores
+    - Corpo da requisição: arquivo NDJSON ou CSV com as colunas profile_id
+      (obrigatória) e checkin (opcional, ISO 8601)
+    - O arquivo é lido em streaming e gravado em lotes (IMPORT_BATCH_SIZE)
+    - Linhas inválidas não interrompem a importação: retornadas no relatório
+      com o número da linha e o motivo
+    """
+    try:
+        report = await queue_service.import_checkins(iter_rows(request.stream(), file_format))
+        return FastJSONResponse(report.as_dict())
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @router.get("/position")
-def get_my_position(user_id: str = Depends(get_current_user)):
+async def get_my_position(user_id: str = Depends(get_current_user)):
     """
     Retorna a posição atual do paciente na fila.
     
@@ -71,17 +226,20 @@ def get_my_position(user_id: str = Depends(get_current_user)):
     - Posição considera priorização (pacientes prioritários primeiro)
     - Dentro de cada grupo, ordenação é por horário de check-in
     - Retorna status: "waiting" (com posição), "called" (sendo atendido), "not_in_queue"
+    
+    Polling adaptativo:
+    - poll_interval_seconds (e header X-Poll-Interval): quando consultar novamente,
+      calculado pela posição e pelo ritmo recente de chamadas; pacientes no fim
+      da fila consultam raramente, os próximos a serem chamados com frequência
     """
     try:
-        position = queue_service.get_position(user_id)
+        state = await _position_state(user_id)
+        interval = poll_interval(state.get("position"), await call_rate.per_second())
 
-        if position is not None:
-            return {"status": "waiting", "position": position}
-
-        if queue_service.is_being_attended(user_id):
-            return {"status": "called"}
-
-        return {"status": "not_in_queue"}
+        return FastJSONResponse(
+            {**state, "poll_interval_seconds": interval},
+            headers={"X-Poll-Interval": str(interval)}
+        )
 
     except Exception as e:
         raise HTTPException(
@@ -89,8 +247,29 @@ def get_my_position(user_id: str = Depends(get_current_user)):
             detail=str(e)
         )
     
+@router.get("/stream")
+async def stream_queue_updates(request: Request, user_id: str = Depends(get_stream_user)):
+    """
+    Stream (Server-Sent Events) de atualizações da fila para o usuário autenticado.
+    
+    Autenticação: header Authorization ou parâmetro access_token (EventSource
+    do navegador não envia headers)
+    
+    Regra de Negócio:
+    - Substitui o polling de /queue/position: a posição é enviada na conexão e
+      sempre que check-in, cancelamento, chamada ou finalização alterarem a fila
+    - Paciente recebe status "called" assim que for chamado por um médico
+    - Médicos recebem eventos "queue" para atualizar o painel apenas quando a fila muda
+    - A carga cresce com o número de eventos da fila, não com a frequência de polling
+    """
+    return StreamingResponse(
+        _queue_stream(request, user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.post("/next")
-def call_next(doctor_id: str = Depends(get_current_user)):
+async def call_next(doctor_id: str = Depends(get_current_user)):
     """
     Chama o próximo paciente da fila para atendimento.
     
@@ -107,7 +286,7 @@ def call_next(doctor_id: str = Depends(get_current_user)):
         - {"message": "Próximo paciente chamado.", "called": ...} se chamou novo paciente
     """
     try:
-        result = queue_service.advance_queue(doctor_id)
+        result = await queue_service.advance_queue(doctor_id)
 
         if not result:
             return {"message": "A fila está vazia."}
@@ -1,25 +1,215 @@
-from fastapi import APIRouter, Depends, HTTPException
-from app.services.record_medical_service import MedicalRecordService
-from app.core.dependencies import get_current_user
+import csv
+import io
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.pagination import next_cursor
+from app.core.record_archive import ArchiveInProgress
+from app.core.responses import FastJSONResponse, json_bytes
+from app.services.record_medical_service import MedicalRecordService, RECORD_SORT_COLUMN
+from app.core.dependencies import get_current_user, require_admin, require_role
 
 router = APIRouter(prefix="/records", tags=["Medical Records"])
 
+# Formatos de exportação: media type e extensão do arquivo
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+async def _ndjson_lines(pages):
+    """Serializa cada registro como uma linha JSON."""
+    async for page in pages:
+        yield b"".join(json_bytes(record) + b"\n" for record in page)
+
+
+async def _csv_lines(pages, columns: list):
+    """Serializa os registros em CSV, com cabeçalho na primeira linha."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+
+    async for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    # Exportação vazia: apenas o cabeçalho
+    if buffer.tell():
+        yield buffer.getvalue()
+
 
 @router.get("/")
-def list_all_records():
+async def list_all_records(
+    limit: int = Query(settings.LIST_DEFAULT_LIMIT, ge=1, le=settings.LIST_MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None,
+    doctor_id: str | None = None,
+    patient_id: str | None = None,
+    started_from: datetime | None = None,
+    started_to: datetime | None = None,
+    finished: bool | None = None
+):
     """
-    Lista todos os registros médicos do sistema.
+    Lista os registros médicos do sistema, paginados.
     
     Regra de Negócio:
     - Endpoint público (não requer autenticação)
-    - Retorna todos os registros ordenados por data de início
+    - Retorna os registros ordenados por data de início
     - Utilizado para visualização geral (ex: dashboard de admin)
+    
+    Paginação:
+    - limit: tamanho da página
+    - cursor: valor do header X-Next-Cursor da resposta anterior
+    - fields: colunas desejadas (ex: id,patient_id,started_at), permitindo
+      omitir os campos SOAP em listagens
+    
+    Filtros (aplicados no banco):
+    - doctor_id / patient_id
+    - started_from (inclusivo) / started_to (exclusivo): intervalo de início
+    - finished: true = finalizados (end_at preenchido), false = em aberto
+    """
+    service = MedicalRecordService()
+
+    try:
+        records = await service.list_all(
+            limit=limit,
+            cursor=cursor,
+            fields=fields,
+            doctor_id=doctor_id,
+            patient_id=patient_id,
+            started_from=started_from,
+            started_to=started_to,
+            finished=finished
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cursor_next = next_cursor(records, limit, RECORD_SORT_COLUMN)
+    headers = {"X-Next-Cursor": cursor_next} if cursor_next else None
+
+    return FastJSONResponse(records, headers=headers)
+
+@router.get("/export")
+async def export_records(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    doctor_id: str | None = None,
+    started_from: datetime | None = None,
+    started_to: datetime | None = None,
+    fields: str | None = None,
+    patient_id: str | None = None,
+    finished: bool | None = None,
+    user_id: str = Depends(require_admin)
+):
+    """
+    Exporta os registros médicos em stream (NDJSON ou CSV), para relatórios.
+    
+    Regra de Negócio:
+    - Restrito a administradores (exporta registros de todos os pacientes)
+    - Registros ordenados por data de início, lidos do banco em páginas
+      (EXPORT_CHUNK_SIZE): a memória usada é constante, independente do volume
+    - Filtros: os mesmos da listagem (doctor_id, patient_id, started_from,
+      started_to, finished)
+    - fields: colunas desejadas (ex: id,patient_id,started_at)
+    """
+    service = MedicalRecordService()
+
+    try:
+        columns, pages = service.iter_records(
+            doctor_id=doctor_id,
+            started_from=started_from,
+            started_to=started_to,
+            fields=fields,
+            patient_id=patient_id,
+            finished=finished
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    media_type, extension = EXPORT_FORMATS[file_format]
+
+    if file_format == "csv":
+        body = _csv_lines(pages, columns)
+    else:
+        body = _ndjson_lines(pages)
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="records.{extension}"'}
+    )
+
+@router.post("/archive")
+async def archive_records(
+    before: datetime | None = None,
+    user_id: str = Depends(require_admin)
+):
+    """
+    Move os registros médicos antigos para o arquivo frio (Parquet por mês).
+    
+    Regra de Negócio:
+    - Restrito a administradores (executado periodicamente, ex: cron)
+    - Arquiva os registros finalizados iniciados antes de "before"
+      (padrão: ARCHIVE_HORIZON_DAYS dias atrás)
+    - Registros arquivados continuam disponíveis em /records/{id} e
+      /records/by_patient/{patient_id}
+    - Retorna 503 se o arquivamento não estiver configurado (ARCHIVE_DIR)
+    - Retorna 409 se outro arquivamento estiver em execução
+    """
+    service = MedicalRecordService()
+    try:
+        return await service.archive_old_records(before=before)
+    except ArchiveInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/search")
+async def search_records(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(settings.SEARCH_DEFAULT_LIMIT, ge=1, le=settings.SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    doctor_id: str | None = None,
+    patient_id: str | None = None,
+    user_id: str = Depends(require_role("doctor", "admin"))
+):
+    """
+    Busca registros médicos por texto nos campos SOAP (ex: sintoma, diagnóstico).
+    
+    Regra de Negócio:
+    - Restrito a médicos e administradores (retorna 403 para pacientes)
+    - Resultados ordenados por relevância, com trecho (snippet) destacando os termos
+    - Filtros opcionais: doctor_id, patient_id
+    
+    Paginação:
+    - limit / offset
+    - Header X-Next-Offset: presente quando pode haver uma próxima página
     """
     service = MedicalRecordService()
-    return service.list_all()
+
+    try:
+        hits = await service.search(
+            q,
+            limit=limit,
+            offset=offset,
+            doctor_id=doctor_id,
+            patient_id=patient_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {"X-Next-Offset": str(offset + limit)} if len(hits) == limit else None
+    return FastJSONResponse(hits, headers=headers)
 
 @router.get("/me")
-def list_my_records(user_id: str = Depends(get_current_user)):
+async def list_my_records(user_id: str = Depends(get_current_user)):
     """
     Lista os registros médicos do usuário autenticado.
     
@@ -29,10 +219,10 @@ def list_my_records(user_id: str = Depends(get_current_user)):
     - Utilizado para pacientes visualizarem seu próprio histórico médico
     """
     service = MedicalRecordService()
-    return service.list_by_profile(user_id)
+    return await service.list_by_profile(user_id)
 
 @router.get("/by_patient/{patient_id}")
-def list_records_by_patient(patient_id: str):
+async def list_records_by_patient(patient_id: str):
     """
     Lista os registros médicos de um paciente específico.
     
@@ -43,13 +233,29 @@ def list_records_by_patient(patient_id: str):
     """
     service = MedicalRecordService()
     try:
-        records = service.list_by_profile(patient_id)
+        records = await service.list_by_profile(patient_id)
         return records
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/by_patient/{patient_id}/summary")
+async def get_patient_summary(patient_id: str):
+    """
+    Retorna o resumo do histórico de um paciente.
+    
+    Regra de Negócio:
+    - Endpoint público (não requer autenticação), como a listagem por paciente
+    - Quantidade de atendimentos, primeira/última visita, duração média e
+      última avaliação, sem transferir o histórico completo
+    """
+    service = MedicalRecordService()
+    try:
+        return await service.get_patient_summary(patient_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/{record_id}")
-def get_record(record_id: str):
+async def get_record(record_id: str):
     """
     Retorna um registro médico específico por ID.
     
@@ -60,7 +266,7 @@ def get_record(record_id: str):
     - Inclui todos os dados SOAP (Subjective, Objective, Assessment, Planning)
     """
     service = MedicalRecordService()
-    record = service.get_by_id(record_id)
+    record = await service.get_by_id(record_id)
 
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
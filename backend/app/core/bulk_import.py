@@ -0,0 +1,264 @@
+"""
+Importação em lote (NDJSON ou CSV), lida em streaming.
+
+Utilizada pelos endpoints administrativos de importação de perfis e de
+check-ins pré-agendados: o arquivo é lido em partes à medida que chega, cada
+linha é validada e as linhas válidas são gravadas em lotes (uma inserção por
+lote, não uma requisição por linha).
+
+Regras:
+- NDJSON: um objeto JSON por linha; linhas em branco são ignoradas
+- CSV: a primeira linha é o cabeçalho; valores vazios viram null; campos
+  entre aspas podem conter quebras de linha
+- Uma linha inválida não interrompe a importação: o erro é registrado no
+  relatório (número da linha no arquivo + motivo) e as demais seguem
+- Lote rejeitado pelo banco (ex: chave duplicada, FK inexistente): as linhas
+  do lote são regravadas uma a uma, para identificar quais falharam
+- O relatório lista no máximo max_errors erros (o total é sempre informado)
+"""
+import codecs
+import csv
+import json
+import uuid
+from postgrest.exceptions import APIError
+
+# Formatos aceitos na importação
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+async def _iter_lines(chunks):
+    """Linhas de texto (UTF-8) a partir das partes do corpo da requisição."""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.removesuffix("\r")
+
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.removesuffix("\r")
+
+
+async def _iter_ndjson(chunks):
+    line_number = 0
+
+    async for line in _iter_lines(chunks):
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"JSON inválido: {e}"
+            continue
+
+        if not isinstance(row, dict):
+            yield line_number, None, "A linha deve conter um objeto JSON"
+            continue
+
+        yield line_number, row, None
+
+
+async def _iter_csv(chunks):
+    header = None
+    record, record_line, line_number = [], 0, 0
+
+    async for line in _iter_lines(chunks):
+        line_number += 1
+        if not record:
+            record_line = line_number
+        record.append(line)
+
+        # Aspas abertas: o campo continua na próxima linha
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            continue
+        record = []
+
+        if not text.strip():
+            continue
+
+        values = next(csv.reader([text]))
+
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+
+        if len(values) != len(header):
+            yield record_line, None, f"Esperadas {len(header)} colunas, encontradas {len(values)}"
+            continue
+
+        yield record_line, {
+            name: value if value != "" else None
+            for name, value in zip(header, values)
+        }, None
+
+    if record:
+        yield record_line, None, "Aspas não fechadas até o fim do arquivo"
+
+
+def iter_rows(chunks, file_format: str):
+    """
+    Linhas do arquivo, na ordem em que chegam.
+
+    Args:
+        chunks: Partes do corpo da requisição (iterável assíncrono de bytes)
+        file_format: "ndjson" ou "csv"
+
+    Returns:
+        Iterável assíncrono de (número da linha, linha, erro): linha é um dict
+        (None se não pôde ser lida) e erro o motivo (None se lida)
+
+    Raises:
+        ValueError: Se o formato não for suportado
+    """
+    if file_format == "ndjson":
+        return _iter_ndjson(chunks)
+    if file_format == "csv":
+        return _iter_csv(chunks)
+
+    raise ValueError(f"Formato de importação inválido: {file_format}. Use: {', '.join(IMPORT_FORMATS)}")
+
+
+def check_columns(row: dict, allowed):
+    """Rejeita colunas que não podem ser importadas."""
+    unknown = sorted(set(row) - set(allowed))
+    if unknown:
+        raise ValueError(f"Colunas desconhecidas: {', '.join(unknown)}")
+
+
+def parse_uuid(value, column: str):
+    """UUID obrigatório, normalizado (minúsculas, com hífens)."""
+    if value is None:
+        raise ValueError(f"{column} é obrigatório")
+
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValueError(f"{column} inválido: {value}")
+
+
+def parse_bool(value):
+    """Booleano de NDJSON (true/false) ou CSV ("true", "1", "sim"...)."""
+    if value is None or isinstance(value, bool):
+        return value
+
+    text = str(value).strip().lower()
+    if text in ("true", "t", "1", "sim", "s", "yes", "y"):
+        return True
+    if text in ("false", "f", "0", "nao", "não", "n", "no"):
+        return False
+
+    raise ValueError(f"Valor booleano inválido: {value}")
+
+
+class ImportReport:
+    """
+    Resultado da importação: linhas recebidas, importadas e erros por linha.
+
+    Args:
+        max_errors: Quantidade máxima de erros listados
+    """
+    def __init__(self, max_errors: int = 1000):
+        self.max_errors = max_errors
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": error})
+
+    def as_dict(self):
+        return {
+            "received": self.received,
+            "imported": self.imported,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+async def import_rows(rows, validate, write, batch_size: int = 500, max_errors: int = 1000):
+    """
+    Valida as linhas e as grava em lotes.
+
+    Args:
+        rows: Linhas do arquivo (iter_rows)
+        validate: Função que recebe a linha e retorna os valores a gravar
+            (ValueError com o motivo se inválida)
+        write: Função assíncrona que grava um lote e retorna, para cada linha,
+            o erro (str) ou None se gravada
+        batch_size: Linhas por lote gravado
+        max_errors: Quantidade máxima de erros listados no relatório
+
+    Returns:
+        ImportReport
+    """
+    report = ImportReport(max_errors)
+    batch = []
+
+    async def flush():
+        errors = await write([values for _, values in batch])
+        for (line, _), error in zip(batch, errors):
+            if error is None:
+                report.imported += 1
+            else:
+                report.fail(line, error)
+        batch.clear()
+
+    async for line, row, error in rows:
+        report.received += 1
+
+        if error is None:
+            try:
+                batch.append((line, validate(row)))
+            except ValueError as e:
+                error = str(e)
+
+        if error is not None:
+            report.fail(line, error)
+            continue
+
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+
+    return report
+
+
+async def insert_batch(table, rows: list):
+    """
+    Insere as linhas em uma única requisição; se o banco rejeitar o lote,
+    insere uma a uma para identificar as linhas com erro.
+
+    Returns:
+        (linhas inseridas, erro de cada linha da entrada ou None)
+    """
+    if not rows:
+        return [], []
+
+    try:
+        response = await table.insert(rows).execute()
+        return response.data or [], [None] * len(rows)
+    except APIError:
+        pass
+
+    inserted, errors = [], []
+    for row in rows:
+        try:
+            response = await table.insert(row).execute()
+            inserted.extend(response.data or [])
+            errors.append(None)
+        except APIError as e:
+            errors.append(e.message or str(e))
+
+    return inserted, errors
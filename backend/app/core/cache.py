@@ -0,0 +1,170 @@
+"""
+Cache em memória com expiração (TTL) e tamanho limitado.
+
+Utilizado para evitar chamadas repetidas a serviços externos (ex: Supabase)
+quando o dado muda raramente.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+# Marcador de ausência no cache (None pode ser um valor válido)
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache LRU com expiração por item.
+
+    Regras:
+    - Cada item expira após ttl_seconds (ou após o TTL informado no set)
+    - Ao atingir maxsize, o item menos recentemente usado é descartado
+    - Seguro para uso concorrente entre threads
+    - Contadores de acertos (hits) e faltas (misses) para monitoramento
+    """
+    def __init__(self, maxsize: int = 1024, ttl_seconds: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Retorna o valor em cache ou default se ausente/expirado."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl_seconds: float | None = None):
+        """Armazena um valor; ttl_seconds sobrescreve o TTL padrão."""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove um item do cache, se presente."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove todos os itens do cache."""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """Retorna tamanho atual, acertos, faltas e taxa de acerto do cache."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MicroCache:
+    """
+    Cache de curtíssima duração com agrupamento de leituras idênticas (single-flight).
+
+    Para leituras públicas consultadas em polling por várias telas ao mesmo
+    tempo (ex: fila, listagem de registros):
+    - Leituras idênticas simultâneas compartilham uma única ida ao banco
+    - O resultado é reaproveitado por ttl_seconds (ex: 1 s)
+    - Ao expirar, apenas uma requisição recarrega o valor; as demais aguardam
+      o mesmo carregamento (sem "stampede" no banco)
+    - invalidate() descarta o cache e faz com que leituras em andamento não
+      sejam armazenadas (usado após alterações, ex: check-in)
+
+    A carga sobre o banco passa a depender da quantidade de leituras distintas
+    por intervalo, não da quantidade de telas conectadas.
+
+    Regras:
+    - Valores são compartilhados entre requisições: não devem ser alterados
+    - O carregamento não é cancelado se a requisição que o iniciou for
+      cancelada (as demais continuam aguardando o resultado)
+    - Erros não são armazenados: são repassados às requisições que aguardavam
+    - ttl_seconds=0 desativa o cache, mantendo o agrupamento
+    """
+    def __init__(self, ttl_seconds: float = 1.0, maxsize: int = 256):
+        self.cache = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self._inflight = {}
+        self._generation = 0
+
+    async def get_or_load(self, key, loader):
+        """
+        Retorna o valor em cache ou o carrega com loader (função assíncrona),
+        compartilhando o carregamento com leituras simultâneas da mesma chave.
+        """
+        value = self.cache.get(key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        flight_key = (self._generation, key)
+        task = self._inflight.get(flight_key)
+
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(flight_key, key, loader))
+            task.add_done_callback(self._consume_error)
+            self._inflight[flight_key] = task
+        else:
+            self.hits += 1
+
+        return await asyncio.shield(task)
+
+    async def _load(self, flight_key, key, loader):
+        try:
+            value = await loader()
+            if flight_key[0] == self._generation:
+                self.cache.set(key, value)
+            return value
+        finally:
+            self._inflight.pop(flight_key, None)
+
+    @staticmethod
+    def _consume_error(task):
+        # Evita o aviso de exceção não lida quando nenhuma requisição aguardava
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate(self):
+        """Descarta os valores em cache e os carregamentos em andamento."""
+        self._generation += 1
+        self.cache.clear()
+
+    def stats(self):
+        """Acertos (cache ou carregamento compartilhado) e faltas (idas ao banco)."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,154 @@
+"""
+Compressão das respostas HTTP (Brotli ou GZip).
+
+Regras:
+- Brotli ("br") quando o cliente aceita e o pacote brotli está instalado;
+  caso contrário GZip, se aceito pelo cliente
+- Respostas menores que minimum_size não são comprimidas
+- Streams de eventos (text/event-stream) e conteúdos já comprimidos não são
+  alterados
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import brotli
+except ImportError:  # Dependência opcional: sem ela, apenas GZip
+    brotli = None
+
+# Conteúdos que não passam pelo Brotli (streams devem ser entregues sem buffer)
+EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+def _accepted_encodings(accept_encoding: str):
+    """Codificações aceitas pelo cliente (ignora as marcadas com q=0)."""
+    accepted = set()
+
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(name.strip().lower())
+
+    return accepted
+
+
+class BrotliResponder:
+    """
+    Aplica Brotli ao corpo da resposta (incluindo respostas em stream).
+
+    Responder ASGI independente: envolve o send da aplicação sem depender de
+    classes internas do Starlette.
+    """
+    def __init__(self, app, minimum_size: int, quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self._compressor = None
+        self._start_message = None
+        self._passthrough = False
+
+    async def __call__(self, scope, receive, send):
+        self._send = send
+        await self.app(scope, receive, self._send_compressed)
+
+    def _compress(self, body: bytes, more_body: bool) -> bytes:
+        if self._compressor is None:
+            self._compressor = brotli.Compressor(quality=self.quality)
+
+        data = self._compressor.process(body)
+        if more_body:
+            return data + self._compressor.flush()
+        return data + self._compressor.finish()
+
+    async def _send_compressed(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            # Já comprimida pela aplicação ou tipo excluído: repassa sem alterar
+            self._passthrough = (
+                "content-encoding" in headers
+                or headers.get("content-type", "").startswith(EXCLUDED_CONTENT_TYPES)
+            )
+            if self._passthrough:
+                await self._send(message)
+            else:
+                # Cabeçalhos só são enviados ao conhecer o primeiro corpo
+                self._start_message = message
+            return
+
+        if message_type != "http.response.body" or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._start_message is not None:
+            start, self._start_message = self._start_message, None
+
+            if not more_body and len(body) < self.minimum_size:
+                await self._send(start)
+                await self._send(message)
+                self._passthrough = True
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            headers["Content-Encoding"] = "br"
+            headers.add_vary_header("Accept-Encoding")
+            body = self._compress(body, more_body)
+
+            if more_body:
+                del headers["Content-Length"]
+            else:
+                headers["Content-Length"] = str(len(body))
+
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
+            return
+
+        await self._send({
+            "type": "http.response.body",
+            "body": self._compress(body, more_body),
+            "more_body": more_body,
+        })
+
+
+class CompressionMiddleware:
+    """
+    Middleware de compressão com negociação Brotli/GZip.
+
+    Brotli é aplicado pelo BrotliResponder; GZip é delegado ao GZipMiddleware
+    do Starlette (API pública).
+
+    Args:
+        minimum_size: Tamanho mínimo (bytes) para comprimir
+        gzip_level: Nível de compressão GZip (1-9)
+        brotli_quality: Qualidade Brotli (0-11); valores baixos priorizam CPU
+        use_brotli: Habilita Brotli quando disponível
+    """
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        use_brotli: bool = True,
+    ):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=gzip_level)
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.use_brotli = use_brotli and brotli is not None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.use_brotli:
+            accepted = _accepted_encodings(Headers(scope=scope).get("Accept-Encoding", ""))
+
+            if "br" in accepted:
+                responder = BrotliResponder(self.app, self.minimum_size, quality=self.brotli_quality)
+                await responder(scope, receive, send)
+                return
+
+        await self.gzip(scope, receive, send)
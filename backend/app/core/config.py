@@ -4,11 +4,17 @@ Configurações e inicialização do cliente Supabase.
 Este módulo é responsável por:
 - Carregar variáveis de ambiente
 - Configurar settings da aplicação
-- Inicializar cliente Supabase para acesso ao banco de dados
+- Inicializar cliente Supabase assíncrono para acesso ao banco de dados
+  (ou o backend local em memória, conforme STORAGE_BACKEND)
 """
+import httpx
 from pydantic_settings import BaseSettings
-from supabase import create_client, Client
+from supabase import AsyncClient, AsyncClientOptions
 from dotenv import load_dotenv
+from app.core.local_backend import LocalClient
+from app.core.metrics import on_backend_request, on_backend_response
+from app.core.record_archive import create_record_archive
+from app.core.shared_cache import create_shared_cache
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -24,20 +30,149 @@ class Settings(BaseSettings):
     Variáveis opcionais (têm valores padrão):
     - PROJECT_NAME: Nome do projeto
     - VERSION: Versão da aplicação
+    - QUEUE_INDEX_MAX_AGE_SECONDS: Tempo máximo (s) até o índice da fila em memória ser recarregado
+    - AUTH_MODE: "remote" (valida o token no Supabase Auth) ou "local" (valida a assinatura localmente)
+    - SUPABASE_JWT_SECRET: Segredo JWT do projeto (HS256), usado no modo "local"
+    - SUPABASE_JWKS_URL: Endpoint JWKS (padrão: <SUPABASE_URL>/auth/v1/.well-known/jwks.json)
+    - JWT_AUDIENCE: Audience esperada nos tokens
+    - JWKS_REFRESH_SECONDS: Intervalo de atualização das chaves do JWKS
+    - TOKEN_CACHE_TTL_SECONDS / TOKEN_CACHE_MAX_SIZE: Cache de tokens já validados
+    - QUEUE_STREAM_KEEPALIVE_SECONDS: Intervalo de keep-alive do stream da fila (/queue/stream)
+    - SUPABASE_MAX_CONNECTIONS: Máximo de conexões HTTP simultâneas com o Supabase
+    - SUPABASE_MAX_KEEPALIVE_CONNECTIONS: Conexões mantidas abertas (keep-alive) no pool
+    - SUPABASE_KEEPALIVE_EXPIRY_SECONDS: Tempo até uma conexão ociosa ser fechada
+    - SUPABASE_TIMEOUT_SECONDS: Timeout das requisições ao Supabase
+    - LIST_DEFAULT_LIMIT / LIST_MAX_LIMIT: Tamanho padrão e máximo das páginas de listagem
+    - PROFILE_CACHE_MAX_SIZE / PROFILE_CACHE_TTL_SECONDS: Cache de perfis em memória
+    - STORAGE_BACKEND: "supabase" (padrão) ou "memory" (backend local em memória,
+      sem rede, para testes de carga e execução offline; exige AUTH_MODE=local)
+    - REDIS_URL: Habilita o cache compartilhado entre workers (fila ordenada e prioridades)
+    - SHARED_CACHE_PREFIX / SHARED_CACHE_TTL_SECONDS: Prefixo das chaves e expiração do snapshot da fila
+    - COMPRESSION_MINIMUM_SIZE: Tamanho mínimo (bytes) para comprimir respostas
+    - GZIP_COMPRESS_LEVEL / BROTLI_QUALITY: Níveis de compressão (GZip 1-9, Brotli 0-11)
+    - COMPRESSION_USE_BROTLI: Usa Brotli quando o cliente aceita (requer o pacote brotli)
+    - EXPORT_CHUNK_SIZE: Registros lidos do banco por página na exportação (/records/export)
+    - SEARCH_DEFAULT_LIMIT / SEARCH_MAX_LIMIT: Tamanho padrão e máximo das páginas da busca textual
+    - STARTUP_TIMEOUT_SECONDS: Prazo para o banco (e o Redis) responderem na inicialização
+    - STARTUP_RETRY_SECONDS: Intervalo entre as tentativas de verificação na inicialização
+    - READ_CACHE_TTL_SECONDS: Micro-cache das leituras públicas em polling (/queue/, /records/);
+      0 desativa o cache, mantendo o agrupamento de leituras simultâneas
+    - POLL_MIN_SECONDS / POLL_MAX_SECONDS: Limites do intervalo de polling sugerido em /queue/position
+    - POLL_WAIT_FRACTION: Fração da espera estimada usada como intervalo de polling
+    - POLL_RATE_WINDOW_SECONDS: Janela do ritmo de chamadas de pacientes
+    - POLL_FALLBACK_CALLS_PER_MINUTE: Ritmo assumido quando não há chamadas na janela
+    - IMPORT_BATCH_SIZE: Linhas gravadas por inserção na importação em lote (/profiles/import, /queue/import)
+    - IMPORT_MAX_ERRORS: Quantidade máxima de erros listados no relatório da importação
+    - ARCHIVE_DIR: Diretório do arquivo frio dos registros médicos (Parquet por mês);
+      vazio desabilita o arquivamento (requer o pacote pyarrow)
+    - ARCHIVE_HORIZON_DAYS: Idade (dias) a partir da qual registros finalizados são arquivados
+    - ARCHIVE_BATCH_SIZE: Registros lidos e removidos do banco por lote no arquivamento
+    - ARCHIVE_COMPRESSION / ARCHIVE_ROW_GROUP_SIZE: Codec e tamanho dos row groups do Parquet
     """
     SUPABASE_URL: str
     SUPABASE_KEY: str
     PROJECT_NAME: str = "JCS Hospital"
     VERSION: str = "1.0.0"
+    QUEUE_INDEX_MAX_AGE_SECONDS: float = 30.0
+    AUTH_MODE: str = "remote"
+    SUPABASE_JWT_SECRET: str | None = None
+    SUPABASE_JWKS_URL: str | None = None
+    JWT_AUDIENCE: str = "authenticated"
+    JWKS_REFRESH_SECONDS: float = 600.0
+    TOKEN_CACHE_TTL_SECONDS: float = 60.0
+    TOKEN_CACHE_MAX_SIZE: int = 10000
+    QUEUE_STREAM_KEEPALIVE_SECONDS: float = 15.0
+    SUPABASE_MAX_CONNECTIONS: int = 100
+    SUPABASE_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SUPABASE_KEEPALIVE_EXPIRY_SECONDS: float = 30.0
+    SUPABASE_TIMEOUT_SECONDS: float = 30.0
+    LIST_DEFAULT_LIMIT: int = 100
+    LIST_MAX_LIMIT: int = 1000
+    PROFILE_CACHE_MAX_SIZE: int = 5000
+    PROFILE_CACHE_TTL_SECONDS: float = 300.0
+    STORAGE_BACKEND: str = "supabase"
+    REDIS_URL: str | None = None
+    SHARED_CACHE_PREFIX: str = "jcs"
+    SHARED_CACHE_TTL_SECONDS: float = 30.0
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 6
+    BROTLI_QUALITY: int = 4
+    COMPRESSION_USE_BROTLI: bool = True
+    EXPORT_CHUNK_SIZE: int = 500
+    SEARCH_DEFAULT_LIMIT: int = 20
+    SEARCH_MAX_LIMIT: int = 100
+    STARTUP_TIMEOUT_SECONDS: float = 30.0
+    STARTUP_RETRY_SECONDS: float = 1.0
+    READ_CACHE_TTL_SECONDS: float = 1.0
+    POLL_MIN_SECONDS: float = 5.0
+    POLL_MAX_SECONDS: float = 180.0
+    POLL_WAIT_FRACTION: float = 0.25
+    POLL_RATE_WINDOW_SECONDS: float = 900.0
+    POLL_FALLBACK_CALLS_PER_MINUTE: float = 1.0
+    IMPORT_BATCH_SIZE: int = 200
+    IMPORT_MAX_ERRORS: int = 1000
+    ARCHIVE_DIR: str | None = None
+    ARCHIVE_HORIZON_DAYS: int = 365
+    ARCHIVE_BATCH_SIZE: int = 1000
+    ARCHIVE_COMPRESSION: str = "zstd"
+    ARCHIVE_ROW_GROUP_SIZE: int = 1000
 
 # Instância global de configurações
 settings = Settings()
 
-# Inicialização do cliente Supabase
+# Pool de conexões HTTP compartilhado (keep-alive) entre PostgREST e Auth
+# Regra: Todas as requisições ao Supabase reutilizam as mesmas conexões
+# Hooks contam e medem cada ida ao Supabase na requisição em andamento (Server-Timing)
+http_client = httpx.AsyncClient(
+    http2=True,
+    follow_redirects=True,
+    timeout=settings.SUPABASE_TIMEOUT_SECONDS,
+    limits=httpx.Limits(
+        max_connections=settings.SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.SUPABASE_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY_SECONDS,
+    ),
+    event_hooks={
+        "request": [on_backend_request],
+        "response": [on_backend_response],
+    },
+)
+
+# Inicialização do cliente Supabase (assíncrono)
 # Cliente utilizado em todos os serviços para acesso ao banco de dados
 # Regra: Cliente deve ser inicializado apenas uma vez e reutilizado
+# Com STORAGE_BACKEND=memory, o mesmo papel é cumprido pelo LocalClient
+# (mesma API de table()/rpc(), sem acesso à rede)
+# A criação não acessa a rede (conexões são abertas sob demanda); a
+# conectividade é verificada no lifespan (main.py) antes de aceitar tráfego
 try:
-    supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    if settings.STORAGE_BACKEND == "memory":
+        supabase = LocalClient()
+    else:
+        supabase: AsyncClient = AsyncClient(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY,
+            AsyncClientOptions(httpx_client=http_client),
+        )
 except Exception as e:
-    # Erro crítico: aplicação não pode funcionar sem conexão com Supabase
-    print(f"Erro ao inicializar o cliente Supabase: {e}")
\ No newline at end of file
+    # Erro crítico: a aplicação não pode funcionar sem o cliente (falha imediata)
+    raise RuntimeError(f"Erro ao inicializar o cliente Supabase: {e}") from e
+
+# Cache compartilhado entre workers (Redis), opcional
+# Regra: None quando REDIS_URL não está configurado (cada worker usa apenas
+# o índice da fila e o cache de perfis em memória)
+shared_cache = create_shared_cache(
+    settings.REDIS_URL,
+    prefix=settings.SHARED_CACHE_PREFIX,
+    ttl_seconds=settings.SHARED_CACHE_TTL_SECONDS,
+    priority_ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS,
+)
+
+# Arquivo frio dos registros médicos (Parquet em disco local), opcional
+# Regra: None quando ARCHIVE_DIR não está configurado (todos os registros
+# permanecem na tabela RECORD_MEDICAL)
+record_archive = create_record_archive(
+    settings.ARCHIVE_DIR,
+    compression=settings.ARCHIVE_COMPRESSION,
+    row_group_size=settings.ARCHIVE_ROW_GROUP_SIZE,
+)
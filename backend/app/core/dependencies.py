@@ -1,7 +1,11 @@
-from fastapi import Header, HTTPException, status
-from .config import supabase
+from fastapi import Depends, Header, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from postgrest.exceptions import APIError
+from .config import settings, supabase
+from .security import get_jwt_verifier
+from app.services.profile_service import profile_service
 
-def get_current_user(authorization: str = Header(..., description="Bearer JWT do Supabase")) -> str:
+async def get_current_user(authorization: str = Header(..., description="Bearer JWT do Supabase")) -> str:
     """
     Valida o JWT com o Supabase e retorna o ID do usuário.
     
@@ -13,7 +17,9 @@ def get_current_user(authorization: str = Header(..., description="Bearer JWT do
     Fluxo de Autenticação:
     1. Extrai token do header Authorization
     2. Valida formato (deve ser "Bearer <token>")
-    3. Valida token com Supabase Auth
+    3. Valida token conforme settings.AUTH_MODE:
+       - "local": assinatura, exp, aud e sub verificados localmente (sem rede)
+       - "remote": token validado pelo Supabase Auth
     4. Retorna UUID do usuário se válido
     
     Args:
@@ -37,9 +43,19 @@ def get_current_user(authorization: str = Header(..., description="Bearer JWT do
     token = authorization.split(" ")[1]
 
     try:
-        # Valida o token com Supabase Auth
+        # Modo local: valida assinatura e claims sem chamada de rede
+        if settings.AUTH_MODE == "local":
+            verifier = get_jwt_verifier()
+
+            # Busca de chaves no JWKS é bloqueante (rede): executa fora do event loop
+            if verifier.uses_jwks:
+                return await run_in_threadpool(verifier.verify, token)
+
+            return verifier.verify(token)
+
+        # Modo remoto: valida o token com Supabase Auth
         # Se válido, retorna os dados do usuário incluindo o ID
-        user_response = supabase.auth.get_user(token)
+        user_response = await supabase.auth.get_user(token)
         return user_response.user.id
         
     except Exception as e:
@@ -47,4 +63,81 @@ def get_current_user(authorization: str = Header(..., description="Bearer JWT do
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail=f"Token inválido ou expirado. Detalhe: {e}",
-        )
\ No newline at end of file
+        )
+
+
+async def get_stream_user(
+    authorization: str | None = Header(None, description="Bearer JWT do Supabase"),
+    access_token: str | None = Query(None, description="JWT do Supabase (clientes EventSource)"),
+) -> str:
+    """
+    Autenticação das conexões de stream (Server-Sent Events).
+    
+    Regra de Segurança:
+    - O EventSource do navegador não envia headers personalizados: o mesmo JWT
+      do Supabase (curta duração, renovado pelo cliente) pode ser enviado no
+      parâmetro access_token
+    - O header Authorization, quando presente, tem precedência
+    - O token passa pela mesma validação de get_current_user
+    
+    Raises:
+        HTTPException 401: Se token inválido, ausente ou expirado
+    """
+    if not authorization and access_token:
+        authorization = f"Bearer {access_token}"
+
+    return await get_current_user(authorization)
+
+
+async def _require_profile_role(user_id: str, roles: tuple, detail: str) -> str:
+    """Lê o papel do perfil (via cache de perfis) e exige um dos papéis informados."""
+    try:
+        profile = await profile_service.get_profile(user_id)
+    except APIError:
+        profile = None
+
+    if not profile or profile.get("role") not in roles:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=detail,
+        )
+
+    return user_id
+
+
+def require_role(*roles: str):
+    """
+    Cria uma dependência que exige que o usuário autenticado tenha um dos papéis.
+    
+    Regra de Segurança:
+    - O papel é lido do perfil do usuário (PROFILES.role), via cache de perfis
+    - Ex: Depends(require_role("doctor", "admin")) nas rotas clínicas
+    
+    Raises:
+        HTTPException 401: Se o token for inválido (get_current_user)
+        HTTPException 403: Se o usuário não tiver perfil ou papel permitido
+    """
+    detail = f"Acesso restrito a: {', '.join(roles)}."
+
+    async def dependency(user_id: str = Depends(get_current_user)) -> str:
+        return await _require_profile_role(user_id, roles, detail)
+
+    return dependency
+
+
+async def require_admin(user_id: str = Depends(get_current_user)) -> str:
+    """
+    Exige que o usuário autenticado tenha o papel "admin".
+    
+    Regra de Segurança:
+    - Utilizada nas rotas administrativas (ex: importação em lote)
+    - O papel é lido do perfil do usuário (PROFILES.role), via cache de perfis
+    
+    Returns:
+        UUID do usuário autenticado
+        
+    Raises:
+        HTTPException 401: Se o token for inválido (get_current_user)
+        HTTPException 403: Se o usuário não tiver perfil ou não for admin
+    """
+    return await _require_profile_role(user_id, ("admin",), "Acesso restrito a administradores.")
@@ -0,0 +1,743 @@
+"""
+Backend de armazenamento local (em memória) compatível com o cliente Supabase.
+
+Implementa, sem rede, o subconjunto da API do cliente Supabase usado pelos
+serviços (table().select/insert/update/delete, filtros, ordenação, limite,
+single() e rpc()), sobre o esquema definido em database/.
+
+Utilizado para:
+- Testes de carga e benchmarks reprodutíveis, medindo apenas o custo da aplicação
+- Execução offline da API (STORAGE_BACKEND=memory)
+
+Regras:
+- As funções do banco (database/migrations/) são reimplementadas em Python
+  com a mesma semântica, incluindo os erros (ex: P0002)
+- Cada operação é atômica: executada inteira sob um único lock
+- Timestamps são armazenados em UTC, no mesmo formato retornado pelo PostgREST
+"""
+import itertools
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from postgrest.exceptions import APIError
+from app.core.metrics import record_backend_call
+from app.core.text_search import SearchIndex
+
+# Colunas e valores padrão de cada tabela (database/schema.sql e migrations/)
+SCHEMA = {
+    "PROFILES": {
+        "full_name": None,
+        "document_number": None,
+        "date_of_birth": None,
+        "gender": None,
+        "mom_full_name": None,
+        "address": None,
+        "nationality": None,
+        "priority": False,
+        "role": None,
+    },
+    "QUEUE": {
+        "checkin": None,
+        "profile_id": None,
+        "status": None,
+        "assigned_doctor_id": None,
+    },
+    "RECORD_MEDICAL": {
+        "doctor_id": None,
+        "patient_id": None,
+        "started_at": None,
+        "end_at": None,
+        "subjective": None,
+        "objective_data": None,
+        "assessment": None,
+        "planning": None,
+        "queue_entry_id": None,
+    },
+    # Mantida pelo trigger de 005_patient_summary.sql (chave: patient_id); mesmo
+    # nome da tabela criada na migração (a URL do PostgREST diferencia maiúsculas)
+    "patient_summary": {
+        "patient_id": None,
+        "visit_count": 0,
+        "finished_count": 0,
+        "total_duration_seconds": 0.0,
+        "first_visit_at": None,
+        "last_visit_at": None,
+        "last_record_id": None,
+        "last_assessment": None,
+    },
+}
+
+# Tabelas com chave primária sequencial (bigserial); as demais usam UUID
+SERIAL_TABLES = {"RECORD_MEDICAL"}
+
+# Colunas "timestamp with time zone" (normalizadas para UTC)
+TIMESTAMP_COLUMNS = {
+    "checkin", "started_at", "end_at", "inserted_at", "updated_at",
+    "first_visit_at", "last_visit_at",
+}
+
+# Recurso embutido na seleção: alias:TABELA!coluna_fk(colunas)
+EMBED_PATTERN = re.compile(r"^(?:(\w+):)?(\w+)!(\w+)\((.*)\)$")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _normalize_timestamp(value):
+    """Converte datetime ou string ISO para o formato UTC armazenado."""
+    if value is None:
+        return None
+
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _coerce(column: str, value, sample):
+    """Converte o valor de um filtro para o tipo da coluna comparada."""
+    if value is None:
+        return None
+
+    if column in TIMESTAMP_COLUMNS:
+        return _normalize_timestamp(value)
+
+    if isinstance(value, str):
+        if isinstance(sample, bool):
+            return value.lower() == "true"
+        if isinstance(sample, int):
+            return int(value)
+        if isinstance(sample, float):
+            return float(value)
+
+    if isinstance(sample, str) and not isinstance(value, str):
+        return str(value)
+
+    return value
+
+
+def _get(row: dict, column: str):
+    """Lê uma coluna, incluindo colunas de recursos embutidos ("patient(priority)")."""
+    if column.endswith(")") and "(" in column:
+        embed, inner = column[:-1].split("(", 1)
+        return (row.get(embed) or {}).get(inner)
+
+    return row.get(column)
+
+
+def _compare(op: str, column: str, row_value, value):
+    """Avalia um operador do PostgREST (eq, gt, is, in...) sobre um valor da linha."""
+    if op == "is":
+        if value is None or value == "null":
+            return row_value is None
+        return row_value is _coerce(column, value, True)
+
+    if row_value is None:
+        return False
+
+    if op == "in":
+        return row_value in {_coerce(column, v, row_value) for v in value}
+
+    value = _coerce(column, value, row_value)
+
+    if op == "eq":
+        return row_value == value
+    if op == "neq":
+        return row_value != value
+    if op == "gt":
+        return row_value > value
+    if op == "gte":
+        return row_value >= value
+    if op == "lt":
+        return row_value < value
+    if op == "lte":
+        return row_value <= value
+
+    raise ValueError(f"Operador não suportado pelo backend local: {op}")
+
+
+def _split_top_level(expr: str):
+    """Divide uma expressão por vírgulas fora de parênteses e aspas."""
+    parts, depth, quoted, current = [], 0, False, ""
+
+    for char in expr:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+
+    if current:
+        parts.append(current)
+
+    return parts
+
+
+def _parse_logic(expr: str):
+    """
+    Converte um filtro lógico do PostgREST (sintaxe de or=/and=) em predicado.
+    Ex: 'started_at.gt."2024-01-01",and(started_at.eq."2024-01-01",id.gt.5)'
+    """
+    predicates = []
+
+    for part in _split_top_level(expr):
+        part = part.strip()
+
+        if part.startswith(("and(", "or(")):
+            operator, inner = part[:-1].split("(", 1)
+            nested = _parse_logic(inner)
+            combine = all if operator == "and" else any
+            predicates.append(
+                lambda row, nested=nested, combine=combine: combine(p(row) for p in nested)
+            )
+            continue
+
+        column, op, raw = part.split(".", 2)
+        value = json.loads(raw) if raw.startswith('"') else raw
+        if value == "null":
+            value = None
+
+        predicates.append(
+            lambda row, column=column, op=op, value=value:
+            _compare(op, column, _get(row, column), value)
+        )
+
+    return predicates
+
+
+class LocalResponse:
+    """Resposta no mesmo formato do cliente Supabase (atributo data)."""
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class LocalQuery:
+    """
+    Consulta sobre uma tabela local, construída com a mesma API encadeável do
+    PostgREST (select/insert/update/delete + filtros + order/limit/single).
+    """
+    def __init__(self, db: "LocalDatabase", table: str, operation: str, columns: str = "*", payload=None):
+        self.db = db
+        self.table = table
+        self.operation = operation
+        self.columns = columns
+        self.payload = payload
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._single = False
+        self._negate_next = False
+
+    def _filter(self, column: str, op: str, value):
+        negate, self._negate_next = self._negate_next, False
+        self._filters.append(
+            lambda row: _compare(op, column, _get(row, column), value) != negate
+        )
+        return self
+
+    @property
+    def not_(self):
+        """Nega o próximo filtro (ex: .not_.is_("end_at", "null"))."""
+        self._negate_next = True
+        return self
+
+    def eq(self, column: str, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value):
+        return self._filter(column, "lte", value)
+
+    def is_(self, column: str, value):
+        return self._filter(column, "is", value)
+
+    def in_(self, column: str, values):
+        return self._filter(column, "in", list(values))
+
+    def or_(self, filters: str, reference_table: str | None = None):
+        predicates = _parse_logic(filters)
+        self._filters.append(lambda row: any(p(row) for p in predicates))
+        return self
+
+    def order(self, column: str, *, desc: bool = False, nullsfirst: bool | None = None, foreign_table: str | None = None):
+        self._order.append((column, desc, nullsfirst))
+        return self
+
+    def limit(self, size: int, *, foreign_table: str | None = None):
+        self._limit = size
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    async def execute(self):
+        self.db.record_call(f"{self.operation} {self.table}")
+        started_at = time.perf_counter()
+
+        try:
+            with self.db.lock:
+                data = self.db.run(self)
+        finally:
+            record_backend_call(time.perf_counter() - started_at)
+
+        if self._single:
+            if len(data) != 1:
+                raise APIError({
+                    "code": "PGRST116",
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                    "details": f"The result contains {len(data)} rows",
+                })
+            data = data[0]
+
+        return LocalResponse(data)
+
+
+class LocalTable:
+    """Ponto de entrada de uma tabela (equivalente a supabase.table(nome))."""
+    def __init__(self, db: "LocalDatabase", name: str):
+        self.db = db
+        self.name = name
+
+    def select(self, *columns: str, count=None, head=None):
+        return LocalQuery(self.db, self.name, "select", ",".join(columns) or "*")
+
+    def insert(self, json, *, count=None, returning=None, upsert=False, default_to_null=True):
+        return LocalQuery(self.db, self.name, "insert", payload=json)
+
+    def update(self, json, *, count=None, returning=None):
+        return LocalQuery(self.db, self.name, "update", payload=json)
+
+    def delete(self, *, count=None, returning=None):
+        return LocalQuery(self.db, self.name, "delete")
+
+
+class LocalRPC:
+    """Chamada de função do banco (equivalente a supabase.rpc(nome, params))."""
+    def __init__(self, db: "LocalDatabase", name: str, params: dict):
+        self.db = db
+        self.name = name
+        self.params = params
+
+    async def execute(self):
+        self.db.record_call(f"rpc {self.name}")
+
+        function = getattr(self.db, f"rpc_{self.name}", None)
+        if function is None:
+            raise APIError({
+                "code": "PGRST202",
+                "message": f"Could not find the function public.{self.name}",
+            })
+
+        started_at = time.perf_counter()
+
+        try:
+            with self.db.lock:
+                return LocalResponse(function(**self.params))
+        finally:
+            record_backend_call(time.perf_counter() - started_at)
+
+
+class LocalDatabase:
+    """
+    Armazenamento em memória das tabelas PROFILES, QUEUE, RECORD_MEDICAL e
+    patient_summary (mantida como o trigger do banco, a cada escrita em RECORD_MEDICAL).
+
+    Cada tabela é uma lista de linhas (dicts), na ordem de inserção.
+    Cada execute() equivale a uma ida ao banco (round trip) e é contado em
+    calls; on_call, se definido, é notificado com a descrição da chamada
+    (ex: "select QUEUE", "rpc claim_next_patient").
+    """
+    def __init__(self, on_call=None):
+        self.lock = threading.RLock()
+        self.tables = {name: [] for name in SCHEMA}
+        self.calls = 0
+        self.on_call = on_call
+        self._serial = itertools.count(1)
+        # Índice de busca textual dos campos SOAP (equivalente ao GIN/tsvector)
+        self.search_index = SearchIndex()
+
+    def reset(self):
+        """Esvazia todas as tabelas (ex: entre execuções do benchmark)."""
+        with self.lock:
+            self.tables = {name: [] for name in SCHEMA}
+            self._serial = itertools.count(1)
+            self.search_index = SearchIndex()
+
+    def record_call(self, description: str):
+        """Registra uma ida ao banco."""
+        self.calls += 1
+        if self.on_call is not None:
+            self.on_call(description)
+
+    # ----------------------------------------
+    # Operações de tabela
+    # ----------------------------------------
+    def run(self, query: LocalQuery):
+        rows = self.tables[query.table]
+
+        if query.operation == "insert":
+            payload = query.payload if isinstance(query.payload, list) else [query.payload]
+            self._check_unique_ids(query.table, payload)
+            return [dict(self._insert(query.table, item)) for item in payload]
+
+        matched = [row for row in rows if self._matches(query, row)]
+
+        if query.operation == "update":
+            values = self._prepare(query.payload)
+            for row in matched:
+                row.update(values)
+                row["updated_at"] = _now()
+                if query.table == "RECORD_MEDICAL":
+                    self.search_index.add(row)
+            if query.table == "RECORD_MEDICAL":
+                for patient_id in {row["patient_id"] for row in matched}:
+                    self._refresh_patient_summary(patient_id)
+            return [dict(row) for row in matched]
+
+        if query.operation == "delete":
+            removed = {id(row) for row in matched}
+            self.tables[query.table] = [row for row in rows if id(row) not in removed]
+            if query.table == "RECORD_MEDICAL":
+                for row in matched:
+                    self.search_index.remove(row["id"])
+                for patient_id in {row["patient_id"] for row in matched}:
+                    self._refresh_patient_summary(patient_id)
+            return [dict(row) for row in matched]
+
+        return self._select(query)
+
+    def _select(self, query: LocalQuery):
+        columns, embeds = self._parse_select(query.columns)
+
+        rows = []
+        for row in self.tables[query.table]:
+            row = dict(row)
+            for alias, table, fk, embed_columns in embeds:
+                row[alias] = self._embed(table, row.get(fk), embed_columns)
+            if self._matches(query, row):
+                rows.append(row)
+
+        # Ordenação estável, da última chave para a primeira
+        # Padrão do Postgres: ASC com nulos no fim, DESC com nulos no início
+        for column, desc, nullsfirst in reversed(query._order):
+            nulls_first = desc if nullsfirst is None else nullsfirst
+            present = [row for row in rows if _get(row, column) is not None]
+            missing = [row for row in rows if _get(row, column) is None]
+            present.sort(key=lambda row: _get(row, column), reverse=desc)
+            rows = missing + present if nulls_first else present + missing
+
+        if query._limit is not None:
+            rows = rows[:query._limit]
+
+        if columns is not None:
+            keep = set(columns) | {embed[0] for embed in embeds}
+            rows = [{key: value for key, value in row.items() if key in keep} for row in rows]
+
+        return rows
+
+    @staticmethod
+    def _parse_select(columns: str):
+        """Separa colunas simples (None = todas) e recursos embutidos."""
+        plain, embeds = [], []
+
+        for item in _split_top_level(columns):
+            item = item.strip()
+            match = EMBED_PATTERN.match(item)
+
+            if match:
+                alias, table, fk, inner = match.groups()
+                embeds.append((alias or table, table, fk, inner))
+            elif item == "*":
+                plain = None
+            elif plain is not None:
+                plain.append(item)
+
+        return plain, embeds
+
+    def _embed(self, table: str, key, columns: str):
+        """Retorna o registro referenciado pela FK (relação muitos-para-um)."""
+        for row in self.tables[table]:
+            if row["id"] == key:
+                if columns.strip() == "*":
+                    return dict(row)
+                wanted = [column.strip() for column in columns.split(",")]
+                return {column: row.get(column) for column in wanted}
+        return None
+
+    @staticmethod
+    def _matches(query: LocalQuery, row: dict):
+        return all(predicate(row) for predicate in query._filters)
+
+    @staticmethod
+    def _prepare(values: dict):
+        return {
+            column: _normalize_timestamp(value) if column in TIMESTAMP_COLUMNS else value
+            for column, value in values.items()
+        }
+
+    def _check_unique_ids(self, table: str, payload: list):
+        """Chave primária duplicada rejeita a inserção inteira (como no banco)."""
+        ids = [item["id"] for item in payload if item.get("id") is not None]
+        if not ids:
+            return
+
+        existing = {row["id"] for row in self.tables[table]}
+        seen = set()
+        for row_id in ids:
+            if row_id in existing or row_id in seen:
+                raise APIError({
+                    "code": "23505",
+                    "message": f'duplicate key value violates unique constraint "{table.lower()}_pkey"',
+                    "details": f"Key (id)=({row_id}) already exists.",
+                })
+            seen.add(row_id)
+
+    def _insert(self, table: str, values: dict):
+        now = _now()
+        row = {
+            "id": next(self._serial) if table in SERIAL_TABLES else str(uuid.uuid4()),
+            **SCHEMA[table],
+            "inserted_at": now,
+            "updated_at": now,
+            **self._prepare(values),
+        }
+        self.tables[table].append(row)
+        if table == "RECORD_MEDICAL":
+            self.search_index.add(row)
+            self._add_to_patient_summary(row)
+        return row
+
+    # ----------------------------------------
+    # Resumo por paciente (trigger de 005_patient_summary.sql)
+    # ----------------------------------------
+    @staticmethod
+    def _duration_seconds(record: dict):
+        if record["end_at"] is None or record["started_at"] is None:
+            return 0.0
+        end_at = datetime.fromisoformat(record["end_at"])
+        return (end_at - datetime.fromisoformat(record["started_at"])).total_seconds()
+
+    def _add_to_patient_summary(self, record: dict):
+        """Atualização incremental na inserção de um registro."""
+        summaries = self.tables["patient_summary"]
+        summary = next((s for s in summaries if s["patient_id"] == record["patient_id"]), None)
+
+        if summary is None:
+            summary = {**SCHEMA["patient_summary"], "patient_id": record["patient_id"]}
+            summaries.append(summary)
+
+        summary["visit_count"] += 1
+        if record["end_at"] is not None:
+            summary["finished_count"] += 1
+            summary["total_duration_seconds"] += self._duration_seconds(record)
+
+        started_at = record["started_at"]
+        if summary["first_visit_at"] is None or started_at < summary["first_visit_at"]:
+            summary["first_visit_at"] = started_at
+        if summary["last_visit_at"] is None or started_at >= summary["last_visit_at"]:
+            summary["last_visit_at"] = started_at
+            summary["last_record_id"] = record["id"]
+            summary["last_assessment"] = record["assessment"]
+
+        summary["updated_at"] = _now()
+
+    def _refresh_patient_summary(self, patient_id: str):
+        """Recalcula o resumo do paciente (alteração ou remoção de registros)."""
+        self.tables["patient_summary"] = [
+            s for s in self.tables["patient_summary"] if s["patient_id"] != patient_id
+        ]
+        records = sorted(
+            (r for r in self.tables["RECORD_MEDICAL"] if r["patient_id"] == patient_id),
+            key=lambda r: (r["started_at"], r["id"])
+        )
+        for record in records:
+            self._add_to_patient_summary(record)
+
+    # ----------------------------------------
+    # Funções do banco (database/migrations/)
+    # ----------------------------------------
+    def rpc_claim_next_patient(self, p_doctor_id: str):
+        """Mesma semântica de 001_claim_next_patient.sql."""
+        for entry in self.tables["QUEUE"]:
+            if entry["assigned_doctor_id"] == p_doctor_id and entry["status"] == "being_attended":
+                return {"already_attending": True, "patient": dict(entry)}
+
+        profiles = {profile["id"]: profile for profile in self.tables["PROFILES"]}
+
+        # Join com PROFILES: entradas sem perfil não entram na fila
+        waiting = [
+            entry for entry in self.tables["QUEUE"]
+            if entry["status"] == "waiting" and entry["profile_id"] in profiles
+        ]
+
+        if not waiting:
+            return None
+
+        entry = min(
+            waiting,
+            key=lambda e: (not profiles[e["profile_id"]]["priority"], e["checkin"])
+        )
+        entry.update({
+            "status": "being_attended",
+            "assigned_doctor_id": p_doctor_id,
+            "updated_at": _now(),
+        })
+
+        return {
+            "already_attending": False,
+            "patient": {**entry, "priority": bool(profiles[entry["profile_id"]]["priority"])},
+        }
+
+    def rpc_finish_attendance(
+        self,
+        p_doctor_id: str,
+        p_subjective: str,
+        p_objective_data: str,
+        p_assessment: str,
+        p_planning: str,
+        p_queue_entry_id: str | None = None
+    ):
+        """Mesma semântica de 002_finish_attendance.sql."""
+        entry = next(
+            (
+                e for e in self.tables["QUEUE"]
+                if e["assigned_doctor_id"] == p_doctor_id
+                and e["status"] == "being_attended"
+                and (p_queue_entry_id is None or e["id"] == p_queue_entry_id)
+            ),
+            None
+        )
+
+        if entry is None:
+            # Retentativa de uma finalização já concluída
+            if p_queue_entry_id is not None:
+                for record in self.tables["RECORD_MEDICAL"]:
+                    if record["queue_entry_id"] == p_queue_entry_id and record["doctor_id"] == p_doctor_id:
+                        return dict(record)
+
+            raise APIError({
+                "code": "P0002",
+                "message": "Nenhum atendimento ativo encontrado.",
+            })
+
+        record = self._insert("RECORD_MEDICAL", {
+            "doctor_id": p_doctor_id,
+            "patient_id": entry["profile_id"],
+            "started_at": entry["checkin"],
+            "end_at": _now(),
+            "subjective": p_subjective,
+            "objective_data": p_objective_data,
+            "assessment": p_assessment,
+            "planning": p_planning,
+            "queue_entry_id": entry["id"],
+        })
+
+        self.tables["QUEUE"].remove(entry)
+
+        return dict(record)
+
+    def rpc_search_records(
+        self,
+        p_query: str,
+        p_limit: int = 20,
+        p_offset: int = 0,
+        p_doctor_id: str | None = None,
+        p_patient_id: str | None = None
+    ):
+        """Mesma forma de resultado de 004_search_records.sql (índice invertido em memória)."""
+        def predicate(row):
+            return (
+                (p_doctor_id is None or row["doctor_id"] == p_doctor_id)
+                and (p_patient_id is None or row["patient_id"] == p_patient_id)
+            )
+
+        hits = self.search_index.search(p_query, p_limit, p_offset, predicate)
+
+        return [
+            {
+                "id": row["id"],
+                "doctor_id": row["doctor_id"],
+                "patient_id": row["patient_id"],
+                "started_at": row["started_at"],
+                "end_at": row["end_at"],
+                "rank": rank,
+                "snippet": self.search_index.snippet(row, p_query),
+            }
+            for rank, row in hits
+        ]
+
+    def rpc_archive_delete_records(self, p_ids: list):
+        """Mesma semântica de 006_archive_records.sql (resumo do paciente mantido)."""
+        ids = set(p_ids)
+        archived = [
+            row for row in self.tables["RECORD_MEDICAL"]
+            if row["id"] in ids and row["end_at"] is not None
+        ]
+
+        removed = {id(row) for row in archived}
+        self.tables["RECORD_MEDICAL"] = [
+            row for row in self.tables["RECORD_MEDICAL"] if id(row) not in removed
+        ]
+        for row in archived:
+            self.search_index.remove(row["id"])
+
+        return len(archived)
+
+
+class LocalAuth:
+    """Sem Supabase Auth no backend local: tokens são validados com AUTH_MODE=local."""
+    async def get_user(self, jwt: str):
+        raise RuntimeError("Backend local não possui Supabase Auth. Utilize AUTH_MODE=local.")
+
+
+class LocalClient:
+    """
+    Substituto do AsyncClient do Supabase usando LocalDatabase.
+
+    Exemplo:
+        client = LocalClient()
+        await client.table("PROFILES").insert({"id": "...", "priority": True}).execute()
+    """
+    def __init__(self, db: LocalDatabase | None = None):
+        self.db = db if db is not None else LocalDatabase()
+        self.auth = LocalAuth()
+
+    def table(self, name: str) -> LocalTable:
+        if name not in SCHEMA:
+            raise APIError({
+                "code": "42P01",
+                "message": f'relation "public.{name}" does not exist',
+            })
+        return LocalTable(self.db, name)
+
+    def from_(self, name: str) -> LocalTable:
+        return self.table(name)
+
+    def rpc(self, fn: str, params: dict | None = None) -> LocalRPC:
+        return LocalRPC(self.db, fn, params or {})
@@ -0,0 +1,203 @@
+"""
+Instrumentação das requisições: latência, idas ao banco e caches.
+
+Para cada requisição HTTP são registradas as chamadas ao backend (PostgREST,
+Supabase Auth ou backend local), com quantidade e tempo. Os dados são expostos:
+- No header Server-Timing de cada resposta (db: chamadas e tempo no banco; app: total)
+- No endpoint /metrics, em formato texto do Prometheus, agregados por rota:
+  histograma de latência, total de requisições, chamadas ao backend e
+  acertos/faltas dos caches registrados
+"""
+import threading
+import time
+from contextvars import ContextVar
+
+# Limites (segundos) dos buckets do histograma de latência
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rotas de infraestrutura (probes, métricas): não contam como primeira requisição
+INFRA_ROUTES = frozenset({"/", "/livez", "/readyz", "/metrics", "unmatched"})
+
+# Chamadas ao backend da requisição em andamento
+_current_request = ContextVar("current_request", default=None)
+
+
+class RequestMetrics:
+    """Chamadas ao backend feitas durante uma requisição."""
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.backend_calls = 0
+        self.backend_seconds = 0.0
+
+    def server_timing(self):
+        """Valor do header Server-Timing (durações em ms)."""
+        total = (time.perf_counter() - self.started_at) * 1000
+        return (
+            f'db;dur={self.backend_seconds * 1000:.1f};desc="{self.backend_calls} calls", '
+            f"app;dur={total:.1f}"
+        )
+
+
+def record_backend_call(seconds: float):
+    """Registra uma ida ao backend na requisição em andamento (se houver)."""
+    current = _current_request.get()
+    if current is not None:
+        current.backend_calls += 1
+        current.backend_seconds += seconds
+
+
+async def on_backend_request(request):
+    """Hook do httpx: marca o início de cada requisição ao Supabase."""
+    request.extensions["metrics_started_at"] = time.perf_counter()
+
+
+async def on_backend_response(response):
+    """Hook do httpx: registra a duração de cada requisição ao Supabase."""
+    started_at = response.request.extensions.get("metrics_started_at")
+    if started_at is not None:
+        record_backend_call(time.perf_counter() - started_at)
+
+
+class MetricsRegistry:
+    """
+    Agregados por rota (template do FastAPI, ex: /profiles/{profile_id}).
+
+    Regras:
+    - Rotas não encontradas são agrupadas em "unmatched" (evita cardinalidade alta)
+    - Caches são lidos no momento da exportação (TTLCache.stats())
+    - A latência da primeira requisição da API (fora de INFRA_ROUTES) é guardada
+      à parte: mede o custo restante de "cold start" visto pelo usuário
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._latency = {}
+        self._backend = {}
+        self._caches = {}
+        self._gauges = {}
+        self.first_request_seconds = None
+
+    def register_cache(self, name: str, cache):
+        """Inclui um TTLCache nas métricas exportadas."""
+        self._caches[name] = cache
+
+    def set_gauge(self, name: str, value: float):
+        """Define um valor exportado como gauge (ex: app_ready)."""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, method: str, route: str, status_code: int, seconds: float, request: RequestMetrics):
+        """Registra uma requisição concluída."""
+        key = (method, route)
+
+        with self._lock:
+            if self.first_request_seconds is None and route not in INFRA_ROUTES:
+                self.first_request_seconds = round(seconds, 6)
+
+            status_key = (method, route, status_code)
+            self._requests[status_key] = self._requests.get(status_key, 0) + 1
+
+            buckets, total, count = self._latency.get(key, ([0] * len(LATENCY_BUCKETS), 0.0, 0))
+            for i, limit in enumerate(LATENCY_BUCKETS):
+                if seconds <= limit:
+                    buckets[i] += 1
+            self._latency[key] = (buckets, total + seconds, count + 1)
+
+            calls, backend_seconds = self._backend.get(key, (0, 0.0))
+            self._backend[key] = (
+                calls + request.backend_calls,
+                backend_seconds + request.backend_seconds,
+            )
+
+    def render(self):
+        """Exporta as métricas no formato texto do Prometheus."""
+        lines = []
+
+        with self._lock:
+            lines.append("# TYPE http_requests_total counter")
+            for (method, route, code), count in sorted(self._requests.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{code}"}} {count}')
+
+            lines.append("# TYPE http_request_duration_seconds histogram")
+            for (method, route), (buckets, total, count) in sorted(self._latency.items()):
+                labels = f'method="{method}",route="{route}"'
+                for limit, value in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{limit}"}} {value}')
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+                lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+                lines.append(f"http_request_duration_seconds_count{{{labels}}} {count}")
+
+            lines.append("# TYPE backend_calls_total counter")
+            for (method, route), (calls, _) in sorted(self._backend.items()):
+                lines.append(f'backend_calls_total{{method="{method}",route="{route}"}} {calls}')
+
+            lines.append("# TYPE backend_call_duration_seconds_total counter")
+            for (method, route), (_, seconds) in sorted(self._backend.items()):
+                lines.append(f'backend_call_duration_seconds_total{{method="{method}",route="{route}"}} {seconds:.6f}')
+
+            gauges = dict(self._gauges)
+            if self.first_request_seconds is not None:
+                gauges["app_first_request_duration_seconds"] = self.first_request_seconds
+
+            for name, value in sorted(gauges.items()):
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value}")
+
+        for metric, kind, field in (
+            ("cache_hits_total", "counter", "hits"),
+            ("cache_misses_total", "counter", "misses"),
+            ("cache_hit_ratio", "gauge", "hit_rate"),
+            ("cache_size", "gauge", "size"),
+        ):
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, cache in sorted(self._caches.items()):
+                lines.append(f'{metric}{{cache="{name}"}} {cache.stats()[field]}')
+
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP.
+
+    - Abre o contexto de chamadas ao backend da requisição
+    - Adiciona o header Server-Timing ao iniciar a resposta
+    - Registra latência, status e chamadas ao backend no MetricsRegistry
+    """
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics()
+        context = _current_request.set(request)
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", request.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(context)
+            route = scope.get("route")
+            self.registry.observe(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status_code,
+                time.perf_counter() - request.started_at,
+                request,
+            )
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,91 @@
+"""
+Paginação por cursor (keyset) e projeção de campos para listagens.
+
+Regras:
+- A ordenação é sempre por (coluna de ordenação, id), garantindo ordem estável
+- O cursor é opaco para o cliente: codifica os valores da última linha da página
+- A próxima página é buscada com "(coluna, id) > (valor, id)", usando índice,
+  sem OFFSET: o custo não cresce com a profundidade da paginação
+"""
+import base64
+import json
+
+
+def encode_cursor(sort_value, row_id):
+    """Codifica a posição (valor de ordenação, id) em um cursor opaco."""
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """
+    Decodifica um cursor gerado por encode_cursor.
+
+    Raises:
+        ValueError: Se o cursor for inválido
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise ValueError("Cursor inválido.")
+
+    return sort_value, row_id
+
+
+def next_cursor(items: list, limit: int, sort_column: str):
+    """
+    Retorna o cursor da próxima página, ou None se esta for a última.
+    Uma página completa (len == limit) indica que pode haver mais itens.
+    """
+    if not items or len(items) < limit:
+        return None
+
+    last = items[-1]
+    return encode_cursor(last[sort_column], last["id"])
+
+
+def parse_fields(fields: str | None, allowed: tuple, sort_column: str):
+    """
+    Monta a string de seleção a partir do parâmetro "fields" (lista separada por vírgula).
+
+    Regras:
+    - Sem "fields", seleciona todas as colunas
+    - Apenas colunas conhecidas são aceitas
+    - id e a coluna de ordenação são sempre incluídas (necessárias para o cursor)
+
+    Raises:
+        ValueError: Se algum campo não existir
+    """
+    if not fields:
+        return "*"
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed]
+
+    if unknown:
+        raise ValueError(f"Campos inválidos: {', '.join(unknown)}")
+
+    columns = ["id", sort_column] + requested
+    return ",".join(dict.fromkeys(columns))
+
+
+def apply_keyset(query, sort_column: str, cursor: str | None, limit: int):
+    """
+    Aplica ordenação (sort_column, id), filtro do cursor e limite a uma consulta PostgREST.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        value = json.dumps(sort_value)
+        key = json.dumps(row_id)
+        query = query.or_(
+            f"{sort_column}.gt.{value},"
+            f"and({sort_column}.eq.{value},id.gt.{key})"
+        )
+
+    return (
+        query
+        .order(sort_column, desc=False)
+        .order("id", desc=False)
+        .limit(limit)
+    )
@@ -0,0 +1,125 @@
+"""
+Inicialização da aplicação: verificação das dependências, aquecimento dos
+caches e estado de prontidão (probes /livez e /readyz).
+
+Regras:
+- Dependências obrigatórias (banco, cache compartilhado) são verificadas antes
+  de aceitar tráfego, com novas tentativas até STARTUP_TIMEOUT_SECONDS; depois
+  disso a inicialização falha (o processo encerra e o orquestrador o reinicia)
+- Aquecimentos (índice da fila, prioridades, chaves JWKS) não impedem a
+  inicialização: em caso de falha, os dados são carregados sob demanda
+- /readyz só responde 200 após a inicialização e deixa de responder 200 no
+  encerramento (novas requisições são direcionadas a outras instâncias)
+- O tempo de inicialização (cold start) é medido a partir do import deste
+  módulo, feito primeiro em main.py
+"""
+import asyncio
+import time
+from app.core.metrics import metrics
+
+# Início da inicialização do processo (import do módulo)
+PROCESS_STARTED_AT = time.perf_counter()
+
+
+class Readiness:
+    """
+    Estado de prontidão da aplicação e resultado de cada etapa da inicialização.
+
+    Estados: starting -> ready -> stopping (ou starting -> failed)
+    """
+    def __init__(self, started_at: float | None = None):
+        self.started_at = PROCESS_STARTED_AT if started_at is None else started_at
+        self.status = "starting"
+        self.checks = {}
+        self.cold_start_seconds = None
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    async def _run(self, name: str, step, timeout_seconds: float):
+        """Executa uma etapa, registrando duração, resultado e erro."""
+        started_at = time.perf_counter()
+
+        try:
+            detail = await asyncio.wait_for(step(), timeout=timeout_seconds)
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            self.checks[name] = {"ok": False, "duration_ms": self._elapsed_ms(started_at), "error": error}
+            return False
+
+        self.checks[name] = {"ok": True, "duration_ms": self._elapsed_ms(started_at)}
+        if detail is not None:
+            self.checks[name]["detail"] = detail
+        return True
+
+    @staticmethod
+    def _elapsed_ms(started_at: float):
+        return round((time.perf_counter() - started_at) * 1000, 1)
+
+    async def start(
+        self,
+        checks: dict,
+        warmups: dict,
+        timeout_seconds: float = 30.0,
+        retry_seconds: float = 1.0
+    ):
+        """
+        Executa a inicialização.
+
+        Args:
+            checks: Verificações obrigatórias {nome: função assíncrona}
+            warmups: Aquecimentos opcionais {nome: função assíncrona}; o retorno
+                (ex: quantidade carregada) é exibido em /readyz
+            timeout_seconds: Prazo total para as verificações obrigatórias
+            retry_seconds: Intervalo entre tentativas
+
+        Raises:
+            RuntimeError: Se alguma verificação obrigatória não passar no prazo
+        """
+        deadline = time.monotonic() + timeout_seconds
+        pending = dict(checks)
+
+        while True:
+            for name, check in list(pending.items()):
+                remaining = max(0.1, deadline - time.monotonic())
+                if await self._run(name, check, remaining):
+                    del pending[name]
+
+            if not pending:
+                break
+
+            if time.monotonic() >= deadline:
+                self.status = "failed"
+                errors = "; ".join(f"{name}: {self.checks[name]['error']}" for name in pending)
+                raise RuntimeError(f"Dependências indisponíveis na inicialização: {errors}")
+
+            await asyncio.sleep(min(retry_seconds, max(0.0, deadline - time.monotonic())))
+
+        for name, warmup in warmups.items():
+            await self._run(name, warmup, timeout_seconds)
+
+        self.cold_start_seconds = time.perf_counter() - self.started_at
+        self.status = "ready"
+
+        metrics.set_gauge("app_ready", 1)
+        metrics.set_gauge("app_cold_start_seconds", round(self.cold_start_seconds, 6))
+
+    def stop(self):
+        """Marca o encerramento: /readyz passa a responder 503."""
+        self.status = "stopping"
+        metrics.set_gauge("app_ready", 0)
+
+    def report(self):
+        """Estado exibido em /readyz."""
+        return {
+            "status": self.status,
+            "cold_start_seconds": (
+                round(self.cold_start_seconds, 3) if self.cold_start_seconds is not None else None
+            ),
+            "first_request_seconds": metrics.first_request_seconds,
+            "checks": self.checks,
+        }
+
+
+readiness = Readiness()
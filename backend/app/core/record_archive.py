@@ -0,0 +1,329 @@
+"""
+Arquivo frio dos registros médicos (Parquet, particionado por mês), opcional.
+
+Registros antigos são movidos da tabela RECORD_MEDICAL para arquivos Parquet
+comprimidos em disco local, mantendo a tabela pequena (consultas e manutenção
+de índices do dia a dia não dependem do tamanho do histórico).
+
+Estrutura (em ARCHIVE_DIR):
+- year=AAAA/month=MM/part-<ns>-<id>.parquet: um arquivo por lote gravado,
+  com os registros do lote iniciados no mês (UTC), ordenados por
+  (patient_id, started_at, id); o mês é lido como um dataset Parquet
+- .archive.lock: trava do job de arquivamento (entre processos)
+- .generation: trocado a cada gravação; sinaliza aos demais processos que
+  há arquivos novos
+
+Regras:
+- Cada lote gera arquivos novos: nada já gravado é reescrito (custo de
+  gravação proporcional ao lote, não ao tamanho do mês)
+- A ordenação por paciente faz com que os row groups de cada arquivo cubram
+  faixas distintas de patient_id: a leitura do histórico de um paciente lê
+  apenas os row groups que podem contê-lo (estatísticas min/max do Parquet)
+- Um índice em memória (faixa de ids e pacientes de cada arquivo) indica
+  quais arquivos consultar; arquivos sem o paciente/id não são abertos
+- O índice é revalidado a cada leitura pelo .generation (um stat): se outro
+  worker arquivou registros, apenas os arquivos novos são carregados
+- Gravação atômica e durável: arquivo temporário, fsync e renomeação
+  (leitores nunca veem um arquivo parcial)
+- Um único job de arquivamento por vez (trava em arquivo, válida entre
+  workers e processos que compartilham o diretório)
+- Regravar um registro já arquivado (ex: job interrompido antes da remoção no
+  banco) não duplica: na leitura, vale a versão do arquivo mais recente
+"""
+import fcntl
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Dependência opcional: necessária apenas com ARCHIVE_DIR
+    pa = None
+    pc = None
+    ds = None
+    pq = None
+
+# Colunas de RECORD_MEDICAL gravadas no arquivo
+TIMESTAMP_FIELDS = ("started_at", "end_at", "inserted_at", "updated_at")
+TEXT_FIELDS = (
+    "doctor_id", "patient_id", "subjective", "objective_data", "assessment",
+    "planning", "queue_entry_id",
+)
+ARCHIVE_COLUMNS = ("id", *TEXT_FIELDS, *TIMESTAMP_FIELDS)
+
+# Arquivos de cada lote (o nome começa pelo instante da gravação: ordem lexicográfica = ordem de gravação)
+PARTITION_GLOB = "year=*/month=*/part-*.parquet"
+LOCK_FILE = ".archive.lock"
+GENERATION_FILE = ".generation"
+
+
+class ArchiveInProgress(Exception):
+    """Outro job de arquivamento está em execução."""
+
+
+def _parse_timestamp(value):
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _schema():
+    return pa.schema(
+        [("id", pa.int64())]
+        + [(name, pa.string()) for name in TEXT_FIELDS]
+        + [(name, pa.timestamp("us", tz="UTC")) for name in TIMESTAMP_FIELDS]
+    )
+
+
+class RecordArchive:
+    """
+    Partições mensais de registros médicos arquivados.
+
+    Args:
+        root: Diretório do arquivo
+        compression: Codec do Parquet (ex: zstd, snappy, gzip)
+        row_group_size: Registros por row group (granularidade da leitura)
+    """
+    def __init__(self, root: str, compression: str = "zstd", row_group_size: int = 1000):
+        self.root = Path(root)
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self._lock = threading.RLock()
+        # arquivo -> (menor id, maior id, pacientes)
+        self._files = {}
+        # Versão do .generation refletida no índice; None = ainda não carregado
+        self._generation = None
+
+    # ----------------------------------------
+    # Índice dos arquivos
+    # ----------------------------------------
+    def _current_generation(self):
+        try:
+            stat = (self.root / GENERATION_FILE).stat()
+        except FileNotFoundError:
+            return 0, 0
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _index(self):
+        """
+        Faixa de ids e pacientes de cada arquivo, recarregada quando o
+        .generation muda (gravação de outro processo).
+        """
+        with self._lock:
+            generation = self._current_generation()
+            if generation != self._generation:
+                paths = set(self.root.glob(PARTITION_GLOB))
+                self._files = {
+                    path: self._files[path] if path in self._files
+                    else self._describe(pq.read_table(path, columns=["id", "patient_id"]))
+                    for path in sorted(paths)
+                }
+                self._generation = generation
+            return self._files
+
+    @staticmethod
+    def _describe(table):
+        if table.num_rows == 0:
+            return None, None, frozenset()
+
+        bounds = pc.min_max(table["id"]).as_py()
+        return bounds["min"], bounds["max"], frozenset(table["patient_id"].to_pylist())
+
+    def _partition_dir(self, started_at: datetime):
+        started_at = started_at.astimezone(timezone.utc)
+        return self.root / f"year={started_at.year:04d}" / f"month={started_at.month:02d}"
+
+    @staticmethod
+    def _partition_name(directory: Path):
+        return f"{directory.parent.name[5:]}-{directory.name[6:]}"
+
+    # ----------------------------------------
+    # Gravação
+    # ----------------------------------------
+    @contextmanager
+    def exclusive(self):
+        """
+        Trava do job de arquivamento, entre threads, workers e processos.
+
+        Raises:
+            ArchiveInProgress: Se outro job estiver com a trava
+        """
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        with open(self.root / LOCK_FILE, "a") as handle:
+            try:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ArchiveInProgress("Arquivamento já em execução.")
+
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def write(self, records: list):
+        """
+        Grava registros em arquivos novos, na partição do mês de início de cada um.
+
+        Args:
+            records: Registros de RECORD_MEDICAL (como retornados pelo banco)
+
+        Returns:
+            (partições alteradas, ex: ["2024-01", "2024-02"];
+             ids lidos de volta dos arquivos gravados)
+        """
+        by_partition = {}
+        for record in records:
+            directory = self._partition_dir(_parse_timestamp(record["started_at"]))
+            by_partition.setdefault(directory, []).append(record)
+
+        stored_ids = set()
+
+        for directory, rows in by_partition.items():
+            table = self._to_table(rows).sort_by([
+                ("patient_id", "ascending"),
+                ("started_at", "ascending"),
+                ("id", "ascending"),
+            ])
+
+            directory.mkdir(parents=True, exist_ok=True)
+            path = directory / f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+            temporary = directory / f".{path.name}.tmp"
+
+            with open(temporary, "wb") as handle:
+                pq.write_table(
+                    table,
+                    handle,
+                    compression=self.compression,
+                    row_group_size=self.row_group_size,
+                )
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.replace(temporary, path)
+
+            # Confirmação: o que foi gravado é lido de volta do disco
+            stored = pq.read_table(path, columns=["id", "patient_id"])
+            stored_ids.update(stored["id"].to_pylist())
+
+            with self._lock:
+                self._files[path] = self._describe(stored)
+
+        if by_partition:
+            self._bump_generation()
+
+        return sorted(self._partition_name(directory) for directory in by_partition), stored_ids
+
+    def _bump_generation(self):
+        """Troca o .generation (novo inode): os demais processos recarregam o índice."""
+        temporary = self.root / f"{GENERATION_FILE}.{uuid.uuid4().hex[:8]}.tmp"
+        temporary.write_text(str(time.time_ns()))
+        os.replace(temporary, self.root / GENERATION_FILE)
+
+    @staticmethod
+    def _to_table(records: list):
+        columns = {
+            "id": [int(record["id"]) for record in records],
+            **{name: [record.get(name) for record in records] for name in TEXT_FIELDS},
+            **{
+                name: [_parse_timestamp(record.get(name)) for record in records]
+                for name in TIMESTAMP_FIELDS
+            },
+        }
+        return pa.table(columns, schema=_schema())
+
+    # ----------------------------------------
+    # Leitura
+    # ----------------------------------------
+    def get(self, record_id: int):
+        """Registro arquivado pelo id, ou None."""
+        with self._lock:
+            candidates = [
+                path for path, (low, high, _) in self._index().items()
+                if low is not None and low <= record_id <= high
+            ]
+
+        rows = self._read(candidates, ds.field("id") == record_id)
+        return rows[0] if rows else None
+
+    def list_by_patient(self, patient_id: str):
+        """Registros arquivados do paciente, do mais antigo ao mais recente."""
+        with self._lock:
+            candidates = [
+                path for path, (_, _, patients) in self._index().items()
+                if patient_id in patients
+            ]
+
+        rows = self._read(candidates, ds.field("patient_id") == patient_id)
+        rows.sort(key=lambda row: (row["started_at"], row["id"]))
+        return rows
+
+    @staticmethod
+    def _read(paths: list, expression):
+        """
+        Lê dos arquivos apenas as linhas do filtro (row groups descartados
+        pelas estatísticas); o mesmo id em mais de um arquivo vale uma vez,
+        na versão do arquivo mais recente.
+        """
+        if not paths:
+            return []
+
+        dataset = ds.dataset([str(path) for path in sorted(paths)], format="parquet", schema=_schema())
+
+        latest = {}
+        for fragment in sorted(dataset.get_fragments(), key=lambda fragment: Path(fragment.path).name):
+            for row in fragment.to_table(filter=expression, schema=dataset.schema).to_pylist():
+                latest[row["id"]] = row
+
+        rows = list(latest.values())
+        for row in rows:
+            for name in TIMESTAMP_FIELDS:
+                if row[name] is not None:
+                    row[name] = row[name].isoformat()
+        return rows
+
+    def partitions(self):
+        """Resumo das partições: nome, arquivos, registros (distintos) e tamanho em disco."""
+        with self._lock:
+            paths = list(self._index())
+
+        by_partition = {}
+        for path in paths:
+            by_partition.setdefault(path.parent, []).append(path)
+
+        return [
+            {
+                "partition": self._partition_name(directory),
+                "files": len(files),
+                "records": len(pc.unique(
+                    ds.dataset([str(path) for path in files], format="parquet").to_table(columns=["id"])["id"]
+                )),
+                "bytes": sum(path.stat().st_size for path in files),
+            }
+            for directory, files in sorted(by_partition.items())
+        ]
+
+
+def create_record_archive(root: str | None, compression: str = "zstd", row_group_size: int = 1000):
+    """
+    Cria o arquivo frio dos registros médicos.
+
+    Returns:
+        RecordArchive, ou None se nenhum diretório for informado (arquivamento desabilitado)
+
+    Raises:
+        RuntimeError: Se o diretório for informado sem o pacote pyarrow instalado
+    """
+    if not root:
+        return None
+
+    if pq is None:
+        raise RuntimeError("ARCHIVE_DIR configurado, mas o pacote 'pyarrow' não está instalado.")
+
+    return RecordArchive(root, compression=compression, row_group_size=row_group_size)
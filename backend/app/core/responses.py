@@ -0,0 +1,29 @@
+"""
+Resposta JSON com serialização rápida (orjson).
+
+Utilizada como resposta padrão da aplicação e retornada diretamente pelas
+listagens: os dados vindos do banco já são tipos JSON, então o retorno direto
+dispensa a conversão prévia (jsonable_encoder) feita pelo FastAPI.
+"""
+import json
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # Dependência opcional: sem ela, usa o json padrão
+    orjson = None
+
+
+def json_bytes(content) -> bytes:
+    """Serializa em JSON compacto (UTF-8), com orjson quando disponível."""
+    if orjson is None:
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse serializada com orjson (ou json da biblioteca padrão, se ausente)."""
+
+    def render(self, content) -> bytes:
+        return json_bytes(content)
@@ -0,0 +1,134 @@
+"""
+Verificação local de tokens JWT emitidos pelo Supabase Auth.
+
+Evita uma chamada de rede ao Supabase a cada requisição protegida:
+- Assinatura validada com o segredo JWT do projeto (HS256) ou com as
+  chaves públicas do endpoint JWKS (RS256/ES256), mantidas em cache
+- Claims obrigatórias: exp, aud e sub
+- Tokens já validados ficam em cache até expirarem (TTL curto)
+"""
+import hashlib
+import time
+import jwt
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import metrics
+
+# Algoritmos aceitos para chaves assimétricas publicadas no JWKS
+JWKS_ALGORITHMS = ["RS256", "ES256"]
+
+
+class JWTVerifier:
+    """
+    Valida tokens JWT localmente e retorna o ID do usuário (claim "sub").
+
+    Regra de Segurança (CRÍTICA):
+    - Com jwt_secret configurado, apenas HS256 é aceito
+    - Sem segredo, a chave é obtida do JWKS pelo "kid" do token
+    - Tokens sem exp, aud ou sub são rejeitados
+    """
+    def __init__(
+        self,
+        jwt_secret: str | None = None,
+        jwks_url: str | None = None,
+        audience: str = "authenticated",
+        jwks_refresh_seconds: float = 600.0,
+        cache: TTLCache | None = None,
+    ):
+        if not jwt_secret and not jwks_url:
+            raise ValueError("É necessário informar jwt_secret ou jwks_url.")
+
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.cache = cache if cache is not None else TTLCache()
+        self._jwks_client = None
+
+        if not jwt_secret:
+            self._jwks_client = jwt.PyJWKClient(
+                jwks_url,
+                cache_keys=True,
+                lifespan=jwks_refresh_seconds,
+            )
+
+    @property
+    def uses_jwks(self):
+        """Indica se a validação pode exigir busca de chaves no endpoint JWKS."""
+        return self._jwks_client is not None
+
+    def prefetch_keys(self):
+        """
+        Carrega as chaves do JWKS antecipadamente (aquecimento na inicialização).
+
+        Returns:
+            Quantidade de chaves carregadas (0 quando validado por segredo)
+        """
+        if self._jwks_client is None:
+            return 0
+
+        return len(self._jwks_client.get_signing_keys())
+
+    @staticmethod
+    def _cache_key(token: str):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token: str) -> str:
+        """
+        Valida o token e retorna o UUID do usuário.
+
+        Raises:
+            jwt.InvalidTokenError: Se assinatura, expiração ou claims forem inválidas
+        """
+        cache_key = self._cache_key(token)
+        user_id = self.cache.get(cache_key)
+        if user_id is not None:
+            return user_id
+
+        if self.jwt_secret:
+            key = self.jwt_secret
+            algorithms = ["HS256"]
+        else:
+            key = self._jwks_client.get_signing_key_from_jwt(token).key
+            algorithms = JWKS_ALGORITHMS
+
+        claims = jwt.decode(
+            token,
+            key,
+            algorithms=algorithms,
+            audience=self.audience,
+            options={"require": ["exp", "aud", "sub"]},
+        )
+
+        # Mantém em cache no máximo até a expiração do próprio token
+        self.cache.set(
+            cache_key,
+            claims["sub"],
+            ttl_seconds=min(self.cache.ttl_seconds, claims["exp"] - time.time()),
+        )
+
+        return claims["sub"]
+
+
+_verifier = None
+
+
+def get_jwt_verifier() -> JWTVerifier:
+    """
+    Retorna o verificador configurado a partir de Settings (criado sob demanda).
+    """
+    global _verifier
+
+    if _verifier is None:
+        _verifier = JWTVerifier(
+            jwt_secret=settings.SUPABASE_JWT_SECRET,
+            jwks_url=settings.SUPABASE_JWKS_URL
+            or f"{settings.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+            audience=settings.JWT_AUDIENCE,
+            jwks_refresh_seconds=settings.JWKS_REFRESH_SECONDS,
+            cache=TTLCache(
+                maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+                ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+            ),
+        )
+        metrics.register_cache("tokens", _verifier.cache)
+
+    return _verifier
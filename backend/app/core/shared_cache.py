@@ -0,0 +1,228 @@
+"""
+Cache compartilhado entre workers (protocolo Redis), opcional.
+
+Com vários workers do uvicorn, cada processo teria seu próprio índice da fila
+e seu próprio cache de perfis. Com REDIS_URL configurado, a fila ordenada, as
+posições e as prioridades dos pacientes ficam em uma estrutura única,
+calculada uma vez e lida por todos os workers.
+
+Estrutura (chaves com prefixo SHARED_CACHE_PREFIX):
+- queue:version: contador incrementado a cada alteração da fila
+- queue:loaded: marcador de que o snapshot atual está carregado
+- queue:positions: hash profile_id -> posição (1-indexed)
+- queue:waiting: fila de espera ordenada (JSON)
+- priority:<profile_id>: flag de prioridade do paciente ("1"/"0")
+- queue:calls: chamadas de pacientes recentes (sorted set por horário), usadas
+  no intervalo de polling sugerido
+- queue:events: canal (pub/sub) dos eventos da fila, repassados aos streams
+  (/queue/stream) conectados em todos os workers
+
+Regras:
+- Toda alteração da fila (check-in, cancelamento, chamada, finalização)
+  incrementa a versão e remove o snapshot
+- O snapshot só é gravado se a versão não mudou durante a leitura do banco
+  (WATCH/MULTI): uma leitura antiga nunca sobrescreve uma alteração mais nova
+- Todas as chaves expiram (limita o tempo de desatualização em qualquer caso)
+"""
+import json
+import uuid
+
+try:
+    from redis import asyncio as redis_asyncio
+    from redis.exceptions import WatchError
+except ImportError:  # Dependência opcional: necessária apenas com REDIS_URL
+    redis_asyncio = None
+    WatchError = None
+
+
+class SharedCache:
+    """
+    Fila ordenada e prioridades compartilhadas entre workers.
+
+    Args:
+        client: Cliente Redis assíncrono (redis.asyncio.Redis, decode_responses=True)
+        prefix: Prefixo das chaves
+        ttl_seconds: Expiração do snapshot da fila
+        priority_ttl_seconds: Expiração das prioridades dos pacientes
+    """
+    def __init__(
+        self,
+        client,
+        prefix: str = "jcs",
+        ttl_seconds: float = 30.0,
+        priority_ttl_seconds: float = 300.0,
+    ):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = max(1, int(ttl_seconds))
+        self.priority_ttl = max(1, int(priority_ttl_seconds))
+
+    def _key(self, *parts: str):
+        return ":".join((self.prefix, *parts))
+
+    async def ping(self):
+        """Verifica a conexão com o Redis (usado na inicialização)."""
+        return await self.client.ping()
+
+    # ----------------------------------------
+    # Fila
+    # ----------------------------------------
+    async def queue_version(self):
+        """Versão atual da fila; deve ser lida antes de consultar o banco."""
+        return await self.client.get(self._key("queue", "version"))
+
+    async def get_position(self, profile_id: str):
+        """
+        Consulta a posição no snapshot compartilhado.
+
+        Returns:
+            (carregado, posição): carregado=False indica que o snapshot precisa
+            ser reconstruído; posição None indica paciente fora da fila
+        """
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.exists(self._key("queue", "loaded"))
+            pipe.hget(self._key("queue", "positions"), profile_id)
+            loaded, position = await pipe.execute()
+
+        if not loaded:
+            return False, None
+
+        return True, int(position) if position is not None else None
+
+    async def get_ordered_waiting(self):
+        """Fila de espera ordenada do snapshot, ou None se não carregada."""
+        raw = await self.client.get(self._key("queue", "waiting"))
+        return json.loads(raw) if raw is not None else None
+
+    async def store_queue(self, entries: list, version):
+        """
+        Grava o snapshot da fila (já ordenada) e as prioridades dos pacientes.
+
+        Args:
+            entries: Entradas aguardando, na ordem de atendimento, com "priority"
+            version: Versão lida (queue_version) antes da consulta ao banco
+
+        Returns:
+            True se gravado; False se a fila mudou nesse meio tempo
+        """
+        version_key = self._key("queue", "version")
+        positions_key = self._key("queue", "positions")
+
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                await pipe.watch(version_key)
+                if await pipe.get(version_key) != version:
+                    return False
+
+                pipe.multi()
+                pipe.delete(positions_key)
+                if entries:
+                    pipe.hset(positions_key, mapping={
+                        entry["profile_id"]: rank for rank, entry in enumerate(entries, start=1)
+                    })
+                    pipe.expire(positions_key, self.ttl)
+                pipe.set(self._key("queue", "waiting"), json.dumps(entries), ex=self.ttl)
+                pipe.set(self._key("queue", "loaded"), "1", ex=self.ttl)
+                for entry in entries:
+                    pipe.set(
+                        self._key("priority", entry["profile_id"]),
+                        "1" if entry.get("priority") else "0",
+                        ex=self.priority_ttl,
+                    )
+                await pipe.execute()
+        except WatchError:
+            return False
+
+        return True
+
+    async def invalidate_queue(self):
+        """Marca a fila como alterada: nova versão e snapshot removido."""
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self._key("queue", "version"))
+            pipe.delete(
+                self._key("queue", "loaded"),
+                self._key("queue", "positions"),
+                self._key("queue", "waiting"),
+            )
+            await pipe.execute()
+
+    async def record_call(self, timestamp: float, window_seconds: float):
+        """Registra uma chamada de paciente e descarta as anteriores à janela."""
+        key = self._key("queue", "calls")
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zadd(key, {f"{timestamp}:{uuid.uuid4().hex[:8]}": timestamp})
+            pipe.zremrangebyscore(key, "-inf", timestamp - window_seconds)
+            pipe.expire(key, max(1, int(window_seconds)))
+            await pipe.execute()
+
+    async def count_calls(self, since: float):
+        """Quantidade de chamadas a partir de since (timestamp)."""
+        return await self.client.zcount(self._key("queue", "calls"), since, "+inf")
+
+    # ----------------------------------------
+    # Prioridades
+    # ----------------------------------------
+    async def get_priority(self, profile_id: str):
+        """Prioridade do paciente, ou None se não estiver em cache."""
+        value = await self.client.get(self._key("priority", profile_id))
+        return None if value is None else value == "1"
+
+    async def set_priority(self, profile_id: str, priority: bool):
+        await self.client.set(
+            self._key("priority", profile_id),
+            "1" if priority else "0",
+            ex=self.priority_ttl,
+        )
+
+    async def invalidate_priority(self, *profile_ids: str):
+        """Remove as prioridades dos pacientes informados (um único comando)."""
+        if profile_ids:
+            await self.client.delete(*(self._key("priority", profile_id) for profile_id in profile_ids))
+
+    # ----------------------------------------
+    # Eventos da fila (pub/sub)
+    # ----------------------------------------
+    async def publish_event(self, event: dict):
+        await self.client.publish(self._key("queue", "events"), json.dumps(event))
+
+    async def listen_events(self):
+        """Eventos publicados por qualquer worker, à medida que chegam (iterável assíncrono)."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self._key("queue", "events"))
+
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield json.loads(message["data"])
+        finally:
+            await pubsub.aclose()
+
+
+def create_shared_cache(
+    url: str | None,
+    prefix: str = "jcs",
+    ttl_seconds: float = 30.0,
+    priority_ttl_seconds: float = 300.0,
+):
+    """
+    Cria o cache compartilhado a partir da URL do Redis.
+
+    Returns:
+        SharedCache, ou None se nenhuma URL for informada (cache desabilitado)
+
+    Raises:
+        RuntimeError: Se a URL for informada sem o pacote redis instalado
+    """
+    if not url:
+        return None
+
+    if redis_asyncio is None:
+        raise RuntimeError("REDIS_URL configurado, mas o pacote 'redis' não está instalado.")
+
+    return SharedCache(
+        redis_asyncio.from_url(url, decode_responses=True),
+        prefix=prefix,
+        ttl_seconds=ttl_seconds,
+        priority_ttl_seconds=priority_ttl_seconds,
+    )
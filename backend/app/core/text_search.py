@@ -0,0 +1,152 @@
+"""
+Busca textual em memória (índice invertido) para o backend local.
+
+Equivalente offline da busca do Postgres (tsvector + índice GIN,
+database/migrations/004_search_records.sql), com a mesma forma de resultado:
+registros ordenados por relevância, com um trecho (snippet) destacando os termos.
+
+Regras:
+- Termos normalizados: minúsculos, sem acentos, sem stopwords
+- Todos os termos da busca devem aparecer no registro (E lógico); operadores
+  da busca web do Postgres (aspas, OR, -termo) não são interpretados
+- Relevância: soma das ocorrências de cada termo, ponderada pelo campo,
+  com os mesmos pesos do Postgres (A=1.0, B=0.4, C=0.2, D=0.1)
+- Sem stemming: "dores" não encontra "dor" (diferente do dicionário portuguese)
+- O índice é atualizado a cada inserção/alteração/remoção: a busca percorre
+  apenas as listas dos termos pesquisados, nunca a tabela inteira
+"""
+import heapq
+import re
+import unicodedata
+
+# Campos SOAP, na ordem em que compõem o texto do snippet
+SOAP_FIELDS = ("subjective", "objective_data", "assessment", "planning")
+
+# Peso de cada campo SOAP na relevância (setweight da migração)
+FIELD_WEIGHTS = {
+    "assessment": 1.0,       # A
+    "subjective": 0.4,       # B
+    "objective_data": 0.2,   # C
+    "planning": 0.2,         # C
+}
+
+# Palavras ignoradas na indexação e na busca
+STOPWORDS = frozenset({
+    "a", "ao", "aos", "as", "com", "da", "das", "de", "do", "dos", "e", "em",
+    "na", "nas", "no", "nos", "o", "os", "ou", "para", "pela", "pelo", "por",
+    "que", "se", "sem", "um", "uma",
+})
+
+# Marcadores do destaque no snippet (mesmos padrões do ts_headline)
+START_SEL = "<b>"
+STOP_SEL = "</b>"
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(word: str):
+    """Minúsculas e sem acentos (ex: "Cefaléia" -> "cefaleia")."""
+    decomposed = unicodedata.normalize("NFKD", word.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str | None):
+    """Termos indexáveis de um texto, na ordem em que aparecem."""
+    if not text:
+        return []
+
+    terms = (normalize(word) for word in WORD_PATTERN.findall(text))
+    return [term for term in terms if term not in STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Índice invertido dos campos SOAP: termo -> {id do registro: relevância}.
+
+    Mantém também as linhas indexadas (por id), usadas para filtros e snippets.
+    """
+    def __init__(self):
+        self._postings = {}
+        self._terms = {}
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, row: dict):
+        """Indexa (ou reindexa) um registro."""
+        self.remove(row["id"])
+
+        scores = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for term in tokenize(row.get(field)):
+                scores[term] = scores.get(term, 0.0) + weight
+
+        for term, score in scores.items():
+            self._postings.setdefault(term, {})[row["id"]] = score
+
+        self._terms[row["id"]] = tuple(scores)
+        self._rows[row["id"]] = row
+
+    def remove(self, row_id):
+        """Remove um registro do índice (sem efeito se não indexado)."""
+        for term in self._terms.pop(row_id, ()):
+            postings = self._postings[term]
+            postings.pop(row_id, None)
+            if not postings:
+                del self._postings[term]
+
+        self._rows.pop(row_id, None)
+
+    def search(self, query: str, limit: int, offset: int = 0, predicate=None):
+        """
+        Busca os registros que contêm todos os termos da consulta.
+
+        Args:
+            query: Texto da busca
+            limit: Quantidade máxima de resultados
+            offset: Resultados a pular (paginação)
+            predicate: Filtro adicional sobre a linha (ex: médico/paciente)
+
+        Returns:
+            Lista de (relevância, linha), da maior para a menor relevância
+            (empate: registro mais recente primeiro)
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        # Interseção a partir da menor lista de ocorrências
+        postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+        candidates = (
+            row_id for row_id in postings[0]
+            if all(row_id in other for other in postings[1:])
+        )
+
+        ranked = (
+            (sum(p[row_id] for p in postings), row_id)
+            for row_id in candidates
+            if predicate is None or predicate(self._rows[row_id])
+        )
+        page = heapq.nlargest(offset + limit, ranked)[offset:]
+
+        return [(rank, self._rows[row_id]) for rank, row_id in page]
+
+    @staticmethod
+    def snippet(row: dict, query: str, max_words: int = 20):
+        """
+        Trecho do registro em torno da primeira ocorrência de um termo buscado,
+        com os termos destacados (equivalente ao ts_headline).
+        """
+        terms = set(tokenize(query))
+        text = " ".join(row.get(field) or "" for field in SOAP_FIELDS)
+        words = text.split()
+
+        hits = [i for i, word in enumerate(words) if set(tokenize(word)) & terms]
+        start = max(0, hits[0] - max_words // 4) if hits else 0
+        window = words[start:start + max_words]
+
+        return " ".join(
+            f"{START_SEL}{word}{STOP_SEL}" if set(tokenize(word)) & terms else word
+            for word in window
+        )
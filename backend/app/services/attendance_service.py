@@ -1,6 +1,9 @@
-from datetime import datetime
-from zoneinfo import ZoneInfo
-from app.core.config import supabase
+from postgrest.exceptions import APIError
+from app.core.config import shared_cache, supabase
+from app.services.queue_events import queue_events
+from app.services.queue_index import queue_index
+from app.services.queue_service import queue_service
+from app.services.record_medical_service import record_reads
 
 
 class AttendanceService:
@@ -9,16 +12,17 @@ class AttendanceService:
     Implementa a lógica de criação de registros médicos usando metodologia SOAP.
     """
     def __init__(self):
-        self.records = supabase.table("RECORD_MEDICAL")
         self.queue = supabase.table("QUEUE")
 
-    def get_current_attendance(self, doctor_id: str):
+    async def get_current_attendance(self, doctor_id: str):
         """
         Retorna o atendimento ativo do médico.
         
         Regra de Negócio:
         - Um médico pode ter apenas um atendimento ativo por vez
         - Status deve ser "being_attended"
+        - Somente leitura: consultado por polling, não deve gerar escrita
+          (nem disparar o trigger update_queue_timestamp)
         
         Args:
             doctor_id: UUID do médico
@@ -26,31 +30,25 @@ class AttendanceService:
         Returns:
             Dados do atendimento ativo ou None se não houver
         """
-        response = (
+        response = await (
             self.queue
             .select("*")
             .eq("assigned_doctor_id", doctor_id)
-            .in_("status", ["being_attended"])
+            .eq("status", "being_attended")
+            .limit(1)
             .execute()
         )
 
-        entry = response.data[0] if response.data else None
-
-        if entry:
-            # Garante que o status está correto
-            self.queue.update({"status": "being_attended"}) \
-                .eq("id", entry["id"]) \
-                .execute()
-
-        return entry
+        return response.data[0] if response.data else None
 
-    def finish_attendance(
+    async def finish_attendance(
         self,
         doctor_id: str,
         subjective: str,
         objective_data: str,
         assessment: str,
-        planning: str
+        planning: str,
+        queue_entry_id: str | None = None
     ):
         """
         Finaliza um atendimento e cria o registro médico completo.
@@ -63,6 +61,12 @@ class AttendanceService:
         5. Remove o paciente da fila após criar o registro
         6. Data de início vem do check-in, data de fim é o momento atual
         
+        Transação (função finish_attendance no banco, uma única chamada):
+        - Criação do registro e remoção da fila são atômicas: uma falha não
+          deixa a entrada "being_attended" órfã nem registro duplicado
+        - Idempotente: repetir a chamada com o mesmo queue_entry_id após o
+          sucesso retorna o registro já criado
+        
         Metodologia SOAP:
         - Subjective: Dados subjetivos (queixas, histórico relatado pelo paciente)
         - Objective: Dados objetivos (sinais vitais, exames, observações clínicas)
@@ -75,6 +79,8 @@ class AttendanceService:
             objective_data: Dados objetivos (sinais vitais, exames)
             assessment: Avaliação e diagnóstico
             planning: Plano de tratamento
+            queue_entry_id: ID da entrada da fila sendo finalizada (opcional,
+                habilita a idempotência em retentativas)
             
         Returns:
             Registro médico criado
@@ -82,46 +88,42 @@ class AttendanceService:
         Raises:
             ValueError: Se não houver atendimento ativo
         """
-        # Busca atendimento ativo do médico
-        # Regra: Médico só pode finalizar seu próprio atendimento ativo
-        response = (
-            self.queue
-            .select("*")
-            .eq("assigned_doctor_id", doctor_id)
-            .eq("status", "being_attended")
-            .execute()
-        )
-
-        current = response.data[0] if response.data else None
-
-        # Validação: Deve existir atendimento ativo
-        if not current:
-            raise ValueError("Nenhum atendimento ativo encontrado.")
+        # Registro médico criado e paciente removido da fila em uma transação
+        # (database/migrations/002_finish_attendance.sql)
+        # Regra: Registro médico é permanente e não pode ser alterado após criação
+        try:
+            response = await supabase.rpc("finish_attendance", {
+                "p_doctor_id": doctor_id,
+                "p_subjective": subjective,  # SOAP: Subjective
+                "p_objective_data": objective_data,  # SOAP: Objective
+                "p_assessment": assessment,  # SOAP: Assessment
+                "p_planning": planning,  # SOAP: Planning
+                "p_queue_entry_id": queue_entry_id,
+            }).execute()
+        except APIError as e:
+            # P0002: nenhum atendimento ativo para o médico
+            if e.code == "P0002":
+                raise ValueError(e.message)
+            raise
+
+        record = response.data
 
-        # Timestamp de finalização no timezone de Fortaleza
-        now = datetime.now(ZoneInfo("America/Fortaleza")).isoformat()
+        # Regra: Após finalizar, o paciente não fica mais na fila
+        queue_index.remove(record["patient_id"])
 
-        # Criação do registro médico com metodologia SOAP
-        # Regra: Registro médico é permanente e não pode ser alterado após criação
-        record_data = {
-            "doctor_id": doctor_id,
-            "patient_id": current["profile_id"],
-            "started_at": current["checkin"],  # Data de início vem do check-in
-            "end_at": now,  # Data de fim é o momento atual
-            "subjective": subjective,  # SOAP: Subjective
-            "objective_data": objective_data,  # SOAP: Objective
-            "assessment": assessment,  # SOAP: Assessment
-            "planning": planning,  # SOAP: Planning
-        }
+        # Leituras em micro-cache (fila e registros) deixam de valer
+        queue_service.reads.invalidate()
+        record_reads.invalidate()
 
-        # Insere o registro médico no banco de dados
-        record = self.records.insert(record_data).execute().data[0]
+        if shared_cache is not None:
+            await shared_cache.invalidate_queue()
 
-        # Remove o paciente da fila após criar o registro
-        # Regra: Após finalizar, o paciente não fica mais na fila
-        self.queue.delete().eq("id", current["id"]).execute()
+        queue_events.publish({
+            "type": "finished",
+            "profile_id": record["patient_id"],
+            "doctor_id": doctor_id
+        })
 
         return record
 
-
 attendance_service = AttendanceService()
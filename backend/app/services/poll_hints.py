@@ -0,0 +1,93 @@
+"""
+Intervalo sugerido de polling de /queue/position.
+
+O intervalo é calculado a partir da posição do paciente e do ritmo recente de
+chamadas (advance_queue): quem está longe do início consulta raramente, quem
+está perto consulta com frequência.
+
+Regras:
+- Espera estimada = (posição - 1) / ritmo de chamadas
+- Intervalo = POLL_WAIT_FRACTION da espera estimada, limitado a
+  [POLL_MIN_SECONDS, POLL_MAX_SECONDS]
+- O 1º da fila sempre consulta no intervalo mínimo
+- Sem chamadas na janela (ex: logo após a inicialização), o ritmo assumido é
+  POLL_FALLBACK_CALLS_PER_MINUTE
+- Com cache compartilhado (REDIS_URL), o ritmo considera as chamadas de todos
+  os workers; sem ele, apenas as do próprio worker
+"""
+import threading
+import time
+from collections import deque
+from app.core.config import settings, shared_cache
+
+
+class CallRate:
+    """
+    Ritmo de chamadas de pacientes em uma janela deslizante.
+
+    Args:
+        window_seconds: Tamanho da janela considerada
+    """
+    def __init__(self, window_seconds: float = 900.0):
+        self.window_seconds = window_seconds
+        self.started_at = time.time()
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        while self._calls and self._calls[0] <= now - self.window_seconds:
+            self._calls.popleft()
+
+    async def record(self, now: float | None = None):
+        """Registra uma chamada de paciente."""
+        now = time.time() if now is None else now
+
+        if shared_cache is not None:
+            await shared_cache.record_call(now, self.window_seconds)
+            return
+
+        with self._lock:
+            self._calls.append(now)
+            self._trim(now)
+
+    async def per_second(self, now: float | None = None):
+        """
+        Chamadas por segundo na janela, ou None se não houver chamadas.
+        Logo após a inicialização, divide pelo tempo decorrido (não pela janela inteira).
+        """
+        now = time.time() if now is None else now
+
+        if shared_cache is not None:
+            count = await shared_cache.count_calls(now - self.window_seconds)
+            elapsed = self.window_seconds
+        else:
+            with self._lock:
+                self._trim(now)
+                count = len(self._calls)
+            elapsed = min(self.window_seconds, now - self.started_at)
+
+        if not count:
+            return None
+
+        return count / max(elapsed, 1.0)
+
+
+def poll_interval(position: int | None, calls_per_second: float | None):
+    """
+    Intervalo (segundos) até a próxima consulta de posição.
+
+    Args:
+        position: Posição na fila (None = fora da fila ou em atendimento)
+        calls_per_second: Ritmo recente de chamadas (None = desconhecido)
+    """
+    if position is None:
+        return int(settings.POLL_MAX_SECONDS)
+
+    rate = calls_per_second or settings.POLL_FALLBACK_CALLS_PER_MINUTE / 60
+    expected_wait = (position - 1) / rate
+    interval = expected_wait * settings.POLL_WAIT_FRACTION
+
+    return int(min(settings.POLL_MAX_SECONDS, max(settings.POLL_MIN_SECONDS, interval)))
+
+
+call_rate = CallRate(window_seconds=settings.POLL_RATE_WINDOW_SECONDS)
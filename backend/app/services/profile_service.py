@@ -1,4 +1,27 @@
-from app.core.config import supabase
+from datetime import date
+from app.core.bulk_import import check_columns, import_rows, insert_batch, parse_bool, parse_uuid
+from app.core.cache import TTLCache
+from app.core.config import settings, shared_cache, supabase
+from app.core.metrics import metrics
+from app.core.pagination import apply_keyset, parse_fields
+
+# Colunas da tabela PROFILES disponíveis para projeção (?fields=)
+PROFILE_COLUMNS = (
+    "id", "full_name", "document_number", "date_of_birth", "gender",
+    "mom_full_name", "address", "nationality", "priority", "role",
+    "inserted_at", "updated_at",
+)
+
+# Ordenação da listagem paginada: (inserted_at, id)
+PROFILE_SORT_COLUMN = "inserted_at"
+
+# Colunas aceitas na importação em lote (timestamps são preenchidos pelo banco)
+PROFILE_IMPORT_COLUMNS = tuple(
+    column for column in PROFILE_COLUMNS if column not in ("inserted_at", "updated_at")
+)
+
+# Papéis de usuário (direcionam o dashboard no frontend)
+PROFILE_ROLES = ("patient", "doctor", "admin")
 
 class ProfileService:
     """
@@ -8,21 +31,62 @@ class ProfileService:
     def __init__(self):
         self.table = supabase.table('PROFILES')
 
-    def get_all_profiles(self):
+        # Cache de leitura (LRU + TTL): perfis mudam raramente e são lidos a
+        # cada /profiles/me, /profiles/{id} e na priorização da fila.
+        # Escritas feitas pela API invalidam o cache deste worker (e o
+        # compartilhado); nos demais workers, e para alterações feitas fora da
+        # API (ex: painel do Supabase), a defasagem máxima é o TTL
+        # (PROFILE_CACHE_TTL_SECONDS)
+        self.cache = TTLCache(
+            maxsize=settings.PROFILE_CACHE_MAX_SIZE,
+            ttl_seconds=settings.PROFILE_CACHE_TTL_SECONDS
+        )
+        metrics.register_cache("profiles", self.cache)
+
+    async def get_all_profiles(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: str | None = None
+    ):
         """
-        Retorna todos os perfis cadastrados no sistema.
+        Retorna uma página dos perfis cadastrados no sistema.
         Utilizado para listagem geral (ex: dashboard de admin).
+        
+        Regra de Negócio:
+        - Paginação por cursor (keyset) em (inserted_at, id)
+        - Tamanho da página limitado (padrão LIST_DEFAULT_LIMIT)
+        - "fields" restringe as colunas retornadas
+        
+        Args:
+            limit: Quantidade máxima de perfis na página
+            cursor: Cursor da página anterior (None = primeira página)
+            fields: Colunas desejadas, separadas por vírgula (None = todas)
+            
+        Raises:
+            ValueError: Se o cursor ou os campos forem inválidos
         """
-        response = self.table.select("*").execute()
+        query = self.table.select(parse_fields(fields, PROFILE_COLUMNS, PROFILE_SORT_COLUMN))
+        query = apply_keyset(
+            query,
+            PROFILE_SORT_COLUMN,
+            cursor,
+            limit or settings.LIST_DEFAULT_LIMIT
+        )
+
+        response = await query.execute()
         return response.data
     
-    def get_profile(self, profile_id: str):
+    async def get_profile(self, profile_id: str):
         """
         Busca um perfil específico por ID.
         
         Regra de Negócio:
         - Perfil deve existir no banco de dados
         - ID é obrigatório (validação)
+        - Leitura via cache (read-through): o banco só é consultado em caso de
+          falta ou expiração do item
+        - Retorna uma cópia: alterações do chamador não afetam o cache
         
         Args:
             profile_id: UUID do perfil
@@ -37,7 +101,15 @@ class ProfileService:
         if not profile_id:
             raise ValueError("profile_id is required")
 
-        response = (
+        profile = self.cache.get(profile_id)
+        if profile is not None:
+            return dict(profile)
+
+        return await self._fetch_profile(profile_id)
+
+    async def _fetch_profile(self, profile_id: str):
+        """Busca o perfil no banco e o armazena no cache."""
+        response = await (
             self.table
             .select("*")
             .eq("id", profile_id)
@@ -45,7 +117,135 @@ class ProfileService:
             .execute()
         )
 
-        return response.data
+        if not response.data:
+            return response.data
+
+        self.cache.set(profile_id, response.data)
+        return dict(response.data)
+
+    async def get_priority(self, profile_id: str):
+        """
+        Retorna a flag de prioridade do paciente (usada na ordenação da fila).
+        
+        Ordem de consulta: cache de perfis do worker, cache compartilhado
+        (REDIS_URL) e, por fim, o banco.
+        """
+        profile = self.cache.get(profile_id)
+        if profile is not None:
+            return bool(profile.get("priority"))
+
+        if shared_cache is None:
+            profile = await self._fetch_profile(profile_id)
+            return bool(profile and profile.get("priority"))
+
+        priority = await shared_cache.get_priority(profile_id)
+        if priority is None:
+            profile = await self._fetch_profile(profile_id)
+            priority = bool(profile and profile.get("priority"))
+            await shared_cache.set_priority(profile_id, priority)
+
+        return priority
+
+    async def warm_cache(self, profile_ids: list, batch_size: int = 200):
+        """
+        Carrega no cache, em lote, os perfis informados (ex: pacientes da fila).
+        Executado na inicialização: a priorização dos primeiros check-ins não
+        precisa ir ao banco a cada paciente.
+        
+        Returns:
+            Quantidade de perfis carregados
+        """
+        ids = list(dict.fromkeys(profile_ids))
+        loaded = 0
+
+        for start in range(0, len(ids), batch_size):
+            response = await (
+                self.table
+                .select("*")
+                .in_("id", ids[start:start + batch_size])
+                .execute()
+            )
+            for profile in response.data or []:
+                self.cache.set(profile["id"], profile)
+                loaded += 1
+
+        return loaded
+
+    async def import_profiles(self, rows):
+        """
+        Importa perfis em lote (onboarding de clínicas).
+        
+        Regra de Negócio:
+        - id é obrigatório (UUID do usuário em auth.users) e não pode se repetir
+        - role, se informado, deve ser patient, doctor ou admin
+        - priority ausente é gravado como false
+        - Perfis já existentes não são alterados: a linha é reportada com erro
+        - Gravação em lotes de IMPORT_BATCH_SIZE linhas (uma inserção por lote)
+        - Perfis gravados são removidos dos caches (ex: prioridade "false"
+          registrada para um id consultado antes de o perfil existir)
+        
+        Args:
+            rows: Linhas do arquivo (bulk_import.iter_rows)
+            
+        Returns:
+            ImportReport com o resultado por linha
+        """
+        seen = set()
+
+        def validate(row: dict):
+            check_columns(row, PROFILE_IMPORT_COLUMNS)
+            profile = {column: row.get(column) for column in PROFILE_IMPORT_COLUMNS}
+
+            profile["id"] = parse_uuid(profile["id"], "id")
+            if profile["id"] in seen:
+                raise ValueError(f"id repetido no arquivo: {profile['id']}")
+
+            profile["priority"] = bool(parse_bool(profile["priority"]))
+
+            if profile["role"] is not None and profile["role"] not in PROFILE_ROLES:
+                raise ValueError(f"role inválido: {profile['role']}. Use: {', '.join(PROFILE_ROLES)}")
+
+            if profile["date_of_birth"] is not None:
+                try:
+                    profile["date_of_birth"] = date.fromisoformat(str(profile["date_of_birth"])).isoformat()
+                except ValueError:
+                    raise ValueError(f"date_of_birth inválido: {profile['date_of_birth']}")
+
+            for column in ("full_name", "document_number", "gender", "mom_full_name", "address", "nationality"):
+                if profile[column] is not None and not isinstance(profile[column], str):
+                    profile[column] = str(profile[column])
+
+            seen.add(profile["id"])
+            return profile
+
+        async def write(batch: list):
+            inserted, errors = await insert_batch(self.table, batch)
+            await self.invalidate_profiles([profile["id"] for profile in inserted])
+            return errors
+
+        return await import_rows(
+            rows,
+            validate,
+            write,
+            batch_size=settings.IMPORT_BATCH_SIZE,
+            max_errors=settings.IMPORT_MAX_ERRORS
+        )
+
+    async def invalidate_profiles(self, profile_ids: list):
+        """
+        Remove perfis do cache do worker e suas prioridades do cache
+        compartilhado (REDIS_URL).
+        Deve ser chamado sempre que perfis forem gravados (ex: prioridade, papel).
+        """
+        for profile_id in profile_ids:
+            self.cache.invalidate(profile_id)
+
+        if shared_cache is not None and profile_ids:
+            await shared_cache.invalidate_priority(*profile_ids)
+
+    def clear_cache(self):
+        """Remove todos os perfis do cache."""
+        self.cache.clear()
 
         
 profile_service = ProfileService()
\ No newline at end of file
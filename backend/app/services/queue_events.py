@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import uuid
+
+
+class QueueEventBroker:
+    """
+    Distribui eventos de alteração da fila para os clientes conectados via stream.
+
+    Eventos publicados pelos serviços:
+    - {"type": "checkin", "profile_id": ...}: paciente entrou na fila
+    - {"type": "cancel", "profile_id": ...}: paciente cancelou o check-in
+    - {"type": "called", "profile_id": ..., "doctor_id": ...}: paciente chamado
+    - {"type": "finished", "profile_id": ..., "doctor_id": ...}: atendimento finalizado
+    - {"type": "import", "count": ...}: check-ins importados em lote
+
+    Os serviços publicam a partir do event loop do worker; cada assinante
+    (stream conectado) recebe os eventos no seu próprio event loop, por isso a
+    entrega é agendada com call_soon_threadsafe (publish pode ser chamado de
+    qualquer thread ou loop).
+
+    Vários workers: cada processo tem o seu broker. Com cache compartilhado
+    (REDIS_URL), os eventos também são publicados no canal queue:events e
+    relay() (executado em background no ciclo de vida da aplicação) entrega
+    aos assinantes deste worker os eventos dos demais, marcados com
+    "remote": True. Sem REDIS_URL, o stream só recebe os eventos do próprio
+    worker: execute a API com um único worker, ou os streams dependem do
+    keep-alive (QUEUE_STREAM_KEEPALIVE_SECONDS) para refletir alterações
+    feitas em outros workers.
+    """
+    def __init__(self, max_pending: int = 100):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        # Identifica os eventos deste worker no canal compartilhado
+        self.origin = uuid.uuid4().hex
+        self._relay = None
+        self._pending_relays = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """Registra um assinante no event loop atual e retorna sua fila de eventos."""
+        queue = asyncio.Queue(maxsize=self.max_pending)
+
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """Remove o assinante dono da fila informada."""
+        with self._lock:
+            self._subscribers = {sub for sub in self._subscribers if sub[1] is not queue}
+
+    def publish(self, event: dict):
+        """
+        Envia o evento para os assinantes deste worker e, com relay() ativo,
+        para os demais workers.
+        """
+        self._dispatch(event)
+
+        if self._relay is None:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+
+        task = loop.create_task(self._relay.publish_event({**event, "origin": self.origin}))
+        self._pending_relays.add(task)
+        task.add_done_callback(self._relay_done)
+
+    def _relay_done(self, task: asyncio.Task):
+        self._pending_relays.discard(task)
+        if not task.cancelled():
+            # Falha no Redis: os demais workers se atualizam pelo keep-alive
+            task.exception()
+
+    async def relay(self, shared_cache):
+        """
+        Repassa aos assinantes deste worker os eventos publicados pelos demais
+        no cache compartilhado. Executa até ser cancelado.
+        """
+        self._relay = shared_cache
+
+        try:
+            async for event in shared_cache.listen_events():
+                if event.pop("origin", None) == self.origin:
+                    continue
+                self._dispatch({**event, "remote": True})
+        finally:
+            self._relay = None
+
+    def _dispatch(self, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Event loop já encerrado: assinante será removido ao desconectar
+                pass
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: dict):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Assinante lento: o próximo evento recalcula o estado completo
+            pass
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+queue_events = QueueEventBroker()
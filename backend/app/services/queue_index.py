@@ -0,0 +1,102 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from app.core.config import settings
+
+
+class QueueIndex:
+    """
+    Índice em memória da fila de espera, mantido de forma incremental.
+
+    Regra de Negócio (CRÍTICA):
+    - A ordem é a mesma da fila no banco: prioritários primeiro e, dentro de
+      cada grupo, por horário de check-in (mais antigo primeiro)
+
+    Estrutura:
+    - Lista ordenada de chaves (not priority, checkin, id)
+    - Mapa profile_id -> chave, permitindo calcular a posição via busca binária
+
+    Consultas de posição custam O(log n) em memória, sem acessar o banco.
+    O índice é reconstruído a partir da tabela QUEUE na inicialização, sempre
+    que ficar mais velho que max_age_seconds (cobre alterações feitas por
+    outros processos/workers) e quando um paciente consultado não está nele
+    (check-in feito em outro worker; ver QueueService.get_position).
+    """
+    def __init__(self, max_age_seconds: float = 30.0):
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._keys = []
+        self._by_profile = {}
+        self._loaded_at = None
+
+    @staticmethod
+    def _make_key(entry: dict):
+        """Monta a chave de ordenação (not priority, checkin, id) de uma entrada."""
+        checkin = entry["checkin"]
+        if isinstance(checkin, str):
+            checkin = datetime.fromisoformat(checkin)
+
+        return (not entry.get("priority", False), checkin, str(entry["id"]))
+
+    def is_stale(self):
+        """Indica se o índice nunca foi carregado ou passou do tempo máximo."""
+        if self._loaded_at is None:
+            return True
+
+        return time.monotonic() - self._loaded_at > self.max_age_seconds
+
+    def rebuild(self, entries: list):
+        """
+        Substitui todo o conteúdo do índice pelas entradas informadas.
+
+        Args:
+            entries: Entradas da fila com status "waiting" e campo "priority"
+        """
+        by_profile = {entry["profile_id"]: self._make_key(entry) for entry in entries}
+        keys = sorted(by_profile.values())
+
+        with self._lock:
+            self._keys = keys
+            self._by_profile = by_profile
+            self._loaded_at = time.monotonic()
+
+    def add(self, entry: dict):
+        """Insere (ou reposiciona) uma entrada de check-in no índice."""
+        key = self._make_key(entry)
+
+        with self._lock:
+            self._discard(entry["profile_id"])
+            self._by_profile[entry["profile_id"]] = key
+            insort(self._keys, key)
+
+    def remove(self, profile_id: str):
+        """Remove o paciente do índice, se presente."""
+        with self._lock:
+            self._discard(profile_id)
+
+    def _discard(self, profile_id: str):
+        key = self._by_profile.pop(profile_id, None)
+        if key is None:
+            return
+
+        i = bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            del self._keys[i]
+
+    def position(self, profile_id: str):
+        """
+        Retorna a posição do paciente na fila (1-indexed) ou None se ausente.
+        """
+        with self._lock:
+            key = self._by_profile.get(profile_id)
+            if key is None:
+                return None
+
+            return bisect_left(self._keys, key) + 1
+
+    def __len__(self):
+        return len(self._keys)
+
+
+queue_index = QueueIndex(max_age_seconds=settings.QUEUE_INDEX_MAX_AGE_SECONDS)
@@ -1,7 +1,29 @@
 
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from app.core.config import supabase
+from app.core.bulk_import import check_columns, import_rows, insert_batch, parse_uuid
+from app.core.cache import MicroCache
+from app.core.config import settings, shared_cache, supabase
+from app.core.metrics import metrics
+from app.services.poll_hints import call_rate
+from app.services.queue_events import queue_events
+from app.services.profile_service import profile_service
+from app.services.queue_index import queue_index
+
+# Seleção da fila com a prioridade do paciente embutida (join com PROFILES).
+# A tabela QUEUE possui duas FKs para PROFILES (paciente e médico), por isso
+# o relacionamento é desambiguado pela coluna profile_id e recebe o alias "patient".
+ORDERED_WAITING_SELECT = "*, patient:PROFILES!profile_id(priority)"
+
+# Resumo do perfil do paciente exibido no painel da fila (/queue/ordered)
+PATIENT_SUMMARY_COLUMNS = "full_name, document_number, date_of_birth, gender, priority"
+ORDERED_QUEUE_SELECT = f"*, patient:PROFILES!profile_id({PATIENT_SUMMARY_COLUMNS})"
+
+# Colunas aceitas na importação de check-ins pré-agendados
+QUEUE_IMPORT_COLUMNS = ("profile_id", "checkin")
+
+# Timezone do sistema (check-ins sem timezone são interpretados nele)
+FORTALEZA = ZoneInfo("America/Fortaleza")
 
 class QueueService:
     """
@@ -11,15 +33,106 @@ class QueueService:
     def __init__(self):
         self.table = supabase.table('QUEUE')
 
-    def get_queue(self):
+        # Leitura pública consultada em polling por painéis e salas de espera:
+        # requisições simultâneas compartilham a mesma consulta (micro-cache)
+        self.reads = MicroCache(ttl_seconds=settings.READ_CACHE_TTL_SECONDS)
+        metrics.register_cache("queue_reads", self.reads)
+
+    async def get_queue(self):
         """
         Retorna toda a fila de atendimento sem filtros.
         Utilizado para visualização geral da fila.
+        
+        Regra: Leituras simultâneas compartilham uma única consulta, e o
+        resultado é reaproveitado por READ_CACHE_TTL_SECONDS (invalidado a cada
+        alteração da fila feita por este worker)
         """
-        response = self.table.select("*").execute()
+        return await self.reads.get_or_load("queue", self._fetch_queue)
+
+    async def _fetch_queue(self):
+        response = await self.table.select("*").execute()
         return response.data
+
+    async def get_ordered_waiting(self, limit: int | None = None):
+        """
+        Retorna os pacientes aguardando já ordenados pela regra de priorização.
+        
+        Regra de Negócio (CRÍTICA):
+        - Pacientes com priority=True vêm primeiro
+        - Dentro de cada grupo, ordenação é por horário de check-in (mais antigo primeiro)
+        
+        A ordenação é feita pelo banco em uma única requisição, com a prioridade
+        obtida via join com PROFILES (evita uma consulta de perfil por paciente).
+        
+        Args:
+            limit: Quantidade máxima de entradas retornadas (None = todas)
+            
+        Returns:
+            Lista de entradas da fila ordenadas, cada uma com o campo "priority"
+        """
+        query = self._ordered_waiting_query(ORDERED_WAITING_SELECT)
+
+        if limit is not None:
+            query = query.limit(limit)
+
+        entries = (await query.execute()).data or []
+
+        # Achata o perfil embutido: {"patient": {"priority": ...}} -> {"priority": ...}
+        for entry in entries:
+            patient = entry.pop("patient", None) or {}
+            entry["priority"] = bool(patient.get("priority"))
+
+        return entries
+
+    async def get_ordered_queue(self):
+        """
+        Retorna a fila de espera completa para o painel de médicos/admin.
+        
+        Regra de Negócio (CRÍTICA):
+        - Mesma ordenação da chamada de pacientes: prioritários primeiro e,
+          dentro de cada grupo, por horário de check-in
+        
+        Cada entrada inclui, calculados em uma única passada:
+        - rank: posição na fila (1-indexed)
+        - wait_seconds: tempo de espera desde o check-in
+        - priority: flag de prioridade do paciente
+        - patient: resumo do perfil (nome, documento, nascimento, gênero)
+        
+        Uma única consulta ao banco substitui as consultas de posição e de
+        perfil por paciente; o resultado também atualiza o índice em memória.
+        
+        Returns:
+            Lista de entradas da fila ordenadas
+        """
+        entries = (await self._ordered_waiting_query(ORDERED_QUEUE_SELECT).execute()).data or []
+
+        now = datetime.now(FORTALEZA)
+
+        for rank, entry in enumerate(entries, start=1):
+            patient = entry.get("patient") or {}
+            checkin = datetime.fromisoformat(entry["checkin"])
+
+            entry["rank"] = rank
+            entry["wait_seconds"] = max(0, int((now - checkin).total_seconds()))
+            entry["priority"] = bool(patient.pop("priority", False))
+            entry["patient"] = patient or None
+
+        # Aproveita a leitura completa para renovar o índice de posições
+        queue_index.rebuild(entries)
+
+        return entries
+
+    def _ordered_waiting_query(self, columns: str):
+        """Consulta dos pacientes aguardando na ordem de atendimento."""
+        return (
+            self.table
+            .select(columns)
+            .eq("status", "waiting")
+            .order("patient(priority)", desc=True, nullsfirst=False)
+            .order("checkin", desc=False)
+        )
     
-    def checkin_queue(self, profile_id: str):
+    async def checkin_queue(self, profile_id: str):
         """
         Realiza o check-in do paciente na fila de atendimento.
         
@@ -35,7 +148,7 @@ class QueueService:
             Dados do check-in criado
         """
         # Timezone configurado para Fortaleza (UTC-3) conforme requisito do sistema
-        now_fortaleza = datetime.now(ZoneInfo("America/Fortaleza"))
+        now_fortaleza = datetime.now(FORTALEZA)
 
         insert_data = {
             "profile_id": profile_id,
@@ -44,10 +157,112 @@ class QueueService:
             "assigned_doctor_id": None
         }
 
-        response = self.table.insert(insert_data).execute()
+        response = await self.table.insert(insert_data).execute()
+
+        # Mantém o índice em memória atualizado com o novo check-in
+        # (prioridade obtida do cache de perfis)
+        is_priority = await profile_service.get_priority(profile_id)
+
+        for entry in response.data or []:
+            queue_index.add({**entry, "priority": is_priority})
+
+        await self._invalidate_shared()
+        queue_events.publish({"type": "checkin", "profile_id": profile_id})
+
         return response.data
     
-    def cancel_checkin(self, profile_id: str):
+    async def import_checkins(self, rows):
+        """
+        Importa check-ins pré-agendados em lote (ex: consultas do dia).
+        
+        Regra de Negócio:
+        - profile_id é obrigatório e deve ser de um perfil existente
+        - Paciente já presente na fila (aguardando ou em atendimento) não
+          recebe novo check-in, assim como paciente repetido no arquivo
+        - checkin opcional (ISO 8601); sem timezone, é interpretado no timezone
+          de Fortaleza; ausente, é o horário atual
+        - Status inicial é sempre "waiting", sem médico atribuído
+        - A priorização segue a regra da fila (prioridade do perfil + check-in)
+        - Por lote: uma consulta de perfis, uma consulta da fila e uma inserção
+        
+        Args:
+            rows: Linhas do arquivo (bulk_import.iter_rows)
+            
+        Returns:
+            ImportReport com o resultado por linha
+        """
+        seen = set()
+
+        def validate(row: dict):
+            check_columns(row, QUEUE_IMPORT_COLUMNS)
+
+            profile_id = parse_uuid(row.get("profile_id"), "profile_id")
+            if profile_id in seen:
+                raise ValueError(f"profile_id repetido no arquivo: {profile_id}")
+
+            checkin = row.get("checkin")
+            if checkin is None:
+                checkin = datetime.now(FORTALEZA)
+            else:
+                try:
+                    checkin = datetime.fromisoformat(str(checkin))
+                except ValueError:
+                    raise ValueError(f"checkin inválido: {checkin}")
+                if checkin.tzinfo is None:
+                    checkin = checkin.replace(tzinfo=FORTALEZA)
+
+            seen.add(profile_id)
+            return {
+                "profile_id": profile_id,
+                "checkin": checkin.isoformat(),
+                "status": "waiting",
+                "assigned_doctor_id": None
+            }
+
+        async def write(batch: list):
+            ids = [entry["profile_id"] for entry in batch]
+
+            profiles = await profile_service.table.select("id, priority").in_("id", ids).execute()
+            priorities = {profile["id"]: bool(profile.get("priority")) for profile in profiles.data or []}
+
+            active = await self.table.select("profile_id").in_("profile_id", ids).execute()
+            in_queue = {entry["profile_id"] for entry in active.data or []}
+
+            errors = {}
+            for profile_id in ids:
+                if profile_id not in priorities:
+                    errors[profile_id] = "Perfil não encontrado"
+                elif profile_id in in_queue:
+                    errors[profile_id] = "Paciente já está na fila"
+
+            valid = [entry for entry in batch if entry["profile_id"] not in errors]
+            inserted, insert_errors = await insert_batch(self.table, valid)
+            errors.update({
+                entry["profile_id"]: error
+                for entry, error in zip(valid, insert_errors) if error is not None
+            })
+
+            # Mantém o índice em memória atualizado com os novos check-ins
+            for entry in inserted:
+                queue_index.add({**entry, "priority": priorities[entry["profile_id"]]})
+
+            return [errors.get(profile_id) for profile_id in ids]
+
+        report = await import_rows(
+            rows,
+            validate,
+            write,
+            batch_size=settings.IMPORT_BATCH_SIZE,
+            max_errors=settings.IMPORT_MAX_ERRORS
+        )
+
+        if report.imported:
+            await self._invalidate_shared()
+            queue_events.publish({"type": "import", "count": report.imported})
+
+        return report
+
+    async def cancel_checkin(self, profile_id: str):
         """
         Cancela o check-in do paciente, removendo-o da fila.
         
@@ -61,10 +276,18 @@ class QueueService:
         Returns:
             Dados do check-in removido
         """
-        response = self.table.delete().eq("profile_id", profile_id).execute()
+        response = await self.table.delete().eq("profile_id", profile_id).execute()
+
+        # Remove o paciente do índice em memória
+        queue_index.remove(profile_id)
+
+        if response.data:
+            await self._invalidate_shared()
+            queue_events.publish({"type": "cancel", "profile_id": profile_id})
+
         return response.data
     
-    def get_position(self, profile_id: str):
+    async def get_position(self, profile_id: str):
         """
         Calcula a posição do paciente na fila considerando priorização.
         
@@ -74,10 +297,15 @@ class QueueService:
         3. A posição retornada é 1-indexed (primeira posição = 1)
         
         Algoritmo:
-        - Separa pacientes em dois grupos: prioritários e normais
-        - Ordena cada grupo por horário de check-in (mais antigo primeiro)
-        - Concatena: [prioritários ordenados] + [normais ordenados]
-        - Encontra a posição do paciente na fila ordenada
+        - Com cache compartilhado (REDIS_URL): consulta as posições
+          pré-calculadas, comuns a todos os workers; o snapshot é refeito a
+          partir do banco apenas após alterações da fila
+        - Sem cache compartilhado: consulta o índice em memória da fila
+          (QueueIndex), ordenado por prioridade e check-in, com busca binária
+          O(log n); o índice é recarregado do banco quando expira ou quando o
+          paciente não está nele (check-in feito em outro worker). Recargas
+          por ausência são compartilhadas: requisições simultâneas e as
+          seguintes, por READ_CACHE_TTL_SECONDS, usam a mesma consulta
         
         Args:
             profile_id: UUID do perfil do paciente
@@ -85,56 +313,65 @@ class QueueService:
         Returns:
             Posição na fila (1-indexed) ou None se não estiver na fila
         """
-        # Busca apenas pacientes aguardando (status = "waiting")
-        queue_response = self.table.select("*").eq("status", "waiting").execute()
-        queue = queue_response.data
+        if shared_cache is not None:
+            loaded, position = await shared_cache.get_position(profile_id)
+            if loaded:
+                return position
 
-        # Verifica se o paciente está na fila
-        user_entry = next((item for item in queue if item["profile_id"] == profile_id), None)
-        if not user_entry:
-            return None
+            await self.rebuild_index()
 
-        # Valida se o perfil existe
-        profile = supabase.table("PROFILES").select("*").eq("id", profile_id).execute().data
+        # Recarrega o índice a partir do banco apenas se estiver desatualizado
+        elif queue_index.is_stale():
+            await self.rebuild_index()
 
-        if not profile:
-            raise ValueError("Perfil não encontrado.")
+        # Consulta em memória: posição 1-indexed (primeira posição = 1, não 0)
+        position = queue_index.position(profile_id)
 
-        # Separação em grupos: prioritários e normais
-        priorities = []
-        normals = []
+        if position is None and shared_cache is None:
+            # Ausente no índice deste worker: o check-in pode ter sido feito em outro
+            await self.reads.get_or_load("queue_index", self.rebuild_index)
+            position = queue_index.position(profile_id)
 
-        # Itera sobre a fila e separa pacientes por prioridade
-        for item in queue:
-            p = supabase.table("PROFILES").select("priority").eq("id", item["profile_id"]).execute().data
-            is_priority = p[0]["priority"] if p else False
+        return position
 
-            if is_priority:
-                priorities.append(item)
-            else:
-                normals.append(item)
+    async def rebuild_index(self):
+        """
+        Reconstrói o índice em memória da fila a partir da tabela QUEUE.
+        Executado na inicialização da aplicação e quando o índice expira.
+        
+        Com cache compartilhado, reaproveita o snapshot já calculado por outro
+        worker; se não houver, consulta o banco e publica o novo snapshot.
+        
+        Returns:
+            Entradas aguardando, na ordem de atendimento
+        """
+        entries = None
 
-        # Ordena cada grupo por horário de check-in (mais antigo primeiro)
-        priorities.sort(key=lambda x: x["checkin"])
-        normals.sort(key=lambda x: x["checkin"])
+        if shared_cache is not None:
+            entries = await shared_cache.get_ordered_waiting()
 
-        # Fila ordenada: prioritários primeiro, depois normais
-        ordered_queue = priorities + normals
+            if entries is None:
+                # Versão lida antes da consulta: o snapshot não é gravado se
+                # a fila mudar enquanto o banco é consultado
+                version = await shared_cache.queue_version()
+                entries = await self.get_ordered_waiting()
+                await shared_cache.store_queue(entries, version)
 
-        # Encontra a posição do paciente na fila ordenada
-        position = next(
-            (i for i, item in enumerate(ordered_queue) if item["profile_id"] == profile_id),
-            None
-        )
+        if entries is None:
+            entries = await self.get_ordered_waiting()
 
-        if position is None:
-            return None
+        queue_index.rebuild(entries)
+        return entries
 
-        # Retorna posição 1-indexed (primeira posição = 1, não 0)
-        return position + 1
+    async def _invalidate_shared(self):
+        """Invalida o micro-cache e o snapshot compartilhado da fila após uma alteração."""
+        self.reads.invalidate()
+
+        if shared_cache is not None:
+            await shared_cache.invalidate_queue()
 
     
-    def is_being_attended(self, profile_id: str):
+    async def is_being_attended(self, profile_id: str):
         """
         Verifica se o paciente está atualmente sendo atendido.
         
@@ -147,7 +384,7 @@ class QueueService:
         Returns:
             True se está sendo atendido, False caso contrário
         """
-        res = (
+        res = await (
             supabase.table("QUEUE")
             .select("*")
             .eq("profile_id", profile_id)
@@ -159,7 +396,7 @@ class QueueService:
 
         return len(data) > 0
     
-    def advance_queue(self, doctor_id: str):
+    async def advance_queue(self, doctor_id: str):
         """
         Chama o próximo paciente da fila para atendimento.
         
@@ -170,10 +407,14 @@ class QueueService:
         4. Dentro de cada grupo, ordem é por horário de check-in (mais antigo primeiro)
         5. Ao chamar, atualiza status para "being_attended" e atribui o médico
         
-        Algoritmo de Priorização:
-        - Separa pacientes em prioritários e normais
-        - Ordena cada grupo por check-in
-        - Chama o primeiro da lista ordenada (prioritários primeiro)
+        Algoritmo (função claim_next_patient no banco, uma única chamada):
+        - Verifica se o médico já possui atendimento ativo
+        - Seleciona o primeiro paciente da fila ordenada (prioritários primeiro,
+          depois por check-in) com FOR UPDATE SKIP LOCKED
+        - Atualiza status e médico atribuído na mesma transação
+        
+        Concorrência:
+        - Dois médicos chamando ao mesmo tempo nunca recebem o mesmo paciente
         
         Args:
             doctor_id: UUID do médico que está chamando o próximo paciente
@@ -183,77 +424,39 @@ class QueueService:
             - {"already_attending": True, "patient": ...} se médico já está atendendo
             - {"already_attending": False, "patient": ...} se chamou novo paciente
         """
-        # Verifica se o médico já está atendendo algum paciente
-        # Regra de Negócio: Um médico não pode atender múltiplos pacientes simultaneamente
-        attending_res = (
-            self.table
-            .select("*")
-            .eq("assigned_doctor_id", doctor_id)
-            .eq("status", "being_attended")
-            .execute()
-        )
-
-        attending = attending_res.data or []
+        # Verificação, seleção e atribuição são feitas atomicamente no banco
+        # (database/migrations/001_claim_next_patient.sql)
+        response = await supabase.rpc(
+            "claim_next_patient",
+            {"p_doctor_id": doctor_id}
+        ).execute()
 
-        # Se já está atendendo, retorna o paciente atual (não permite novo atendimento)
-        if attending:
-            return {
-                "already_attending": True,
-                "patient": attending[0]
-            }
-
-        # Busca pacientes aguardando na fila
-        queue_res = (
-            self.table
-            .select("*")
-            .eq("status", "waiting")
-            .execute()
-        )
-
-        queue = queue_res.data or []
+        result = response.data
 
         # Se a fila está vazia, retorna None
-        if not queue:
+        if not result:
             return None
 
-        # Separação em grupos para aplicação da regra de priorização
-        priorities = []
-        normals = []
-
-        # Itera sobre a fila e separa por prioridade
-        for item in queue:
-            prof = (
-                supabase.table("PROFILES")
-                .select("priority")
-                .eq("id", item["profile_id"])
-                .execute()
-            ).data or []
-
-            is_priority = prof[0]["priority"] if prof else False
-
-            if is_priority:
-                priorities.append(item)
-            else:
-                normals.append(item)
+        # Se já está atendendo, retorna o paciente atual (não permite novo atendimento)
+        if result["already_attending"]:
+            return result
 
-        # Ordena cada grupo por horário de check-in (mais antigo primeiro)
-        priorities.sort(key=lambda x: x["checkin"])
-        normals.sort(key=lambda x: x["checkin"])
+        called = result["patient"]
 
-        # Fila ordenada: prioritários primeiro, depois normais
-        ordered_queue = priorities + normals
+        # O paciente chamado sai da fila de espera em memória
+        queue_index.remove(called["profile_id"])
+        await self._invalidate_shared()
 
-        # Seleciona o primeiro paciente da fila ordenada
-        first = ordered_queue[0]
+        # Ritmo de chamadas: base do intervalo de polling sugerido aos pacientes
+        await call_rate.record()
 
-        # Atualiza status para "being_attended" e atribui o médico
-        # Regra de Negócio: Ao chamar, o paciente sai do status "waiting"
-        supabase.table("QUEUE").update({
-            "status": "being_attended",
-            "assigned_doctor_id": doctor_id
-        }).eq("id", first["id"]).execute()
+        queue_events.publish({
+            "type": "called",
+            "profile_id": called["profile_id"],
+            "doctor_id": doctor_id
+        })
 
-        return {"already_attending": False, "patient": first}
+        return result
 
         
 queue_service = QueueService()
\ No newline at end of file
@@ -1,4 +1,24 @@
-from app.core.config import supabase
+import asyncio
+from app.core.cache import MicroCache
+from app.core.config import record_archive, settings, supabase
+from app.core.metrics import metrics
+from datetime import datetime, timedelta, timezone
+from app.core.pagination import apply_keyset, next_cursor, parse_fields
+
+# Colunas da tabela RECORD_MEDICAL disponíveis para projeção (?fields=)
+RECORD_COLUMNS = (
+    "id", "doctor_id", "patient_id", "started_at", "end_at",
+    "subjective", "objective_data", "assessment", "planning",
+    "inserted_at", "updated_at",
+)
+
+# Micro-cache da listagem pública (/records/), consultada em polling pelos painéis.
+# Compartilhado no módulo: o serviço é instanciado a cada requisição
+record_reads = MicroCache(ttl_seconds=settings.READ_CACHE_TTL_SECONDS)
+metrics.register_cache("record_reads", record_reads)
+
+# Ordenação da listagem paginada: (started_at, id)
+RECORD_SORT_COLUMN = "started_at"
 
 class MedicalRecordService:
     """
@@ -11,32 +31,221 @@ class MedicalRecordService:
     """
     def __init__(self):
         self.records = supabase.table("RECORD_MEDICAL")
+        self.summaries = supabase.table("patient_summary")
 
-    def list_all(self):
+    async def list_all(
+        self,
+        limit: int | None = None,
+        cursor: str | None = None,
+        fields: str | None = None,
+        doctor_id: str | None = None,
+        patient_id: str | None = None,
+        started_from: datetime | None = None,
+        started_to: datetime | None = None,
+        finished: bool | None = None
+    ):
         """
-        Lista todos os registros médicos do sistema.
+        Lista uma página dos registros médicos do sistema.
         
         Regra de Negócio:
-        - Ordenação por data de início (mais antigo primeiro)
+        - Ordenação por data de início (mais antigo primeiro), desempate por id
+        - Paginação por cursor (keyset): custo independe do tamanho da tabela
+        - "fields" permite omitir as colunas SOAP (texto longo) em listagens
+        - Filtros são aplicados no banco (índices em (doctor_id, started_at) e
+          (patient_id, started_at)): o custo acompanha o tamanho do resultado
+        - Leituras idênticas simultâneas compartilham uma única consulta, e o
+          resultado é reaproveitado por READ_CACHE_TTL_SECONDS (record_reads)
         - Utilizado para visualização geral (ex: dashboard de admin)
         
+        Args:
+            limit: Quantidade máxima de registros na página
+            cursor: Cursor da página anterior (None = primeira página)
+            fields: Colunas desejadas, separadas por vírgula (None = todas)
+            doctor_id: UUID do médico (None = todos)
+            patient_id: UUID do paciente (None = todos)
+            started_from: Início mínimo (inclusivo)
+            started_to: Início máximo (exclusivo)
+            finished: True = apenas finalizados (end_at preenchido),
+                False = apenas em aberto, None = todos
+        
         Returns:
-            Lista de todos os registros médicos ordenados
+            Lista de registros médicos ordenados
+            
+        Raises:
+            ValueError: Se o cursor ou os campos forem inválidos
         """
-        response = (
-            self.records
-            .select("*")
-            .order("started_at", desc=False)  # Mais antigo primeiro
-            .execute()
+        query = self._apply_filters(
+            self.records.select(parse_fields(fields, RECORD_COLUMNS, RECORD_SORT_COLUMN)),
+            doctor_id=doctor_id,
+            patient_id=patient_id,
+            started_from=started_from,
+            started_to=started_to,
+            finished=finished
+        )
+        query = apply_keyset(
+            query,
+            RECORD_SORT_COLUMN,
+            cursor,
+            limit or settings.LIST_DEFAULT_LIMIT
+        )
+
+        async def load():
+            response = await query.execute()
+            return response.data or []
+
+        key = (
+            limit or settings.LIST_DEFAULT_LIMIT, cursor, fields,
+            doctor_id, patient_id, started_from, started_to, finished
+        )
+        return await record_reads.get_or_load(key, load)
+
+    def iter_records(
+        self,
+        doctor_id: str | None = None,
+        started_from: datetime | None = None,
+        started_to: datetime | None = None,
+        fields: str | None = None,
+        chunk_size: int | None = None,
+        patient_id: str | None = None,
+        finished: bool | None = None
+    ):
+        """
+        Percorre os registros médicos em páginas, para exportação em stream.
+        
+        Regra de Negócio:
+        - Mesma ordenação da listagem: (started_at, id)
+        - Cada página é lida por cursor (keyset) com chunk_size registros:
+          a memória usada independe da quantidade total de registros
+        - Filtros: os mesmos da listagem (list_all)
+        
+        Args:
+            doctor_id: UUID do médico (None = todos)
+            started_from: Início mínimo (inclusivo)
+            started_to: Início máximo (exclusivo)
+            fields: Colunas desejadas, separadas por vírgula (None = todas)
+            chunk_size: Registros por página (padrão EXPORT_CHUNK_SIZE)
+            patient_id: UUID do paciente (None = todos)
+            finished: Filtro por end_at preenchido (True) ou nulo (False)
+            
+        Returns:
+            (colunas, páginas): lista das colunas exportadas e gerador
+            assíncrono de páginas (listas de registros)
+            
+        Raises:
+            ValueError: Se os campos forem inválidos (validados antes do
+                início da leitura, para que o erro não ocorra no meio do stream)
+        """
+        columns = parse_fields(fields, RECORD_COLUMNS, RECORD_SORT_COLUMN)
+        names = list(RECORD_COLUMNS) if columns == "*" else columns.split(",")
+
+        return names, self._iter_pages(
+            columns,
+            chunk_size or settings.EXPORT_CHUNK_SIZE,
+            doctor_id=doctor_id,
+            patient_id=patient_id,
+            started_from=started_from,
+            started_to=started_to,
+            finished=finished
         )
+
+    async def _iter_pages(self, columns: str, chunk_size: int, **filters):
+        cursor = None
+
+        while True:
+            query = self._apply_filters(self.records.select(columns), **filters)
+            query = apply_keyset(query, RECORD_SORT_COLUMN, cursor, chunk_size)
+            page = (await query.execute()).data or []
+
+            if page:
+                yield page
+
+            cursor = next_cursor(page, chunk_size, RECORD_SORT_COLUMN)
+            if cursor is None:
+                return
+
+    @staticmethod
+    def _apply_filters(
+        query,
+        doctor_id: str | None = None,
+        patient_id: str | None = None,
+        started_from: datetime | None = None,
+        started_to: datetime | None = None,
+        finished: bool | None = None
+    ):
+        """Aplica os filtros informados (None = sem filtro) à consulta."""
+        if doctor_id:
+            query = query.eq("doctor_id", doctor_id)
+
+        if patient_id:
+            query = query.eq("patient_id", patient_id)
+
+        if started_from:
+            query = query.gte("started_at", started_from.isoformat())
+
+        if started_to:
+            query = query.lt("started_at", started_to.isoformat())
+
+        if finished is True:
+            query = query.not_.is_("end_at", "null")
+        elif finished is False:
+            query = query.is_("end_at", "null")
+
+        return query
+
+    async def search(
+        self,
+        query: str,
+        limit: int | None = None,
+        offset: int = 0,
+        doctor_id: str | None = None,
+        patient_id: str | None = None
+    ):
+        """
+        Busca textual nos campos SOAP (subjective, objective_data, assessment, planning).
+        
+        Regra de Negócio:
+        - Todos os termos devem aparecer no registro
+        - Resultados ordenados por relevância (avaliação pesa mais que os demais
+          campos), empate pelo registro mais recente
+        - Cada resultado traz um trecho (snippet) com os termos destacados em <b>
+        - Executada no banco (RPC search_records, índice GIN): o custo depende
+          da quantidade de registros que contêm os termos, não do tamanho da tabela
+        
+        Args:
+            query: Texto da busca
+            limit: Quantidade máxima de resultados
+            offset: Resultados a pular (paginação)
+            doctor_id: UUID do médico (None = todos)
+            patient_id: UUID do paciente (None = todos)
+            
+        Returns:
+            Lista de resultados: id, doctor_id, patient_id, started_at, end_at,
+            rank e snippet
+            
+        Raises:
+            ValueError: Se a busca for vazia
+        """
+        if not query or not query.strip():
+            raise ValueError("Informe o texto da busca.")
+
+        response = await supabase.rpc("search_records", {
+            "p_query": query.strip(),
+            "p_limit": limit or settings.SEARCH_DEFAULT_LIMIT,
+            "p_offset": offset,
+            "p_doctor_id": doctor_id,
+            "p_patient_id": patient_id,
+        }).execute()
+
         return response.data or []
 
-    def list_by_profile(self, profile_id: str):
+    async def list_by_profile(self, profile_id: str):
         """
         Lista todos os registros médicos de um paciente específico.
         
         Regra de Negócio:
-        - Retorna histórico completo de atendimentos do paciente
+        - Retorna histórico completo de atendimentos do paciente, incluindo
+          os registros arquivados (ARCHIVE_DIR), lidos apenas das partições
+          que contêm o paciente
         - Ordenação por data de início (mais antigo primeiro)
         - Utilizado para visualizar histórico médico do paciente
         
@@ -46,34 +255,170 @@ class MedicalRecordService:
         Returns:
             Lista de registros médicos do paciente ordenados
         """
-        response = (
+        response = await (
             self.records
             .select("*")
             .eq("patient_id", profile_id)
             .order("started_at", desc=False)  # Mais antigo primeiro
             .execute()
         )
-        return response.data or []
+        records = response.data or []
+
+        if record_archive is None:
+            return records
+
+        archived = await asyncio.to_thread(record_archive.list_by_patient, profile_id)
+        if not archived:
+            return records
 
-    def get_by_id(self, record_id: str):
+        # Registro nas duas camadas (arquivamento interrompido): vale o do banco
+        active_ids = {record["id"] for record in records}
+        records.extend(record for record in archived if record["id"] not in active_ids)
+        records.sort(key=lambda record: (datetime.fromisoformat(record["started_at"]), record["id"]))
+
+        return records
+
+    async def archive_old_records(self, before: datetime | None = None):
+        """
+        Move os registros antigos para o arquivo frio (Parquet por mês).
+        
+        Regra de Negócio:
+        - Arquiva registros finalizados iniciados antes de "before" (padrão:
+          ARCHIVE_HORIZON_DAYS dias atrás); atendimentos em aberto permanecem
+        - Um job por vez, mesmo entre workers (trava no diretório do arquivo)
+        - Lotes de ARCHIVE_BATCH_SIZE registros: cada lote é gravado no arquivo,
+          lido de volta e só então removido do banco (RPC
+          archive_delete_records); uma interrupção nunca perde registros (no
+          pior caso, o registro fica nas duas camadas até a próxima execução)
+        - O resumo do paciente (patient_summary) continua contando as visitas
+          arquivadas
+        - Listagem, exportação e busca textual consideram apenas os registros
+          no banco; get_by_id e list_by_profile incluem os arquivados
+        
+        Args:
+            before: Data limite (exclusiva) do início dos registros arquivados
+            
+        Returns:
+            Dict com archived (quantidade), before e partitions (meses alterados)
+            
+        Raises:
+            RuntimeError: Se o arquivamento estiver desabilitado (sem ARCHIVE_DIR)
+            ArchiveInProgress: Se outro job de arquivamento estiver em execução
+            OSError: Se um lote não puder ser gravado ou confirmado no arquivo
+        """
+        if record_archive is None:
+            raise RuntimeError("Arquivamento desabilitado: configure ARCHIVE_DIR.")
+
+        if before is None:
+            before = datetime.now(timezone.utc) - timedelta(days=settings.ARCHIVE_HORIZON_DAYS)
+
+        batch_size = settings.ARCHIVE_BATCH_SIZE
+        archived, partitions, cursor = 0, set(), None
+
+        with record_archive.exclusive():
+            while True:
+                query = self._apply_filters(self.records.select("*"), started_to=before, finished=True)
+                query = apply_keyset(query, RECORD_SORT_COLUMN, cursor, batch_size)
+                page = (await query.execute()).data or []
+
+                if not page:
+                    break
+
+                written, stored_ids = await asyncio.to_thread(record_archive.write, page)
+                ids = [record["id"] for record in page]
+
+                # Só remove do banco o que foi confirmado no arquivo
+                missing = [record_id for record_id in ids if record_id not in stored_ids]
+                if missing:
+                    raise OSError(f"Registros não confirmados no arquivo: {missing}")
+
+                partitions.update(written)
+                await supabase.rpc("archive_delete_records", {"p_ids": ids}).execute()
+                archived += len(page)
+
+                cursor = next_cursor(page, batch_size, RECORD_SORT_COLUMN)
+                if cursor is None:
+                    break
+
+        if archived:
+            record_reads.invalidate()
+
+        return {
+            "archived": archived,
+            "before": before.isoformat(),
+            "partitions": sorted(partitions),
+        }
+
+    async def get_patient_summary(self, patient_id: str):
+        """
+        Retorna o resumo do histórico de um paciente, sem carregar os registros.
+        
+        Regra de Negócio:
+        - Lido da tabela patient_summary, mantida pelo banco a cada registro
+          criado (trigger): uma única linha, independente do tamanho do histórico
+        - Duração média considera apenas atendimentos finalizados (com end_at)
+        - Paciente sem registros: visit_count 0 e demais campos nulos
+        
+        Args:
+            patient_id: UUID do perfil do paciente
+            
+        Returns:
+            Dict com patient_id, visit_count, first_visit_at, last_visit_at,
+            average_duration_seconds, last_record_id e last_assessment
+        """
+        response = await (
+            self.summaries
+            .select("*")
+            .eq("patient_id", patient_id)
+            .limit(1)
+            .execute()
+        )
+        summary = response.data[0] if response.data else {}
+
+        finished = summary.get("finished_count") or 0
+        average = summary.get("total_duration_seconds", 0) / finished if finished else None
+
+        return {
+            "patient_id": patient_id,
+            "visit_count": summary.get("visit_count", 0),
+            "first_visit_at": summary.get("first_visit_at"),
+            "last_visit_at": summary.get("last_visit_at"),
+            "average_duration_seconds": average,
+            "last_record_id": summary.get("last_record_id"),
+            "last_assessment": summary.get("last_assessment"),
+        }
+
+    async def get_by_id(self, record_id: str):
         """
         Busca um registro médico específico por ID.
         
         Regra de Negócio:
-        - Registro deve existir no banco de dados
+        - Registro deve existir no banco de dados ou no arquivo frio
+          (consultado apenas se o registro não estiver no banco)
         - Utilizado para visualizar detalhes completos de um atendimento
         
         Args:
-            record_id: UUID do registro médico
+            record_id: ID do registro médico
             
         Returns:
-            Dados completos do registro médico
+            Dados completos do registro médico, ou None se não encontrado
         """
-        response = (
+        response = await (
             self.records
             .select("*")
             .eq("id", record_id)
-            .single()
+            .limit(1)
             .execute()
         )
-        return response.data
+        if response.data:
+            return response.data[0]
+
+        if record_archive is None:
+            return None
+
+        try:
+            archived_id = int(record_id)
+        except (TypeError, ValueError):
+            return None
+
+        return await asyncio.to_thread(record_archive.get, archived_id)
@@ -0,0 +1,504 @@
+"""
+Benchmark: simulação de um dia de atendimento na clínica.
+
+Simula, contra o backend local em memória (STORAGE_BACKEND=memory), sem rede:
+- N pacientes fazendo check-in (/queue/checkin) ao longo do dia e consultando
+  a posição (/queue/position) a cada intervalo de polling até serem chamados
+- M médicos em ciclo: /queue/next -> /attendance/current -> /attendance/finish
+
+Relatório por endpoint: latência p50/p95/p99, vazão (req/s) e idas ao banco
+(round trips) por requisição. Com --runs N, a simulação é repetida N vezes a
+partir do mesmo estado inicial e o relatório traz a mediana de cada métrica.
+
+O tempo simulado é acelerado por --speedup (ex: 600 = 10 min simulados por
+segundo real). Com a mesma --seed, a carga gerada é a mesma a cada execução:
+perfis, chegadas e a duração das consultas de cada médico vêm de geradores
+próprios de cada ator (derivados da semente), independentes da ordem em que
+as tarefas são escalonadas.
+
+Uso (a partir de backend/):
+    python -m benchmarks.clinic_day --patients 200 --doctors 5
+    python -m benchmarks.clinic_day --output resultado.json
+    python -m benchmarks.clinic_day --runs 5 --baseline resultado.json
+
+Com --baseline, o processo termina com código 1 se algum endpoint falhar ou
+regredir (comparando as medianas das execuções):
+- idas ao banco por requisição acima de --max-round-trip-regression (fração;
+  uma consulta extra por requisição é sempre detectada)
+- p95 acima de --max-regression (fração) E acima da referência por mais que
+  --min-regression-ms (latências de fração de milissegundo variam mais que
+  25% entre execuções sem nenhuma mudança no código); apenas endpoints com
+  ao menos MIN_LATENCY_SAMPLES requisições
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+# Segredo usado apenas para assinar os tokens dos usuários simulados
+BENCHMARK_JWT_SECRET = "benchmark-secret-with-at-least-32-bytes"
+
+API = "/api/v1"
+
+# Amostras mínimas para comparar o p95 de um endpoint (com menos, o p95 é
+# praticamente a maior latência observada: ruído, não tendência)
+MIN_LATENCY_SAMPLES = 50
+
+# Idas ao banco da requisição em andamento (acumuladas pelo LocalDatabase)
+_request_calls = contextvars.ContextVar("request_calls", default=None)
+
+
+def configure_environment():
+    """
+    Configura a aplicação para o backend local antes de importá-la.
+    Deve ser chamado antes de qualquer import de app/ ou main.
+    """
+    os.environ.setdefault("SUPABASE_URL", "http://localhost")
+    os.environ.setdefault("SUPABASE_KEY", "benchmark")
+    os.environ["STORAGE_BACKEND"] = "memory"
+    os.environ["AUTH_MODE"] = "local"
+    os.environ["SUPABASE_JWT_SECRET"] = BENCHMARK_JWT_SECRET
+
+
+def make_token(user_id: str, secret: str):
+    """Gera um JWT válido (HS256) para o usuário simulado."""
+    import jwt
+
+    return jwt.encode(
+        {"sub": user_id, "aud": "authenticated", "exp": int(time.time()) + 86400},
+        secret,
+        algorithm="HS256",
+    )
+
+
+def percentile(samples: list, p: int):
+    """Percentil p (1-99) das amostras, com interpolação linear."""
+    if len(samples) == 1:
+        return samples[0]
+
+    return statistics.quantiles(samples, n=100, method="inclusive")[p - 1]
+
+
+class Recorder:
+    """Acumula latência, status e idas ao banco de cada requisição, por endpoint."""
+    def __init__(self):
+        self.latencies = {}
+        self.calls = {}
+        self.errors = {}
+
+    def add(self, endpoint: str, seconds: float, calls: int, status_code: int):
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.calls.setdefault(endpoint, []).append(calls)
+        if status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def report(self, wall_seconds: float):
+        """Resumo por endpoint (latências em ms)."""
+        endpoints = {}
+
+        for endpoint, samples in sorted(self.latencies.items()):
+            calls = self.calls[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p95_ms": percentile(samples, 95) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "throughput_rps": len(samples) / wall_seconds if wall_seconds else 0.0,
+                "round_trips_per_request": sum(calls) / len(calls),
+            }
+
+        total = sum(item["requests"] for item in endpoints.values())
+
+        return {
+            "wall_seconds": wall_seconds,
+            "requests": total,
+            "throughput_rps": total / wall_seconds if wall_seconds else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class ClinicDay:
+    """
+    Simulação de um dia de atendimento.
+
+    Args:
+        app: Aplicação ASGI (main.app)
+        client: LocalClient usado pelos serviços
+        patients: Quantidade de pacientes
+        doctors: Quantidade de médicos
+        poll_interval: Intervalo de polling da posição (segundos simulados)
+        consult_seconds: Duração média de uma consulta (segundos simulados)
+        arrival_window: Janela de chegada dos pacientes (segundos simulados)
+        priority_ratio: Fração de pacientes prioritários
+        speedup: Fator de aceleração do tempo simulado
+        seed: Semente da geração de carga
+        jwt_secret: Segredo para assinar os tokens (AUTH_MODE=local)
+    """
+    def __init__(
+        self,
+        app,
+        client,
+        patients: int = 100,
+        doctors: int = 5,
+        poll_interval: float = 10.0,
+        consult_seconds: float = 300.0,
+        arrival_window: float = 3600.0,
+        priority_ratio: float = 0.1,
+        speedup: float = 600.0,
+        seed: int = 42,
+        jwt_secret: str = BENCHMARK_JWT_SECRET,
+    ):
+        self.app = app
+        self.client = client
+        self.patients = patients
+        self.doctors = doctors
+        self.poll_interval = poll_interval
+        self.consult_seconds = consult_seconds
+        self.arrival_window = arrival_window
+        self.priority_ratio = priority_ratio
+        self.speedup = speedup
+        self.seed = seed
+        self.jwt_secret = jwt_secret
+        self.recorder = Recorder()
+        self.finished = 0
+        self._http = None
+
+    def random_for(self, actor: str):
+        """Gerador próprio do ator (ex: "profiles", "doctor-0"), derivado da semente."""
+        return random.Random(f"{self.seed}:{actor}")
+
+    async def sleep(self, simulated_seconds: float):
+        await asyncio.sleep(simulated_seconds / self.speedup)
+
+    async def request(self, endpoint: str, method: str, path: str, token: str, **kwargs):
+        """Executa uma requisição e registra latência e idas ao banco."""
+        calls = [0]
+        context = _request_calls.set(calls)
+        start = time.perf_counter()
+
+        try:
+            response = await self._http.request(
+                method,
+                f"{API}{path}",
+                headers={"Authorization": f"Bearer {token}"},
+                **kwargs
+            )
+        finally:
+            _request_calls.reset(context)
+
+        self.recorder.add(endpoint, time.perf_counter() - start, calls[0], response.status_code)
+        return response
+
+    async def seed_profiles(self):
+        """Cadastra os perfis de pacientes e médicos diretamente no backend local."""
+        generator = self.random_for("profiles")
+        patients = [
+            {
+                "id": str(uuid.UUID(int=generator.getrandbits(128))),
+                "full_name": f"Paciente {i}",
+                "role": "patient",
+                "priority": generator.random() < self.priority_ratio,
+            }
+            for i in range(self.patients)
+        ]
+        doctors = [
+            {
+                "id": str(uuid.UUID(int=generator.getrandbits(128))),
+                "full_name": f"Médico {i}",
+                "role": "doctor",
+            }
+            for i in range(self.doctors)
+        ]
+
+        await self.client.table("PROFILES").insert(patients + doctors).execute()
+
+        return (
+            [(p["id"], make_token(p["id"], self.jwt_secret)) for p in patients],
+            [(d["id"], make_token(d["id"], self.jwt_secret)) for d in doctors],
+        )
+
+    async def patient(self, token: str, arrival: float):
+        """Chega, faz check-in e consulta a posição até ser chamado."""
+        await self.sleep(arrival)
+        await self.request("POST /queue/checkin", "POST", "/queue/checkin", token)
+
+        while True:
+            response = await self.request("GET /queue/position", "GET", "/queue/position", token)
+            if response.status_code != 200 or response.json().get("status") != "waiting":
+                return
+            await self.sleep(self.poll_interval)
+
+    async def doctor(self, token: str, generator: random.Random):
+        """Chama, consulta e finaliza atendimentos até todos os pacientes serem atendidos."""
+        while self.finished < self.patients:
+            response = await self.request("POST /queue/next", "POST", "/queue/next", token)
+            called = response.json().get("called") if response.status_code == 200 else None
+
+            if not called:
+                await self.sleep(self.poll_interval)
+                continue
+
+            await self.request("GET /attendance/current", "GET", "/attendance/current", token)
+            await self.sleep(generator.uniform(0.5, 1.5) * self.consult_seconds)
+
+            response = await self.request(
+                "POST /attendance/finish", "POST", "/attendance/finish", token,
+                json={
+                    "subjective": "Queixa simulada",
+                    "objective_data": "Sinais vitais simulados",
+                    "assessment": "Avaliação simulada",
+                    "planning": "Plano simulado",
+                    "queue_entry_id": called["id"],
+                },
+            )
+            if response.status_code == 200:
+                self.finished += 1
+
+    async def run(self, timeout: float | None = None):
+        """
+        Executa a simulação completa e retorna o relatório.
+
+        Args:
+            timeout: Tempo real máximo (s); None = sem limite
+        """
+        import httpx
+
+        previous_hook = self.client.db.on_call
+        self.client.db.on_call = _count_call
+
+        patients, doctors = await self.seed_profiles()
+        generator = self.random_for("arrivals")
+        arrivals = [generator.uniform(0, self.arrival_window) for _ in patients]
+
+        transport = httpx.ASGITransport(app=self.app)
+        start = time.perf_counter()
+
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as http:
+                self._http = http
+                tasks = [self.patient(token, at) for (_, token), at in zip(patients, arrivals)]
+                tasks += [
+                    self.doctor(token, self.random_for(f"doctor-{i}"))
+                    for i, (_, token) in enumerate(doctors)
+                ]
+                await asyncio.wait_for(asyncio.gather(*tasks), timeout)
+        finally:
+            self._http = None
+            self.client.db.on_call = previous_hook
+
+        report = self.recorder.report(time.perf_counter() - start)
+        report["scenario"] = {
+            "patients": self.patients,
+            "doctors": self.doctors,
+            "poll_interval": self.poll_interval,
+            "consult_seconds": self.consult_seconds,
+            "arrival_window": self.arrival_window,
+            "speedup": self.speedup,
+            "attended": self.finished,
+        }
+        return report
+
+
+def _count_call(description: str):
+    calls = _request_calls.get()
+    if calls is not None:
+        calls[0] += 1
+
+
+def reset_state(client):
+    """Backend local e caches dos serviços vazios: cada execução parte do mesmo estado."""
+    from app.services import record_medical_service as record_module
+    from app.services.profile_service import profile_service
+    from app.services.queue_index import queue_index
+    from app.services.queue_service import queue_service
+
+    client.db.reset()
+    profile_service.clear_cache()
+    queue_service.reads.invalidate()
+    record_module.record_reads.invalidate()
+    queue_index.rebuild([])
+
+
+def median_report(reports: list):
+    """Relatório com a mediana de cada métrica, por endpoint, entre as execuções."""
+    if len(reports) == 1:
+        return {**reports[0], "runs": 1}
+
+    endpoints = {}
+    for name in sorted({name for report in reports for name in report["endpoints"]}):
+        samples = [report["endpoints"][name] for report in reports if name in report["endpoints"]]
+        endpoints[name] = {
+            metric: statistics.median(sample[metric] for sample in samples)
+            for metric in samples[0]
+            if metric != "errors"
+        }
+        endpoints[name]["errors"] = sum(sample["errors"] for sample in samples)
+
+    return {
+        "wall_seconds": statistics.median(report["wall_seconds"] for report in reports),
+        "requests": statistics.median(report["requests"] for report in reports),
+        "throughput_rps": statistics.median(report["throughput_rps"] for report in reports),
+        "endpoints": endpoints,
+        "scenario": {
+            **reports[0]["scenario"],
+            "attended": min(report["scenario"]["attended"] for report in reports),
+        },
+        "runs": len(reports),
+    }
+
+
+def compare(
+    report: dict,
+    baseline: dict,
+    max_regression: float,
+    min_regression_ms: float = 1.0,
+    max_round_trip_regression: float = 0.2,
+):
+    """
+    Compara o relatório com uma execução de referência.
+
+    Args:
+        max_regression: Tolerância relativa do p95 (fração)
+        min_regression_ms: Aumento absoluto mínimo do p95 para contar como
+            regressão (ruído de medição em latências muito baixas)
+        max_round_trip_regression: Tolerância relativa das idas ao banco por
+            requisição (endpoints com cache variam com o tempo real da execução)
+
+    Returns:
+        Lista de regressões encontradas (vazia se dentro da tolerância)
+    """
+    problems = []
+
+    for endpoint, current in report["endpoints"].items():
+        if current["errors"]:
+            problems.append(f"{endpoint}: {current['errors']} requisições com erro")
+
+        reference = baseline.get("endpoints", {}).get(endpoint)
+        if reference is None:
+            continue
+
+        slower = current["p95_ms"] - reference["p95_ms"]
+        if (
+            min(current["requests"], reference["requests"]) >= MIN_LATENCY_SAMPLES
+            and current["p95_ms"] > reference["p95_ms"] * (1 + max_regression)
+            and slower > min_regression_ms
+        ):
+            problems.append(
+                f"{endpoint}: p95 {current['p95_ms']:.2f} ms "
+                f"(referência {reference['p95_ms']:.2f} ms)"
+            )
+
+        if current["round_trips_per_request"] > reference["round_trips_per_request"] * (1 + max_round_trip_regression) + 0.01:
+            problems.append(
+                f"{endpoint}: {current['round_trips_per_request']:.2f} idas ao banco por requisição "
+                f"(referência {reference['round_trips_per_request']:.2f})"
+            )
+
+    return problems
+
+
+def format_report(report: dict):
+    """Tabela de resultados para o terminal."""
+    lines = [
+        f"{'endpoint':<26}{'req':>7}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'db/req':>8}"
+    ]
+
+    for endpoint, item in report["endpoints"].items():
+        lines.append(
+            f"{endpoint:<26}{item['requests']:>7g}{item['errors']:>5}"
+            f"{item['p50_ms']:>9.2f}{item['p95_ms']:>9.2f}{item['p99_ms']:>9.2f}"
+            f"{item['throughput_rps']:>9.1f}{item['round_trips_per_request']:>8.2f}"
+        )
+
+    scenario = report["scenario"]
+    lines.append(
+        f"\n{report['requests']:g} requisições em {report['wall_seconds']:.2f} s "
+        f"({report['throughput_rps']:.1f} req/s); "
+        f"{scenario['attended']}/{scenario['patients']} pacientes atendidos "
+        f"por {scenario['doctors']} médicos"
+    )
+    if report.get("runs", 1) > 1:
+        lines.append(f"Medianas de {report['runs']} execuções")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulação de um dia de atendimento (backend local).")
+    parser.add_argument("--patients", type=int, default=100)
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--poll-interval", type=float, default=10.0, help="segundos simulados")
+    parser.add_argument("--consult-seconds", type=float, default=300.0, help="segundos simulados")
+    parser.add_argument("--arrival-window", type=float, default=3600.0, help="segundos simulados")
+    parser.add_argument("--priority-ratio", type=float, default=0.1)
+    parser.add_argument("--speedup", type=float, default=600.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--timeout", type=float, default=600.0, help="tempo real máximo (s) de cada execução")
+    parser.add_argument("--runs", type=int, default=3, help="execuções (o relatório traz as medianas)")
+    parser.add_argument("--output", help="salva o relatório em JSON")
+    parser.add_argument("--baseline", help="relatório JSON de referência para detectar regressões")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="tolerância do p95 (fração)")
+    parser.add_argument("--min-regression-ms", type=float, default=1.0, help="aumento mínimo do p95 (ms)")
+    parser.add_argument(
+        "--max-round-trip-regression", type=float, default=0.2,
+        help="tolerância das idas ao banco por requisição (fração)",
+    )
+    args = parser.parse_args(argv)
+
+    configure_environment()
+
+    from main import app
+    from app.core.config import supabase
+
+    reports = []
+    for _ in range(max(1, args.runs)):
+        reset_state(supabase)
+        simulation = ClinicDay(
+            app,
+            supabase,
+            patients=args.patients,
+            doctors=args.doctors,
+            poll_interval=args.poll_interval,
+            consult_seconds=args.consult_seconds,
+            arrival_window=args.arrival_window,
+            priority_ratio=args.priority_ratio,
+            speedup=args.speedup,
+            seed=args.seed,
+        )
+        reports.append(asyncio.run(simulation.run(timeout=args.timeout)))
+
+    report = median_report(reports)
+
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(
+                report,
+                json.load(f),
+                args.max_regression,
+                args.min_regression_ms,
+                args.max_round_trip_regression,
+            )
+
+        if problems:
+            print("\nRegressões encontradas:")
+            for problem in problems:
+                print(f"- {problem}")
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
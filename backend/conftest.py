@@ -2,6 +2,14 @@ import pytest
 from httpx import AsyncClient
 from fastapi.testclient import TestClient
 from main import app
+from app.core.local_backend import LocalClient
+from app.services import attendance_service as attendance_module
+from app.services import queue_service as queue_module
+from app.services import record_medical_service as record_module
+from app.services.attendance_service import attendance_service
+from app.services.profile_service import profile_service
+from app.services.queue_index import queue_index
+from app.services.queue_service import queue_service
 
 # ============================================
 # CONFIGURAÇÃO DO TOKEN BEARER
@@ -29,4 +37,43 @@ def headers_without_auth():
     """Headers sem autenticação para testar rotas não autenticadas"""
     return {
         "Content-Type": "application/json"
-    }
\ No newline at end of file
+    }
+
+def as_async(func):
+    """
+    Converte uma função síncrona (ex: lambda de mock) em corrotina.
+    Os serviços são assíncronos, então os mocks precisam ser aguardáveis.
+    """
+    async def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def reset_service_state():
+    """Limpa o estado em memória dos serviços (singletons compartilhados entre os testes)."""
+    profile_service.clear_cache()
+    queue_service.reads.invalidate()
+    record_module.record_reads.invalidate()
+    queue_index.rebuild([])
+
+
+@pytest.fixture
+def local(monkeypatch):
+    """
+    Serviços de fila, atendimento, perfis e registros sobre um backend local vazio.
+    O estado em memória dos serviços é limpo antes e depois do teste.
+    """
+    client = LocalClient()
+
+    monkeypatch.setattr(queue_module, "supabase", client)
+    monkeypatch.setattr(attendance_module, "supabase", client)
+    monkeypatch.setattr(record_module, "supabase", client)
+    monkeypatch.setattr(queue_service, "table", client.table("QUEUE"))
+    monkeypatch.setattr(attendance_service, "queue", client.table("QUEUE"))
+    monkeypatch.setattr(profile_service, "table", client.table("PROFILES"))
+    reset_service_state()
+
+    yield client
+
+    reset_service_state()
@@ -5,20 +5,125 @@ Este módulo configura e inicializa a aplicação FastAPI com:
 - Configuração de CORS para permitir requisições do frontend
 - Rotas da API organizadas em módulos
 - Health check endpoint para monitoramento
+- Inicialização verificada (banco, cache compartilhado) e probes /livez e /readyz
+- Aquecimento dos caches (índice da fila, prioridades dos pacientes, chaves JWKS)
+- Instrumentação das requisições (Server-Timing e /metrics)
+- Serialização JSON com orjson e compressão Brotli/GZip das respostas
 """
+# Primeiro import: marca o início da inicialização (medição do cold start)
+from app.core.readiness import readiness
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from app.api import api_router
 from fastapi.middleware.cors import CORSMiddleware
-from app.core.config import settings
+from app.core.compression import CompressionMiddleware
+from app.core.config import settings, http_client, shared_cache, supabase
+from app.core.metrics import MetricsMiddleware, metrics
+from app.core.responses import FastJSONResponse
+from app.core.security import get_jwt_verifier
+from app.services.profile_service import profile_service
+from app.services.queue_events import queue_events
+from app.services.queue_service import queue_service
 import os
 import uvicorn
 
+logger = logging.getLogger(__name__)
+
+
+def startup_steps():
+    """
+    Etapas da inicialização: (verificações obrigatórias, aquecimentos).
+    
+    Verificações: banco (consulta mínima, que também abre a primeira conexão
+    do pool) e Redis, se configurado.
+    Aquecimentos: índice da fila, perfis dos pacientes aguardando (prioridade)
+    e chaves JWKS (com AUTH_MODE=local).
+    """
+    waiting = []
+
+    async def check_database():
+        await supabase.table("PROFILES").select("id").limit(1).execute()
+
+    async def check_shared_cache():
+        await shared_cache.ping()
+
+    async def warm_queue_index():
+        waiting[:] = await queue_service.rebuild_index()
+        return len(waiting)
+
+    async def warm_profiles():
+        return await profile_service.warm_cache([entry["profile_id"] for entry in waiting])
+
+    async def warm_jwks():
+        return await asyncio.to_thread(get_jwt_verifier().prefetch_keys)
+
+    checks = {"database": check_database}
+    if shared_cache is not None:
+        checks["shared_cache"] = check_shared_cache
+
+    warmups = {"queue_index": warm_queue_index, "profiles": warm_profiles}
+    if settings.AUTH_MODE == "local":
+        warmups["jwks"] = warm_jwks
+
+    return checks, warmups
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida da aplicação.
+    
+    Na inicialização, verifica o banco (e o Redis) antes de aceitar tráfego,
+    com novas tentativas até STARTUP_TIMEOUT_SECONDS; se não responderem, a
+    inicialização falha. Em seguida aquece os caches; falhas no aquecimento
+    não impedem a inicialização (dados carregados sob demanda).
+    
+    Com cache compartilhado, repassa em background aos streams deste worker
+    os eventos da fila publicados pelos demais (queue_events.relay).
+    
+    No encerramento, marca a instância como não pronta (/readyz), fecha o
+    pool de conexões HTTP compartilhado com o Supabase e a conexão com o cache
+    compartilhado (se habilitado).
+    """
+    checks, warmups = startup_steps()
+    await readiness.start(
+        checks,
+        warmups,
+        timeout_seconds=settings.STARTUP_TIMEOUT_SECONDS,
+        retry_seconds=settings.STARTUP_RETRY_SECONDS
+    )
+    logger.info("Aplicação pronta em %.2fs", readiness.cold_start_seconds)
+    for name, check in readiness.checks.items():
+        if not check["ok"]:
+            logger.warning("Aquecimento %s falhou: %s", name, check["error"])
+
+    relay = None
+    if shared_cache is not None:
+        relay = asyncio.create_task(queue_events.relay(shared_cache))
+
+    yield
+
+    readiness.stop()
+    await http_client.aclose()
+
+    if relay is not None:
+        relay.cancel()
+        await asyncio.gather(relay, return_exceptions=True)
+
+    if shared_cache is not None:
+        await shared_cache.client.aclose()
+
 # Criação da aplicação FastAPI
 # Configuração de metadados para documentação automática (Swagger/OpenAPI)
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    description="Backend com FastAPI e Supabase"
+    description="Backend com FastAPI e Supabase",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Configuração de CORS (Cross-Origin Resource Sharing)
@@ -30,8 +135,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos os métodos HTTP
     allow_headers=["*"],   # Permite todos os headers
+    expose_headers=["X-Next-Cursor", "X-Next-Offset", "X-Poll-Interval", "Server-Timing"],  # Paginação / polling / tempos
 )
 
+# Compressão das respostas (Brotli ou GZip), acima do tamanho mínimo
+# Regra: Listagens (fila, perfis, registros com campos SOAP) são as maiores respostas
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.GZIP_COMPRESS_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+    use_brotli=settings.COMPRESSION_USE_BROTLI,
+)
+
+# Instrumentação: chamadas ao banco e latência por requisição
+# Regra: Adicionado por último para envolver todos os demais middlewares
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 # Inclusão das rotas da API
 # Todas as rotas estão organizadas em módulos dentro de app/api/endpoints/
 app.include_router(api_router, prefix="/api/v1")
@@ -46,6 +166,35 @@ def health_check():
     """
     return {"status": "ok", "message": "API está funcionando! Acesse /docs para a documentação."}
 
+@app.get("/livez")
+def liveness():
+    """
+    Probe de liveness: o processo está respondendo.
+    Não consulta dependências (falha no banco não deve reiniciar a instância).
+    """
+    return {"status": "alive"}
+
+@app.get("/readyz")
+def readiness_probe():
+    """
+    Probe de readiness: a instância pode receber tráfego.
+    
+    Retorna 200 após a inicialização verificada e 503 durante a inicialização
+    ou o encerramento, com o resultado e a duração de cada etapa, o tempo de
+    inicialização (cold start) e a latência da primeira requisição da API.
+    """
+    return FastJSONResponse(readiness.report(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    """
+    Métricas da aplicação no formato texto do Prometheus.
+    
+    Inclui, por rota: histograma de latência, requisições por status e
+    chamadas ao banco (quantidade e tempo), além da taxa de acerto dos caches.
+    """
+    return metrics.render()
+
 if __name__ == "__main__":
     # Configuração para execução local
     # Porta padrão: 8000, pode ser sobrescrita pela variável de ambiente PORT
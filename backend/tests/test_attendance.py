@@ -0,0 +1,159 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from unittest.mock import AsyncMock, MagicMock
+from postgrest.exceptions import APIError
+from main import app
+from app.services import attendance_service as attendance_module
+from app.services.attendance_service import attendance_service
+from app.core.dependencies import get_current_user
+from conftest import as_async
+
+client = TestClient(app)
+
+# Override da autenticação (aplicado em cada teste, pois outros módulos
+# de teste também alteram app.dependency_overrides)
+def override_get_current_user():
+    return "mock_doctor"
+
+
+@pytest.fixture(autouse=True)
+def auth_override():
+    previous = app.dependency_overrides.get(get_current_user)
+    app.dependency_overrides[get_current_user] = override_get_current_user
+    yield
+    if previous is None:
+        app.dependency_overrides.pop(get_current_user, None)
+    else:
+        app.dependency_overrides[get_current_user] = previous
+
+API = "/api/v1/attendance"
+
+SOAP = {
+    "subjective": "Dor de cabeça",
+    "objective_data": "PA 120/80",
+    "assessment": "Cefaleia tensional",
+    "planning": "Analgésico",
+}
+
+
+# -------------------------------------
+# POST /attendance/finish
+# -------------------------------------
+def test_finish_attendance_success(monkeypatch):
+    monkeypatch.setattr(
+        attendance_service,
+        "finish_attendance",
+        as_async(lambda **kwargs: {"id": 10, "doctor_id": kwargs["doctor_id"]})
+    )
+
+    response = client.post(f"{API}/finish", json=SOAP)
+    assert response.status_code == 200
+    assert response.json()["record"] == {"id": 10, "doctor_id": "mock_doctor"}
+
+
+def test_finish_attendance_without_active(monkeypatch):
+    def raise_value_error(**kwargs):
+        raise ValueError("Nenhum atendimento ativo encontrado.")
+
+    monkeypatch.setattr(attendance_service, "finish_attendance", as_async(raise_value_error))
+
+    response = client.post(f"{API}/finish", json=SOAP)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Nenhum atendimento ativo encontrado."
+
+
+# -------------------------------------
+# AttendanceService.finish_attendance (função no banco)
+# -------------------------------------
+def test_finish_attendance_single_rpc(monkeypatch):
+    """Registro e remoção da fila acontecem em uma única chamada transacional"""
+    client_mock = MagicMock()
+    client_mock.rpc.return_value.execute = AsyncMock(
+        return_value=MagicMock(data={"id": 10, "patient_id": "p1"})
+    )
+    monkeypatch.setattr(attendance_module, "supabase", client_mock)
+
+    record = asyncio.run(attendance_service.finish_attendance(
+        doctor_id="doc1", queue_entry_id="q1", **SOAP
+    ))
+
+    assert record == {"id": 10, "patient_id": "p1"}
+    name, params = client_mock.rpc.call_args.args
+    assert name == "finish_attendance"
+    assert params["p_doctor_id"] == "doc1"
+    assert params["p_queue_entry_id"] == "q1"
+    assert client_mock.table.call_count == 0
+
+
+def test_finish_attendance_no_active_raises_value_error(monkeypatch):
+    """Erro P0002 do banco vira ValueError (404 na rota)"""
+    client_mock = MagicMock()
+    client_mock.rpc.return_value.execute = AsyncMock(side_effect=APIError({
+        "code": "P0002",
+        "message": "Nenhum atendimento ativo encontrado.",
+    }))
+    monkeypatch.setattr(attendance_module, "supabase", client_mock)
+
+    with pytest.raises(ValueError):
+        asyncio.run(attendance_service.finish_attendance(doctor_id="doc1", **SOAP))
+
+
+# -------------------------------------
+# GET /attendance/current
+# -------------------------------------
+CURRENT = {
+    "id": "q1",
+    "profile_id": "p1",
+    "status": "being_attended",
+    "updated_at": "2025-01-01T10:00:00+00:00",
+}
+
+
+def test_get_current_attendance_etag(monkeypatch):
+    """Resposta traz ETag; If-None-Match igual retorna 304 sem corpo"""
+    monkeypatch.setattr(attendance_service, "get_current_attendance", as_async(lambda doc: CURRENT))
+
+    response = client.get(f"{API}/current")
+    assert response.status_code == 200
+    assert response.json() == CURRENT
+    etag = response.headers["ETag"]
+
+    response = client.get(f"{API}/current", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_get_current_attendance_changed(monkeypatch):
+    """Entrada alterada (novo updated_at) gera novo ETag e resposta completa"""
+    monkeypatch.setattr(attendance_service, "get_current_attendance", as_async(lambda doc: CURRENT))
+    etag = client.get(f"{API}/current").headers["ETag"]
+
+    changed = {**CURRENT, "updated_at": "2025-01-01T10:05:00+00:00"}
+    monkeypatch.setattr(attendance_service, "get_current_attendance", as_async(lambda doc: changed))
+
+    response = client.get(f"{API}/current", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_get_current_attendance_none_active(monkeypatch):
+    """Médico sem atendimento ativo recebe 404 (não 500)"""
+    monkeypatch.setattr(attendance_service, "get_current_attendance", as_async(lambda doc: None))
+
+    response = client.get(f"{API}/current")
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Nenhum atendimento ativo no momento."
+    assert "ETag" not in response.headers
+
+
+def test_get_current_attendance_is_read_only(monkeypatch):
+    """A consulta não executa nenhuma escrita na fila"""
+    table = MagicMock()
+    query = table.select.return_value.eq.return_value.eq.return_value.limit.return_value
+    query.execute = AsyncMock(return_value=MagicMock(data=[CURRENT]))
+    monkeypatch.setattr(attendance_service, "queue", table)
+
+    assert asyncio.run(attendance_service.get_current_attendance("doc1")) == CURRENT
+    table.update.assert_not_called()
@@ -1,4 +1,8 @@
+import asyncio
+import time
+import jwt
 import pytest
+from app.core.security import JWTVerifier
 from conftest import client, headers, headers_without_auth
 
 def test_health_check(client):
@@ -19,4 +23,61 @@ def test_get_current_user_invalid_token(client):
         "Content-Type": "application/json"
     }
     response = client.get("/api/v1/user/me", headers=invalid_headers)
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+# -------------------------
+# Validação local do JWT (AUTH_MODE=local)
+# -------------------------
+JWT_SECRET = "segredo-de-teste"
+
+
+def make_token(**claims):
+    payload = {"sub": "user-123", "aud": "authenticated", "exp": int(time.time()) + 60}
+    payload.update(claims)
+    return jwt.encode(payload, JWT_SECRET, algorithm="HS256")
+
+
+def test_local_verifier_valid_token():
+    """Token assinado com o segredo do projeto retorna o sub"""
+    verifier = JWTVerifier(jwt_secret=JWT_SECRET)
+    assert verifier.verify(make_token()) == "user-123"
+
+
+def test_local_verifier_caches_validated_token(monkeypatch):
+    """Token já validado não é decodificado novamente"""
+    verifier = JWTVerifier(jwt_secret=JWT_SECRET)
+    token = make_token()
+    verifier.verify(token)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("decode não deveria ser chamado")
+
+    monkeypatch.setattr(jwt, "decode", fail)
+    assert verifier.verify(token) == "user-123"
+
+
+@pytest.mark.parametrize("token", [
+    make_token(exp=int(time.time()) - 10),
+    make_token(aud="outra-audience"),
+    jwt.encode({"sub": "user-123", "aud": "authenticated", "exp": int(time.time()) + 60}, "outro-segredo", algorithm="HS256"),
+    jwt.encode({"aud": "authenticated", "exp": int(time.time()) + 60}, JWT_SECRET, algorithm="HS256"),
+])
+def test_local_verifier_rejects_invalid_tokens(token):
+    """Expirado, audience errada, assinatura inválida ou sem sub"""
+    verifier = JWTVerifier(jwt_secret=JWT_SECRET)
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(token)
+
+
+def test_get_current_user_local_mode(monkeypatch):
+    """No modo local, get_current_user não consulta o Supabase Auth"""
+    from app.core import dependencies
+
+    monkeypatch.setattr(dependencies.settings, "AUTH_MODE", "local")
+    monkeypatch.setattr(dependencies, "get_jwt_verifier", lambda: JWTVerifier(jwt_secret=JWT_SECRET))
+
+    assert asyncio.run(dependencies.get_current_user(f"Bearer {make_token()}")) == "user-123"
+
+    with pytest.raises(dependencies.HTTPException) as exc:
+        asyncio.run(dependencies.get_current_user("Bearer token_invalido"))
+    assert exc.value.status_code == 401
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from main import app
+from app.core import security
+from app.core.config import settings
+from app.core.dependencies import get_current_user
+from app.core.local_backend import LocalClient
+from app.core.security import JWTVerifier
+from benchmarks.clinic_day import BENCHMARK_JWT_SECRET, ClinicDay, compare, median_report
+
+
+@pytest.fixture
+def local(local, monkeypatch):
+    """Backend local vazio (conftest), com validação local de JWT"""
+    monkeypatch.setattr(settings, "AUTH_MODE", "local")
+    monkeypatch.setattr(security, "_verifier", JWTVerifier(jwt_secret=BENCHMARK_JWT_SECRET))
+
+    # Outros módulos de teste substituem a autenticação globalmente
+    previous = app.dependency_overrides.pop(get_current_user, None)
+
+    yield local
+
+    if previous is not None:
+        app.dependency_overrides[get_current_user] = previous
+
+
+def test_clinic_day_attends_every_patient(local):
+    """Simulação curta: todos atendidos, sem erros, com idas ao banco contadas"""
+    simulation = ClinicDay(
+        app, local,
+        patients=12, doctors=3,
+        consult_seconds=20, arrival_window=30, speedup=2000,
+    )
+    report = asyncio.run(simulation.run(timeout=30))
+
+    assert report["scenario"]["attended"] == 12
+    assert report["endpoints"]["POST /queue/checkin"]["requests"] == 12
+    assert report["endpoints"]["POST /attendance/finish"]["round_trips_per_request"] == 1
+    assert all(item["errors"] == 0 for item in report["endpoints"].values())
+    assert compare(report, report, max_regression=0) == []
+
+
+def test_compare_flags_regressions():
+    """p95 acima da tolerância e do piso absoluto, e idas extras ao banco, são regressões"""
+    baseline = {"endpoints": {"GET /queue/position": {
+        "requests": 100, "errors": 0, "p95_ms": 1.0, "round_trips_per_request": 0.1,
+    }}}
+    report = {"endpoints": {"GET /queue/position": {
+        "requests": 100, "errors": 0, "p95_ms": 2.5, "round_trips_per_request": 2.0,
+    }}}
+
+    problems = compare(report, baseline, max_regression=0.25)
+
+    assert len(problems) == 2
+    assert compare(report, baseline, max_regression=1.0) != []
+
+
+def test_compare_ignores_sub_millisecond_noise():
+    """p95 de 0,2 ms para 0,4 ms (+100%) é ruído, não regressão"""
+    baseline = {"endpoints": {"GET /queue/position": {
+        "requests": 100, "errors": 0, "p95_ms": 0.2, "round_trips_per_request": 0.1,
+    }}}
+    report = {"endpoints": {"GET /queue/position": {
+        "requests": 100, "errors": 0, "p95_ms": 0.4, "round_trips_per_request": 0.1,
+    }}}
+
+    assert compare(report, baseline, max_regression=0.25) == []
+    assert len(compare(report, baseline, max_regression=0.25, min_regression_ms=0.1)) == 1
+
+    # Poucas amostras: o p95 não é comparado
+    few = {"endpoints": {"GET /queue/position": {**report["endpoints"]["GET /queue/position"], "requests": 20}}}
+    assert compare(few, baseline, max_regression=0.25, min_regression_ms=0.1) == []
+
+
+def test_median_report_across_runs():
+    """Medianas por endpoint; erros somados"""
+    def run_report(p95, errors=0):
+        return {
+            "wall_seconds": 1.0, "requests": 10, "throughput_rps": 10.0,
+            "scenario": {"patients": 5, "attended": 5},
+            "endpoints": {"POST /queue/next": {
+                "requests": 10, "errors": errors, "p50_ms": 1.0, "p95_ms": p95,
+                "p99_ms": p95, "throughput_rps": 10.0, "round_trips_per_request": 1.0,
+            }},
+        }
+
+    report = median_report([run_report(1.0), run_report(9.0, errors=1), run_report(2.0)])
+
+    assert report["runs"] == 3
+    assert report["endpoints"]["POST /queue/next"]["p95_ms"] == 2.0
+    assert report["endpoints"]["POST /queue/next"]["errors"] == 1
+
+
+def test_generated_load_does_not_depend_on_scheduling():
+    """Mesma semente, mesma carga: cada ator tem o próprio gerador"""
+    first = ClinicDay(app, LocalClient(), patients=5, doctors=2, seed=7)
+    second = ClinicDay(app, LocalClient(), patients=5, doctors=2, seed=7)
+
+    # Ordem de consumo diferente entre os atores não altera a sequência de cada um
+    consults = [first.random_for("doctor-1").random(), first.random_for("doctor-0").random()]
+    assert consults == [second.random_for("doctor-1").random(), second.random_for("doctor-0").random()]
+
+    assert asyncio.run(first.seed_profiles())[0] == asyncio.run(second.seed_profiles())[0]
+    assert first.random_for("doctor-0").random() != first.random_for("doctor-1").random()
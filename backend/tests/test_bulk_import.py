@@ -0,0 +1,162 @@
+import asyncio
+import json
+import uuid
+import pytest
+from fastapi.testclient import TestClient
+from app.core.bulk_import import iter_rows
+from app.core.config import settings
+from app.core.dependencies import get_current_user
+from app.services.queue_index import queue_index
+from app.services.queue_service import queue_service
+from main import app
+
+client = TestClient(app)
+
+ADMIN_ID = str(uuid.uuid4())
+
+
+async def chunks_of(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(rows):
+    return [row async for row in rows]
+
+
+def ndjson(rows):
+    return "\n".join(json.dumps(row) for row in rows).encode()
+
+
+@pytest.fixture
+def local(local, monkeypatch):
+    """Backend local (conftest) com um admin autenticado"""
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: ADMIN_ID)
+    asyncio.run(local.table("PROFILES").insert({"id": ADMIN_ID, "role": "admin"}).execute())
+
+    return local
+
+
+# -----------------------------
+# Leitura do arquivo
+# -----------------------------
+def test_ndjson_rows_split_across_chunks():
+    """Linhas (e caracteres UTF-8) divididos entre partes são remontados"""
+    data = '{"full_name": "José"}\n\n[1]\n{"x": \n{"full_name": "Ana"}'.encode()
+
+    rows = asyncio.run(collect(iter_rows(chunks_of(data, 3), "ndjson")))
+
+    assert rows[0] == (1, {"full_name": "José"}, None)
+    assert rows[1] == (3, None, "A linha deve conter um objeto JSON")
+    assert rows[2][0] == 4 and rows[2][2].startswith("JSON inválido")
+    assert rows[3] == (5, {"full_name": "Ana"}, None)
+
+
+def test_csv_rows_with_quoted_newlines():
+    """Cabeçalho, valores vazios como null e campos entre aspas com quebra de linha"""
+    data = b'id,address,role\r\n1,"Rua A,\n10",doctor\n2,,\n3,x\n'
+
+    rows = asyncio.run(collect(iter_rows(chunks_of(data, 4), "csv")))
+
+    assert rows == [
+        (2, {"id": "1", "address": "Rua A,\n10", "role": "doctor"}, None),
+        (4, {"id": "2", "address": None, "role": None}, None),
+        (5, None, "Esperadas 3 colunas, encontradas 2"),
+    ]
+
+
+# -----------------------------
+# Perfis
+# -----------------------------
+def test_import_profiles_in_batches(local, monkeypatch):
+    """Linhas válidas gravadas em lotes; inválidas reportadas com a linha"""
+    monkeypatch.setattr(settings, "IMPORT_BATCH_SIZE", 50)
+    ids = [str(uuid.uuid4()) for _ in range(120)]
+    rows = [{"id": profile_id, "full_name": f"Paciente {i}"} for i, profile_id in enumerate(ids)]
+    rows[10]["role"] = "nurse"
+    rows[20]["id"] = "abc"
+    rows[30]["id"] = ids[0]
+
+    calls = local.db.calls
+    response = client.post("/api/v1/profiles/import", content=ndjson(rows))
+
+    assert response.status_code == 200
+    report = response.json()
+    assert report["received"] == 120
+    assert report["imported"] == 117
+    assert [error["line"] for error in report["errors"]] == [11, 21, 31]
+    assert "role inválido" in report["errors"][0]["error"]
+    assert local.db.calls - calls == 1 + 3  # perfil do admin + 117 linhas em lotes de 50
+
+    stored = local.db.tables["PROFILES"]
+    assert len(stored) == 118
+    assert stored[-1]["priority"] is False
+
+
+def test_import_profiles_duplicate_key_falls_back_to_rows(local):
+    """Lote rejeitado pelo banco: as linhas são regravadas uma a uma"""
+    existing = str(uuid.uuid4())
+    asyncio.run(local.table("PROFILES").insert({"id": existing}).execute())
+    new_id = str(uuid.uuid4())
+    data = f"id,priority,date_of_birth\n{new_id},sim,1990-05-01\n{existing},,\n".encode()
+
+    response = client.post("/api/v1/profiles/import?format=csv", content=data)
+
+    report = response.json()
+    assert report["imported"] == 1
+    assert report["errors"][0]["line"] == 3
+    assert "duplicate key" in report["errors"][0]["error"]
+
+    profile = next(row for row in local.db.tables["PROFILES"] if row["id"] == new_id)
+    assert profile["priority"] is True
+    assert profile["date_of_birth"] == "1990-05-01"
+
+
+def test_import_requires_admin(local, monkeypatch):
+    patient_id = str(uuid.uuid4())
+    asyncio.run(local.table("PROFILES").insert({"id": patient_id, "role": "patient"}).execute())
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: patient_id)
+
+    response = client.post("/api/v1/queue/import", content=b"")
+
+    assert response.status_code == 403
+
+
+# -----------------------------
+# Check-ins pré-agendados
+# -----------------------------
+def test_import_checkins_respects_queue_rules(local):
+    """Perfil inexistente, paciente já na fila e repetidos são rejeitados; ordem da fila mantida"""
+    normal, priority, waiting = (str(uuid.uuid4()) for _ in range(3))
+    asyncio.run(local.table("PROFILES").insert([
+        {"id": normal}, {"id": priority, "priority": True}, {"id": waiting},
+    ]).execute())
+    asyncio.run(queue_service.checkin_queue(waiting))
+
+    rows = [
+        {"profile_id": normal, "checkin": "2025-01-10T08:00:00"},
+        {"profile_id": priority, "checkin": "2025-01-10T09:00:00-03:00"},
+        {"profile_id": waiting},
+        {"profile_id": str(uuid.uuid4())},
+        {"profile_id": normal},
+        {"profile_id": priority, "status": "being_attended"},
+    ]
+    response = client.post("/api/v1/queue/import", content=ndjson(rows))
+
+    report = response.json()
+    assert report["imported"] == 2
+    assert {error["line"]: error["error"] for error in report["errors"]} == {
+        3: "Paciente já está na fila",
+        4: "Perfil não encontrado",
+        5: f"profile_id repetido no arquivo: {normal}",
+        6: "Colunas desconhecidas: status",
+    }
+
+    entry = next(row for row in local.db.tables["QUEUE"] if row["profile_id"] == normal)
+    assert entry["status"] == "waiting"
+    assert entry["checkin"] == "2025-01-10T11:00:00.000000+00:00"  # sem timezone: Fortaleza
+
+    # Índice em memória atualizado: prioritário primeiro, depois por check-in
+    assert queue_index.position(priority) == 1
+    assert queue_index.position(normal) == 2
+    assert queue_index.position(waiting) == 3
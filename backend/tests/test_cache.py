@@ -0,0 +1,107 @@
+import asyncio
+from app.core.cache import MicroCache
+from app.core.local_backend import LocalClient
+from app.services.queue_service import queue_service
+
+
+def test_concurrent_reads_share_one_load():
+    """Leituras simultâneas da mesma chave: um único carregamento"""
+    cache = MicroCache(ttl_seconds=60)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return ["u1"]
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_load("queue", loader) for _ in range(50)))
+        cached = await cache.get_or_load("queue", loader)
+        other = await cache.get_or_load("other", loader)
+        return results, cached, other
+
+    results, cached, other = asyncio.run(scenario())
+
+    assert len(loads) == 2
+    assert all(result == ["u1"] for result in results)
+    assert cached == ["u1"] and other == ["u1"]
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["hits"] == 50
+
+
+def test_errors_are_shared_but_not_cached():
+    cache = MicroCache(ttl_seconds=60)
+    attempts = []
+
+    async def loader():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        if len(attempts) == 1:
+            raise ConnectionError("backend down")
+        return "ok"
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(cache.get_or_load("k", loader) for _ in range(5)),
+            return_exceptions=True,
+        )
+        return results, await cache.get_or_load("k", loader)
+
+    results, retried = asyncio.run(scenario())
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert retried == "ok"
+    assert len(attempts) == 2
+
+
+def test_invalidate_discards_in_flight_result():
+    """Carga iniciada antes de uma alteração não é armazenada"""
+    cache = MicroCache(ttl_seconds=60)
+    versions = iter(["old", "new"])
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        return next(versions)
+
+    async def scenario():
+        pending = asyncio.ensure_future(cache.get_or_load("k", loader))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        return await pending, await cache.get_or_load("k", loader)
+
+    assert asyncio.run(scenario()) == ("old", "new")
+
+
+def test_zero_ttl_still_coalesces():
+    cache = MicroCache(ttl_seconds=0)
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        return 1
+
+    async def scenario():
+        await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(10)))
+        await cache.get_or_load("k", loader)
+
+    asyncio.run(scenario())
+    assert len(loads) == 2
+
+
+def test_queue_polling_load_independent_of_screens(monkeypatch):
+    """100 telas consultando a fila ao mesmo tempo: uma ida ao banco"""
+    local = LocalClient()
+    monkeypatch.setattr(queue_service, "table", local.table("QUEUE"))
+    monkeypatch.setattr(queue_service, "reads", MicroCache(ttl_seconds=1.0))
+
+    async def scenario():
+        await asyncio.gather(*(queue_service.get_queue() for _ in range(100)))
+
+    asyncio.run(scenario())
+    assert local.db.calls == 1
+
+    # Alteração na fila invalida o micro-cache
+    asyncio.run(queue_service._invalidate_shared())
+    asyncio.run(scenario())
+    assert local.db.calls == 2
@@ -0,0 +1,101 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from main import app
+from app.core.compression import CompressionMiddleware, _accepted_encodings
+from app.core.responses import FastJSONResponse
+from app.services.queue_service import queue_service
+from conftest import as_async
+
+client = TestClient(app)
+
+API = "/api/v1/queue"
+
+LARGE_QUEUE = [
+    {"id": f"q{i}", "profile_id": f"p{i}", "status": "waiting", "checkin": "2025-01-01T10:00:00-03:00"}
+    for i in range(200)
+]
+
+
+def test_large_list_is_gzipped(monkeypatch):
+    monkeypatch.setattr(queue_service, "get_queue", as_async(lambda: LARGE_QUEUE))
+
+    response = client.get(f"{API}/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    # content-length é o tamanho comprimido; content já vem descomprimido
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == LARGE_QUEUE
+
+
+def test_brotli_preferred_when_accepted(monkeypatch):
+    pytest.importorskip("brotli")
+    monkeypatch.setattr(queue_service, "get_queue", as_async(lambda: LARGE_QUEUE))
+
+    response = client.get(f"{API}/", headers={"Accept-Encoding": "gzip, br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == LARGE_QUEUE
+
+
+def test_small_response_not_compressed(monkeypatch):
+    monkeypatch.setattr(queue_service, "get_queue", as_async(lambda: ["u1"]))
+
+    response = client.get(f"{API}/", headers={"Accept-Encoding": "gzip, br"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == ["u1"]
+
+
+def _streaming_app():
+    stream_app = FastAPI()
+    stream_app.add_middleware(CompressionMiddleware, minimum_size=10)
+
+    @stream_app.get("/chunks")
+    def chunks():
+        return StreamingResponse(iter([b"a" * 100, b"b" * 100]), media_type="text/plain")
+
+    @stream_app.get("/events")
+    def events():
+        return StreamingResponse(iter([b"data: 1\n\n" * 20]), media_type="text/event-stream")
+
+    @stream_app.get("/encoded")
+    def encoded():
+        return PlainTextResponse("x" * 100, headers={"Content-Encoding": "identity"})
+
+    return TestClient(stream_app)
+
+
+def test_brotli_streaming_response():
+    pytest.importorskip("brotli")
+    response = _streaming_app().get("/chunks", headers={"Accept-Encoding": "br"})
+
+    assert response.headers["content-encoding"] == "br"
+    assert "content-length" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == b"a" * 100 + b"b" * 100
+
+
+def test_brotli_skips_event_stream_and_encoded_responses():
+    pytest.importorskip("brotli")
+    stream_client = _streaming_app()
+
+    response = stream_client.get("/events", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers
+    assert response.content == b"data: 1\n\n" * 20
+
+    response = stream_client.get("/encoded", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "identity"
+    assert response.content == b"x" * 100
+
+
+def test_accepted_encodings_ignores_q_zero():
+    assert _accepted_encodings("gzip, br;q=0") == {"gzip"}
+    assert _accepted_encodings("br;q=0.8, gzip;q=1.0") == {"br", "gzip"}
+
+
+def test_fast_json_response_renders_compact_json():
+    response = FastJSONResponse({"a": [1, "ç"], 1: None})
+    assert response.body == '{"a":[1,"ç"],"1":null}'.encode()
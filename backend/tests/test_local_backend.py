@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+from postgrest.exceptions import APIError
+from app.core.local_backend import LocalClient
+from app.core.pagination import apply_keyset, next_cursor
+from app.services.attendance_service import attendance_service
+from app.services.queue_index import queue_index
+from app.services.queue_service import queue_service
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def add_profile(client, profile_id, priority=False):
+    return run(client.table("PROFILES").insert({"id": profile_id, "priority": priority}).execute())
+
+
+# -----------------------------
+# Tabelas e filtros
+# -----------------------------
+def test_insert_fills_schema_defaults():
+    """Inserção gera id, timestamps e colunas padrão do esquema"""
+    client = LocalClient()
+    row = run(client.table("QUEUE").insert({
+        "profile_id": "p1",
+        "checkin": "2025-01-01T10:00:00-03:00",
+        "status": "waiting",
+    }).execute()).data[0]
+
+    assert row["id"]
+    assert row["assigned_doctor_id"] is None
+    assert row["checkin"] == "2025-01-01T13:00:00.000000+00:00"
+    assert row["inserted_at"] == row["updated_at"]
+
+
+def test_single_without_rows_raises():
+    """single() sem resultado falha como no PostgREST"""
+    client = LocalClient()
+
+    with pytest.raises(APIError) as exc:
+        run(client.table("PROFILES").select("*").eq("id", "x").single().execute())
+
+    assert exc.value.code == "PGRST116"
+
+
+def test_keyset_pagination_walks_all_rows():
+    """Filtro or= do cursor pagina por (started_at, id) sem repetir linhas"""
+    client = LocalClient()
+    for hour in (10, 9, 10, 8, 10):
+        run(client.table("RECORD_MEDICAL").insert({
+            "doctor_id": "d1",
+            "patient_id": "p1",
+            "started_at": f"2025-01-01T{hour:02d}:00:00+00:00",
+        }).execute())
+
+    seen, cursor = [], None
+    while True:
+        query = client.table("RECORD_MEDICAL").select("id,started_at")
+        page = run(apply_keyset(query, "started_at", cursor, 2).execute()).data
+        seen.extend(row["id"] for row in page)
+        cursor = next_cursor(page, 2, "started_at")
+        if cursor is None:
+            break
+
+    assert seen == [4, 2, 1, 3, 5]
+
+
+# -----------------------------
+# Serviços sobre o backend local
+# -----------------------------
+def test_ordered_waiting_embeds_priority(local):
+    """Join com PROFILES ordena prioritários primeiro e achata o campo priority"""
+    add_profile(local, "p1")
+    add_profile(local, "p2", priority=True)
+
+    run(queue_service.checkin_queue("p1"))
+    run(queue_service.checkin_queue("p2"))
+
+    entries = run(queue_service.get_ordered_waiting())
+
+    assert [e["profile_id"] for e in entries] == ["p2", "p1"]
+    assert [e["priority"] for e in entries] == [True, False]
+    assert "patient" not in entries[0]
+
+
+def test_position_after_checkin_on_another_worker(local):
+    """Paciente ausente do índice recente: recarregado uma vez, sem esperar a expiração"""
+    add_profile(local, "p1")
+    add_profile(local, "p2", priority=True)
+    run(queue_service.checkin_queue("p1"))
+    assert run(queue_service.get_position("p1")) == 1
+
+    # Check-in gravado por outro worker: este índice ainda não o conhece
+    run(local.table("QUEUE").insert({
+        "profile_id": "p2", "checkin": "2025-01-01T10:00:00+00:00", "status": "waiting",
+    }).execute())
+    assert not queue_index.is_stale()
+
+    assert run(queue_service.get_position("p2")) == 1
+    assert run(queue_service.get_position("p1")) == 2
+
+    # Ausências seguintes reaproveitam a mesma recarga (READ_CACHE_TTL_SECONDS)
+    calls = local.db.calls
+    assert run(queue_service.get_position("p9")) is None
+    assert local.db.calls == calls
+
+
+def test_full_attendance_cycle(local):
+    """Check-in, chamada, atendimento atual e finalização sem Supabase"""
+    add_profile(local, "p1")
+    add_profile(local, "p2")
+
+    run(queue_service.checkin_queue("p1"))
+    run(queue_service.checkin_queue("p2"))
+    assert run(queue_service.get_position("p2")) == 2
+
+    called = run(queue_service.advance_queue("d1"))
+    assert called["already_attending"] is False
+    assert called["patient"]["profile_id"] == "p1"
+    assert run(queue_service.get_position("p2")) == 1
+
+    again = run(queue_service.advance_queue("d1"))
+    assert again["already_attending"] is True
+
+    current = run(attendance_service.get_current_attendance("d1"))
+    assert current["profile_id"] == "p1"
+
+    record = run(attendance_service.finish_attendance(
+        "d1", "S", "O", "A", "P", queue_entry_id=current["id"]
+    ))
+    assert record["patient_id"] == "p1"
+    assert record["started_at"] == current["checkin"]
+
+    # Retentativa idempotente retorna o mesmo registro
+    retry = run(attendance_service.finish_attendance(
+        "d1", "S", "O", "A", "P", queue_entry_id=current["id"]
+    ))
+    assert retry["id"] == record["id"]
+
+    with pytest.raises(ValueError):
+        run(attendance_service.finish_attendance("d1", "S", "O", "A", "P"))
+
+    assert run(attendance_service.get_current_attendance("d1")) is None
+
+
+def test_not_negates_next_filter_only():
+    """not_ nega apenas o filtro seguinte, como no PostgREST"""
+    client = LocalClient()
+    table = client.table("RECORD_MEDICAL")
+    run(table.insert({"patient_id": "a", "end_at": None}).execute())
+    run(table.insert({"patient_id": "b", "end_at": "2025-01-01T10:00:00+00:00"}).execute())
+    run(table.insert({"patient_id": "c", "end_at": "2025-01-01T11:00:00+00:00"}).execute())
+
+    rows = run(table.select("patient_id").not_.is_("end_at", "null").neq("patient_id", "c").execute()).data
+
+    assert rows == [{"patient_id": "b"}]
@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+from main import app
+from app.core.cache import TTLCache
+from app.core.metrics import MetricsRegistry, RequestMetrics, metrics, record_backend_call
+from app.services.queue_service import queue_service
+
+client = TestClient(app)
+
+
+def test_server_timing_counts_backend_calls(monkeypatch):
+    """Cada ida ao banco da requisição aparece no header Server-Timing"""
+    async def fake_get_queue():
+        record_backend_call(0.002)
+        record_backend_call(0.003)
+        return []
+
+    monkeypatch.setattr(queue_service, "get_queue", fake_get_queue)
+
+    response = client.get("/api/v1/queue/")
+
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert 'desc="2 calls"' in timing
+    assert "db;dur=5.0" in timing
+    assert "app;dur=" in timing
+
+
+def test_metrics_endpoint_aggregates_by_route(monkeypatch):
+    """/metrics exporta latência, requisições e chamadas ao banco por rota"""
+    async def fake_get_queue():
+        record_backend_call(0.001)
+        return []
+
+    monkeypatch.setattr(queue_service, "get_queue", fake_get_queue)
+    client.get("/api/v1/queue/")
+
+    body = client.get("/metrics").text
+
+    assert 'http_requests_total{method="GET",route="/queue/",status="200"}' in body
+    assert 'http_request_duration_seconds_count{method="GET",route="/queue/"}' in body
+    assert 'backend_calls_total{method="GET",route="/queue/"}' in body
+    assert 'cache_hit_ratio{cache="profiles"}' in body
+
+
+def test_registry_histogram_and_cache_stats():
+    """Buckets cumulativos e taxa de acerto dos caches registrados"""
+    registry = MetricsRegistry()
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    registry.register_cache("teste", cache)
+
+    request = RequestMetrics()
+    request.backend_calls = 3
+    registry.observe("GET", "/x", 200, 0.02, request)
+
+    body = registry.render()
+
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/x",le="0.01"} 0' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/x",le="0.025"} 1' in body
+    assert 'backend_calls_total{method="GET",route="/x"} 3' in body
+    assert 'cache_hit_ratio{cache="teste"} 0.5' in body
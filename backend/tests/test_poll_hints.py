@@ -0,0 +1,49 @@
+import asyncio
+from app.core.config import settings
+from app.services.poll_hints import CallRate, poll_interval
+
+
+def test_interval_grows_with_position_and_is_bounded():
+    """Um chamado a cada 3 min: o 1º consulta no mínimo, o fim da fila no máximo"""
+    rate = 1 / 180
+
+    assert poll_interval(1, rate) == settings.POLL_MIN_SECONDS
+    assert poll_interval(2, rate) == 45
+    assert poll_interval(3, rate) == 90
+    assert poll_interval(150, rate) == settings.POLL_MAX_SECONDS
+    assert poll_interval(None, rate) == settings.POLL_MAX_SECONDS
+
+
+def test_interval_shrinks_when_calls_speed_up():
+    assert poll_interval(5, 1 / 60) > poll_interval(5, 1 / 10)
+    assert poll_interval(5, 1 / 10) == 10
+
+
+def test_interval_without_recent_calls_uses_fallback_rate():
+    expected = int((3 - 1) * 60 / settings.POLL_FALLBACK_CALLS_PER_MINUTE * settings.POLL_WAIT_FRACTION)
+    assert poll_interval(3, None) == max(settings.POLL_MIN_SECONDS, expected)
+
+
+def test_call_rate_sliding_window():
+    rate = CallRate(window_seconds=600)
+    rate.started_at = 0.0
+
+    async def scenario():
+        assert await rate.per_second(now=100.0) is None
+        for t in (100.0, 200.0, 300.0):
+            await rate.record(now=t)
+
+        # Logo após a inicialização: 3 chamadas em 300 s
+        assert await rate.per_second(now=300.0) == 3 / 300
+        # Janela cheia: chamadas anteriores a 750 - 600 = 150 descartadas
+        assert await rate.per_second(now=750.0) == 2 / 600
+
+    asyncio.run(scenario())
+
+
+def test_polling_load_reduction_on_busy_day():
+    """150 pacientes, um chamado por minuto: carga muito menor que polling fixo de 10 s"""
+    adaptive = sum(1 / poll_interval(position, 1 / 60) for position in range(1, 151))
+    fixed = 150 / 10
+
+    assert fixed / adaptive >= 10
@@ -3,7 +3,7 @@ from main import app
 from app.core.dependencies import get_current_user
 from app.services.profile_service import profile_service
 
-from conftest import client, headers, headers_without_auth
+from conftest import client, headers, headers_without_auth, as_async
 
 
 # -------------------------
@@ -19,16 +19,38 @@ def test_get_all_profiles_success(client):
 def test_get_all_profiles_internal_error(monkeypatch, client):
     """Simula erro interno no service (500)"""
 
-    def mock_fail():
+    def mock_fail(**kwargs):
         raise Exception("Erro interno simulado")
 
-    monkeypatch.setattr(profile_service, "get_all_profiles", mock_fail)
+    monkeypatch.setattr(profile_service, "get_all_profiles", as_async(mock_fail))
 
     response = client.get("/api/v1/profiles/")
     assert response.status_code == 500
     assert "Erro interno simulado" in response.json()["detail"]
 
 
+def test_get_all_profiles_paginated(monkeypatch, client):
+    """Página completa envia o cursor da próxima página; fields é repassado ao service"""
+    received = {}
+
+    def mock_page(**kwargs):
+        received.update(kwargs)
+        return [{"id": "p1", "inserted_at": "2025-01-01T10:00:00+00:00", "full_name": "A"}]
+
+    monkeypatch.setattr(profile_service, "get_all_profiles", as_async(mock_page))
+
+    response = client.get("/api/v1/profiles/?limit=1&fields=full_name")
+    assert response.status_code == 200
+    assert received == {"limit": 1, "cursor": None, "fields": "full_name"}
+    assert response.headers["X-Next-Cursor"]
+
+
+def test_get_all_profiles_invalid_cursor(client):
+    """Cursor inválido retorna 400"""
+    response = client.get("/api/v1/profiles/?cursor=invalido")
+    assert response.status_code == 400
+
+
 # -------------------------
 # GET /profiles/me
 # -------------------------
@@ -43,7 +65,7 @@ def test_get_my_profile_success(client):
 
     # Substitui função real por mock
     original = profile_service.get_profile
-    profile_service.get_profile = mock_profile
+    profile_service.get_profile = as_async(mock_profile)
 
     response = client.get("/api/v1/profiles/me")
 
@@ -81,7 +103,7 @@ def test_get_my_profile_not_found(client):
         return None
 
     original = profile_service.get_profile
-    profile_service.get_profile = mock_none
+    profile_service.get_profile = as_async(mock_none)
 
     response = client.get("/api/v1/profiles/me")
 
@@ -102,7 +124,7 @@ def test_get_profile_by_id_success(client):
         return {"id": _id, "name": "Perfil AAA"}
 
     original = profile_service.get_profile
-    profile_service.get_profile = mock_profile
+    profile_service.get_profile = as_async(mock_profile)
 
     response = client.get("/api/v1/profiles/123")
     assert response.status_code == 200
@@ -118,7 +140,7 @@ def test_get_profile_by_id_not_found(client):
         return None
 
     original = profile_service.get_profile
-    profile_service.get_profile = mock_none
+    profile_service.get_profile = as_async(mock_none)
 
     response = client.get("/api/v1/profiles/999")
     assert response.status_code in [404, 500]
@@ -133,9 +155,51 @@ def test_get_profile_by_id_internal_error(monkeypatch, client):
     def mock_fail(_):
         raise Exception("Falha geral")
 
-    monkeypatch.setattr(profile_service, "get_profile", mock_fail)
+    monkeypatch.setattr(profile_service, "get_profile", as_async(mock_fail))
 
     response = client.get("/api/v1/profiles/10")
 
     assert response.status_code == 500
     assert "Falha geral" in response.json()["detail"]
+
+
+# -------------------------
+# Cache de perfis (ProfileService)
+# -------------------------
+def test_get_profile_read_through_cache(monkeypatch):
+    """Segunda leitura do mesmo perfil é servida pelo cache"""
+    import asyncio
+    from unittest.mock import AsyncMock, MagicMock
+
+    table = MagicMock()
+    query = table.select.return_value.eq.return_value.single.return_value
+    query.execute = AsyncMock(return_value=MagicMock(data={"id": "p1", "priority": True}))
+    monkeypatch.setattr(profile_service, "table", table)
+    profile_service.clear_cache()
+    hits = profile_service.cache.hits
+
+    assert asyncio.run(profile_service.get_profile("p1"))["id"] == "p1"
+    assert asyncio.run(profile_service.get_priority("p1")) is True
+    assert query.execute.await_count == 1
+    assert profile_service.cache.hits == hits + 1
+
+    # Invalidação explícita força nova leitura do banco
+    asyncio.run(profile_service.invalidate_profiles(["p1"]))
+    asyncio.run(profile_service.get_profile("p1"))
+    assert query.execute.await_count == 2
+
+    profile_service.clear_cache()
+
+
+def test_get_profile_returns_copies(local):
+    """Alterar o perfil retornado não altera o cache (na falta e no acerto)"""
+    import asyncio
+
+    asyncio.run(local.table("PROFILES").insert({"id": "p1", "role": "patient"}).execute())
+
+    missed = asyncio.run(profile_service.get_profile("p1"))
+    missed["role"] = "admin"
+    hit = asyncio.run(profile_service.get_profile("p1"))
+    hit["role"] = "admin"
+
+    assert asyncio.run(profile_service.get_profile("p1"))["role"] == "patient"
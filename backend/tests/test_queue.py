@@ -1,9 +1,12 @@
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 from main import app
 from app.services.queue_service import queue_service
+from app.services.queue_index import queue_index
 from app.core.dependencies import get_current_user
+from conftest import as_async
 
 client = TestClient(app)
 
@@ -23,7 +26,7 @@ API = "/api/v1/queue"   # <- Prefixo real das rotas
 # GET /queue/
 # -----------------------------
 def test_get_queue_success(monkeypatch):
-    monkeypatch.setattr(queue_service, "get_queue", lambda: ["u1", "u2"])
+    monkeypatch.setattr(queue_service, "get_queue", as_async(lambda: ["u1", "u2"]))
     response = client.get(f"{API}/")
     assert response.status_code == 200
     assert response.json() == ["u1", "u2"]
@@ -32,7 +35,7 @@ def test_get_queue_success(monkeypatch):
 def test_get_queue_internal_error(monkeypatch):
     def raise_error():
         raise Exception("Erro interno")
-    monkeypatch.setattr(queue_service, "get_queue", raise_error)
+    monkeypatch.setattr(queue_service, "get_queue", as_async(raise_error))
 
     response = client.get(f"{API}/")
     assert response.status_code == 500
@@ -43,7 +46,7 @@ def test_get_queue_internal_error(monkeypatch):
 # POST /queue/checkin
 # -----------------------------
 def test_checkin_success(monkeypatch):
-    monkeypatch.setattr(queue_service, "checkin_queue", lambda user: {"status": "ok", "user": user})
+    monkeypatch.setattr(queue_service, "checkin_queue", as_async(lambda user: {"status": "ok", "user": user}))
 
     response = client.post(f"{API}/checkin")
     assert response.status_code == 200
@@ -53,7 +56,7 @@ def test_checkin_success(monkeypatch):
 def test_checkin_internal_error(monkeypatch):
     def raise_error(user):
         raise Exception("Falha ao fazer check-in")
-    monkeypatch.setattr(queue_service, "checkin_queue", raise_error)
+    monkeypatch.setattr(queue_service, "checkin_queue", as_async(raise_error))
 
     response = client.post(f"{API}/checkin")
     assert response.status_code == 500
@@ -64,7 +67,7 @@ def test_checkin_internal_error(monkeypatch):
 # DELETE /queue/checkin
 # -----------------------------
 def test_cancel_checkin_success(monkeypatch):
-    monkeypatch.setattr(queue_service, "cancel_checkin", lambda user: True)
+    monkeypatch.setattr(queue_service, "cancel_checkin", as_async(lambda user: True))
 
     response = client.delete(f"{API}/checkin")
     assert response.status_code == 200
@@ -72,7 +75,7 @@ def test_cancel_checkin_success(monkeypatch):
 
 
 def test_cancel_checkin_not_found(monkeypatch):
-    monkeypatch.setattr(queue_service, "cancel_checkin", lambda user: False)
+    monkeypatch.setattr(queue_service, "cancel_checkin", as_async(lambda user: False))
 
     response = client.delete(f"{API}/checkin")
 
@@ -85,7 +88,7 @@ def test_cancel_checkin_not_found(monkeypatch):
 def test_cancel_checkin_internal_error(monkeypatch):
     def raise_exc(user):
         raise Exception("Erro ao cancelar")
-    monkeypatch.setattr(queue_service, "cancel_checkin", raise_exc)
+    monkeypatch.setattr(queue_service, "cancel_checkin", as_async(raise_exc))
 
     response = client.delete(f"{API}/checkin")
     assert response.status_code == 500
@@ -96,36 +99,42 @@ def test_cancel_checkin_internal_error(monkeypatch):
 # GET /queue/position
 # -----------------------------
 def test_get_position_waiting(monkeypatch):
-    monkeypatch.setattr(queue_service, "get_position", lambda user: 3)
-    monkeypatch.setattr(queue_service, "is_being_attended", lambda user: False)
+    monkeypatch.setattr(queue_service, "get_position", as_async(lambda user: 3))
+    monkeypatch.setattr(queue_service, "is_being_attended", as_async(lambda user: False))
 
     response = client.get(f"{API}/position")
     assert response.status_code == 200
-    assert response.json() == {"status": "waiting", "position": 3}
+    body = response.json()
+    assert body.pop("poll_interval_seconds") == int(response.headers["X-Poll-Interval"])
+    assert body == {"status": "waiting", "position": 3}
 
 
 def test_get_position_called(monkeypatch):
-    monkeypatch.setattr(queue_service, "get_position", lambda user: None)
-    monkeypatch.setattr(queue_service, "is_being_attended", lambda user: True)
+    monkeypatch.setattr(queue_service, "get_position", as_async(lambda user: None))
+    monkeypatch.setattr(queue_service, "is_being_attended", as_async(lambda user: True))
 
     response = client.get(f"{API}/position")
     assert response.status_code == 200
-    assert response.json() == {"status": "called"}
+    body = response.json()
+    assert body.pop("poll_interval_seconds") == int(response.headers["X-Poll-Interval"])
+    assert body == {"status": "called"}
 
 
 def test_get_position_not_in_queue(monkeypatch):
-    monkeypatch.setattr(queue_service, "get_position", lambda user: None)
-    monkeypatch.setattr(queue_service, "is_being_attended", lambda user: False)
+    monkeypatch.setattr(queue_service, "get_position", as_async(lambda user: None))
+    monkeypatch.setattr(queue_service, "is_being_attended", as_async(lambda user: False))
 
     response = client.get(f"{API}/position")
     assert response.status_code == 200
-    assert response.json() == {"status": "not_in_queue"}
+    body = response.json()
+    assert body.pop("poll_interval_seconds") == int(response.headers["X-Poll-Interval"])
+    assert body == {"status": "not_in_queue"}
 
 
 def test_get_position_internal_error(monkeypatch):
     def raise_error(user):
         raise Exception("Erro inesperado")
-    monkeypatch.setattr(queue_service, "get_position", raise_error)
+    monkeypatch.setattr(queue_service, "get_position", as_async(raise_error))
 
     response = client.get(f"{API}/position")
     assert response.status_code == 500
@@ -136,7 +145,7 @@ def test_get_position_internal_error(monkeypatch):
 # POST /queue/next
 # -----------------------------
 def test_call_next_empty_queue(monkeypatch):
-    monkeypatch.setattr(queue_service, "advance_queue", lambda doc: None)
+    monkeypatch.setattr(queue_service, "advance_queue", as_async(lambda doc: None))
 
     response = client.post(f"{API}/next")
     assert response.status_code == 200
@@ -144,10 +153,10 @@ def test_call_next_empty_queue(monkeypatch):
 
 
 def test_call_next_already_attending(monkeypatch):
-    monkeypatch.setattr(queue_service, "advance_queue", lambda doc: {
+    monkeypatch.setattr(queue_service, "advance_queue", as_async(lambda doc: {
         "already_attending": True,
         "patient": "u567"
-    })
+    }))
 
     response = client.post(f"{API}/next")
     assert response.status_code == 200
@@ -158,9 +167,9 @@ def test_call_next_already_attending(monkeypatch):
 
 
 def test_call_next_success(monkeypatch):
-    monkeypatch.setattr(queue_service, "advance_queue", lambda doc: {
+    monkeypatch.setattr(queue_service, "advance_queue", as_async(lambda doc: {
         "patient": "u890"
-    })
+    }))
 
     response = client.post(f"{API}/next")
     assert response.status_code == 200
@@ -173,8 +182,177 @@ def test_call_next_success(monkeypatch):
 def test_call_next_internal_error(monkeypatch):
     def raise_error(doc):
         raise Exception("Falha geral")
-    monkeypatch.setattr(queue_service, "advance_queue", raise_error)
+    monkeypatch.setattr(queue_service, "advance_queue", as_async(raise_error))
 
     response = client.post(f"{API}/next")
     assert response.status_code == 500
     assert response.json()["detail"] == "Falha geral"
+
+
+# -----------------------------
+# QueueService.get_ordered_waiting
+# -----------------------------
+def test_get_ordered_waiting_single_query(monkeypatch):
+    """A ordenação usa uma única consulta com a prioridade embutida"""
+    table = MagicMock()
+    query = table.select.return_value.eq.return_value.order.return_value.order.return_value
+    query.execute = AsyncMock()
+    query.execute.return_value.data = [
+        {"id": "q1", "profile_id": "p1", "patient": {"priority": True}},
+        {"id": "q2", "profile_id": "p2", "patient": None},
+    ]
+    monkeypatch.setattr(queue_service, "table", table)
+
+    ordered = asyncio.run(queue_service.get_ordered_waiting())
+
+    assert table.select.call_count == 1
+    assert [item["priority"] for item in ordered] == [True, False]
+    assert all("patient" not in item for item in ordered)
+
+
+# -----------------------------
+# GET /queue/ordered
+# -----------------------------
+def test_get_ordered_queue_endpoint(monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, override_get_current_user)
+    ordered = [{"id": "q1", "rank": 1, "priority": True, "patient": {"full_name": "Ana"}}]
+    monkeypatch.setattr(queue_service, "get_ordered_queue", as_async(lambda: ordered))
+
+    response = client.get(f"{API}/ordered")
+    assert response.status_code == 200
+    assert response.json() == ordered
+
+
+def test_get_ordered_queue_ranks_in_single_query(monkeypatch):
+    """Rank, tempo de espera e resumo do perfil calculados de uma consulta só"""
+    table = MagicMock()
+    query = table.select.return_value.eq.return_value.order.return_value.order.return_value
+    query.execute = AsyncMock()
+    query.execute.return_value.data = [
+        {"id": "q1", "profile_id": "p1", "checkin": "2025-01-01T10:00:00-03:00",
+         "patient": {"full_name": "Ana", "priority": True}},
+        {"id": "q2", "profile_id": "p2", "checkin": "2025-01-01T09:00:00-03:00",
+         "patient": {"full_name": "Bruno", "priority": False}},
+    ]
+    monkeypatch.setattr(queue_service, "table", table)
+
+    ordered = asyncio.run(queue_service.get_ordered_queue())
+
+    assert table.select.call_count == 1
+    assert [item["rank"] for item in ordered] == [1, 2]
+    assert [item["priority"] for item in ordered] == [True, False]
+    assert ordered[0]["patient"] == {"full_name": "Ana"}
+    assert ordered[1]["wait_seconds"] > ordered[0]["wait_seconds"] > 0
+
+    # O índice de posições é renovado com a mesma leitura
+    assert queue_index.position("p2") == 2
+    queue_index.rebuild([])
+
+
+# -----------------------------
+# GET /queue/stream (eventos da fila)
+# -----------------------------
+from app.api.endpoints.queue import _next_position_state
+from app.services.queue_events import QueueEventBroker
+from app.services.queue_index import queue_index
+
+
+def test_event_broker_delivers_to_subscribers():
+    """Eventos publicados chegam a todos os assinantes"""
+    broker = QueueEventBroker()
+
+    async def scenario():
+        first = broker.subscribe()
+        second = broker.subscribe()
+        broker.publish({"type": "checkin", "profile_id": "p1"})
+        received = [await asyncio.wait_for(q.get(), timeout=1) for q in (first, second)]
+        broker.unsubscribe(first)
+        broker.unsubscribe(second)
+        return received
+
+    received = asyncio.run(scenario())
+    assert received == [{"type": "checkin", "profile_id": "p1"}] * 2
+    assert len(broker) == 0
+
+
+def test_stream_accepts_query_string_token(monkeypatch):
+    """EventSource não envia headers: o JWT pode vir no parâmetro access_token"""
+    import jwt
+    import time
+    from app.core import dependencies
+    from app.core.security import JWTVerifier
+
+    monkeypatch.setattr(dependencies.settings, "AUTH_MODE", "local")
+    monkeypatch.setattr(dependencies, "get_jwt_verifier", lambda: JWTVerifier(jwt_secret="segredo"))
+    token = jwt.encode(
+        {"sub": "user-123", "aud": "authenticated", "exp": int(time.time()) + 60}, "segredo", algorithm="HS256"
+    )
+
+    assert asyncio.run(dependencies.get_stream_user(None, token)) == "user-123"
+    assert asyncio.run(dependencies.get_stream_user(f"Bearer {token}", "ignorado")) == "user-123"
+
+    for authorization, access_token in [(None, None), (None, "token_invalido")]:
+        with pytest.raises(dependencies.HTTPException) as exc:
+            asyncio.run(dependencies.get_stream_user(authorization, access_token))
+        assert exc.value.status_code == 401
+
+    assert client.get(f"{API}/stream", params={"access_token": "token_invalido"}).status_code == 401
+
+
+def test_next_position_state_from_events(monkeypatch):
+    """O estado do paciente é derivado do evento e do índice em memória"""
+    monkeypatch.setattr(queue_index, "position", lambda user: 2 if user == "mock_user" else None)
+    waiting = {"status": "waiting", "position": 3}
+
+    assert _next_position_state("mock_user", waiting, {"type": "called", "profile_id": "outro"}) == {
+        "status": "waiting", "position": 2
+    }
+    assert _next_position_state("mock_user", waiting, {"type": "called", "profile_id": "mock_user"}) == {
+        "status": "called"
+    }
+    assert _next_position_state("mock_user", {"status": "called"}, {"type": "finished", "profile_id": "mock_user"}) == {
+        "status": "not_in_queue"
+    }
+
+    monkeypatch.setattr(queue_index, "position", lambda user: None)
+    assert _next_position_state("mock_user", waiting, {"type": "checkin", "profile_id": "outro"}) is None
+
+    # Evento de outro worker: o índice local pode não refleti-lo
+    remote = {"type": "checkin", "profile_id": "outro", "remote": True}
+    assert _next_position_state("mock_user", waiting, remote) is None
+    assert _next_position_state("mock_user", {"status": "not_in_queue"}, remote) == {"status": "not_in_queue"}
+    assert _next_position_state("mock_user", {"status": "not_in_queue"}, {**remote, "profile_id": "mock_user"}) is None
+
+
+# -----------------------------
+# QueueService.advance_queue (função claim_next_patient)
+# -----------------------------
+def test_advance_queue_uses_single_rpc(monkeypatch):
+    """A chamada do próximo paciente é uma única RPC atômica"""
+    from app.services import queue_service as queue_module
+
+    client_mock = MagicMock()
+    client_mock.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data={
+        "already_attending": False,
+        "patient": {"id": "q1", "profile_id": "p1", "status": "being_attended"},
+    }))
+    monkeypatch.setattr(queue_module, "supabase", client_mock)
+    queue_index.rebuild([{"id": "q1", "profile_id": "p1", "checkin": "2025-01-01T10:00:00+00:00"}])
+
+    result = asyncio.run(queue_service.advance_queue("doc1"))
+
+    client_mock.rpc.assert_called_once_with("claim_next_patient", {"p_doctor_id": "doc1"})
+    assert client_mock.table.call_count == 0
+    assert result["patient"]["profile_id"] == "p1"
+    assert queue_index.position("p1") is None
+
+
+def test_advance_queue_empty(monkeypatch):
+    """RPC retorna null quando a fila está vazia"""
+    from app.services import queue_service as queue_module
+
+    client_mock = MagicMock()
+    client_mock.rpc.return_value.execute = AsyncMock(return_value=MagicMock(data=None))
+    monkeypatch.setattr(queue_module, "supabase", client_mock)
+
+    assert asyncio.run(queue_service.advance_queue("doc1")) is None
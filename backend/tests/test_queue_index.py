@@ -0,0 +1,52 @@
+from app.services.queue_index import QueueIndex
+
+
+def make_entry(entry_id, profile_id, checkin, priority=False):
+    return {
+        "id": entry_id,
+        "profile_id": profile_id,
+        "checkin": checkin,
+        "priority": priority,
+    }
+
+
+def test_rebuild_orders_priority_first():
+    """Prioritários vêm antes, e cada grupo é ordenado por check-in"""
+    index = QueueIndex()
+    index.rebuild([
+        make_entry("q1", "p1", "2025-01-01T10:00:00-03:00"),
+        make_entry("q2", "p2", "2025-01-01T10:05:00-03:00", priority=True),
+        make_entry("q3", "p3", "2025-01-01T12:59:00+00:00"),
+    ])
+
+    assert index.position("p2") == 1
+    assert index.position("p3") == 2
+    assert index.position("p1") == 3
+    assert index.position("desconhecido") is None
+
+
+def test_add_and_remove_update_positions():
+    """Check-in, cancelamento e chamada atualizam as posições incrementalmente"""
+    index = QueueIndex()
+    index.rebuild([make_entry("q1", "p1", "2025-01-01T10:00:00-03:00")])
+
+    index.add(make_entry("q2", "p2", "2025-01-01T10:10:00-03:00", priority=True))
+    assert index.position("p2") == 1
+    assert index.position("p1") == 2
+
+    index.remove("p2")
+    assert index.position("p2") is None
+    assert index.position("p1") == 1
+    assert len(index) == 1
+
+
+def test_is_stale():
+    """Índice nunca carregado ou expirado deve ser recarregado"""
+    index = QueueIndex(max_age_seconds=60)
+    assert index.is_stale()
+
+    index.rebuild([])
+    assert not index.is_stale()
+
+    index.max_age_seconds = -1
+    assert index.is_stale()
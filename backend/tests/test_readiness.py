@@ -0,0 +1,107 @@
+import asyncio
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+import main
+from main import app
+from app.core.metrics import MetricsRegistry
+from app.core.readiness import Readiness
+from app.services.profile_service import profile_service
+from app.services.queue_index import queue_index
+from app.services.queue_service import queue_service
+
+
+def failing():
+    async def step():
+        raise ConnectionError("connection refused")
+    return step
+
+
+def test_start_runs_checks_and_warmups():
+    """Falha no aquecimento é registrada, mas não impede a inicialização"""
+    readiness = Readiness()
+
+    async def check():
+        return None
+
+    async def warm():
+        return 3
+
+    asyncio.run(readiness.start(
+        {"database": check},
+        {"queue_index": warm, "profiles": failing()},
+    ))
+
+    assert readiness.ready
+    assert readiness.cold_start_seconds > 0
+    assert readiness.checks["queue_index"]["detail"] == 3
+    assert readiness.checks["profiles"] == {
+        "ok": False,
+        "duration_ms": readiness.checks["profiles"]["duration_ms"],
+        "error": "connection refused",
+    }
+
+
+def test_start_retries_required_checks_until_timeout():
+    """Dependência obrigatória: novas tentativas e falha ao fim do prazo"""
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("not yet")
+
+    readiness = Readiness()
+    asyncio.run(readiness.start({"database": flaky}, {}, timeout_seconds=5, retry_seconds=0.01))
+    assert readiness.ready
+    assert len(attempts) == 3
+
+    readiness = Readiness()
+    with pytest.raises(RuntimeError, match="database: connection refused"):
+        asyncio.run(readiness.start({"database": failing()}, {}, timeout_seconds=0.05, retry_seconds=0.01))
+    assert readiness.status == "failed"
+
+
+def test_first_request_ignores_infra_routes():
+    registry = MetricsRegistry()
+    request = type("Request", (), {"backend_calls": 0, "backend_seconds": 0.0})()
+
+    registry.observe("GET", "/readyz", 200, 0.001, request)
+    assert registry.first_request_seconds is None
+
+    registry.observe("GET", "/queue/", 200, 0.25, request)
+    registry.observe("GET", "/queue/", 200, 0.01, request)
+    assert registry.first_request_seconds == 0.25
+    assert "app_first_request_duration_seconds 0.25" in registry.render()
+
+
+def test_lifespan_gates_readiness(local, monkeypatch):
+    """Ciclo de vida completo sobre o backend local: pronto após aquecer a fila"""
+    asyncio.run(local.table("PROFILES").insert({"id": "p1", "priority": True}).execute())
+    asyncio.run(local.table("QUEUE").insert({
+        "profile_id": "p1",
+        "checkin": "2025-01-01T10:00:00-03:00",
+        "status": "waiting",
+    }).execute())
+
+    monkeypatch.setattr(main, "readiness", Readiness())
+    monkeypatch.setattr(main, "supabase", local)
+    monkeypatch.setattr(main, "http_client", httpx.AsyncClient())
+    monkeypatch.setattr(main.settings, "AUTH_MODE", "remote")
+
+    plain = TestClient(app)
+    assert plain.get("/livez").status_code == 200
+    assert plain.get("/readyz").status_code == 503
+
+    with TestClient(app) as client:
+        response = client.get("/readyz")
+        assert response.status_code == 200
+        report = response.json()
+        assert report["status"] == "ready"
+        assert report["checks"]["database"]["ok"]
+        assert report["checks"]["queue_index"]["detail"] == 1
+        assert report["checks"]["profiles"]["detail"] == 1
+        assert profile_service.cache.get("p1")["priority"] is True
+        assert queue_index.position("p1") == 1
+
+    assert main.readiness.status == "stopping"
@@ -0,0 +1,201 @@
+import asyncio
+from datetime import datetime, timezone
+from pathlib import Path
+import pytest
+from fastapi.testclient import TestClient
+from app.core import record_archive as archive_module
+from app.core.dependencies import get_current_user
+from app.core.record_archive import ArchiveInProgress, RecordArchive
+from app.services import record_medical_service as record_module
+from app.services.record_medical_service import MedicalRecordService
+from main import app
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+client = TestClient(app)
+
+CUTOFF = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def archived(local, monkeypatch, tmp_path):
+    """Registros no backend local (conftest), com arquivo frio em diretório temporário"""
+    archive = RecordArchive(str(tmp_path), row_group_size=2)
+    monkeypatch.setattr(record_module, "record_archive", archive)
+
+    table = local.table("RECORD_MEDICAL")
+    for record_id, (started_at, patient_id, finished) in enumerate((
+        ("2024-01-10T10:00:00+00:00", "patient-1", True),
+        ("2024-01-20T10:00:00+00:00", "patient-2", True),
+        ("2024-02-05T10:00:00+00:00", "patient-1", True),
+        ("2024-03-01T10:00:00+00:00", "patient-1", False),  # em aberto: não arquiva
+        ("2025-06-01T10:00:00+00:00", "patient-1", True),   # recente: não arquiva
+    ), start=1):
+        run(table.insert({
+            "doctor_id": "doc-a",
+            "patient_id": patient_id,
+            "started_at": started_at,
+            "end_at": started_at.replace("10:00:00", "10:30:00") if finished else None,
+            "assessment": f"avaliação {record_id}",
+        }).execute())
+
+    return local, archive, tmp_path
+
+
+def test_archive_moves_old_finished_records(archived, monkeypatch):
+    """Registros antigos vão para o Parquet do mês; o banco fica só com os demais"""
+    local, archive, root = archived
+    monkeypatch.setattr(record_module.settings, "ARCHIVE_BATCH_SIZE", 2)
+    summary_before = run(MedicalRecordService().get_patient_summary("patient-1"))
+
+    result = run(MedicalRecordService().archive_old_records(before=CUTOFF))
+
+    assert result["archived"] == 3
+    assert result["partitions"] == ["2024-01", "2024-02"]
+    assert sorted(row["id"] for row in local.db.tables["RECORD_MEDICAL"]) == [4, 5]
+    assert len(list((root / "year=2024" / "month=01").glob("part-*.parquet"))) == 1
+    assert [p["records"] for p in archive.partitions()] == [2, 1]
+
+    # Visitas arquivadas continuam no resumo do paciente
+    assert run(MedicalRecordService().get_patient_summary("patient-1")) == summary_before
+
+    # Nova execução: nada a arquivar
+    assert run(MedicalRecordService().archive_old_records(before=CUTOFF))["archived"] == 0
+
+
+def test_reads_include_archived_records(archived):
+    local, archive, _ = archived
+    run(MedicalRecordService().archive_old_records(before=CUTOFF))
+    service = MedicalRecordService()
+
+    archived_record = run(service.get_by_id("1"))
+    assert archived_record["patient_id"] == "patient-1"
+    assert archived_record["assessment"] == "avaliação 1"
+    assert datetime.fromisoformat(archived_record["started_at"]) == datetime(2024, 1, 10, 10, tzinfo=timezone.utc)
+
+    assert run(service.get_by_id("5"))["id"] == 5
+    assert run(service.get_by_id("99")) is None
+
+    history = run(service.list_by_profile("patient-1"))
+    assert [row["id"] for row in history] == [1, 3, 4, 5]
+
+
+def test_interrupted_archive_does_not_duplicate(archived):
+    """Registro gravado no arquivo mas ainda no banco: aparece uma vez; regravação prevalece"""
+    local, archive, _ = archived
+    first = dict(local.db.tables["RECORD_MEDICAL"][0])
+    archive.write([first])
+    archive.write([{**first, "assessment": "revisado"}])
+
+    assert [(p["files"], p["records"]) for p in archive.partitions()] == [(2, 1)]
+    assert archive.get(1)["assessment"] == "revisado"
+    assert [row["assessment"] for row in archive.list_by_patient("patient-1")] == ["revisado"]
+
+    history = run(MedicalRecordService().list_by_profile("patient-1"))
+    assert [row["id"] for row in history] == [1, 3, 4, 5]
+    assert history[0]["assessment"] == "avaliação 1"  # versão do banco
+
+
+def test_each_batch_writes_new_files(archived, monkeypatch):
+    """Lotes seguintes no mesmo mês não reescrevem os arquivos já gravados"""
+    local, archive, root = archived
+    monkeypatch.setattr(record_module.settings, "ARCHIVE_BATCH_SIZE", 1)
+    month = root / "year=2024" / "month=01"
+
+    run(MedicalRecordService().archive_old_records(before=datetime(2024, 1, 15, tzinfo=timezone.utc)))
+    (first_file,) = month.glob("part-*.parquet")
+    written = first_file.stat().st_mtime_ns
+
+    run(MedicalRecordService().archive_old_records(before=CUTOFF))
+
+    assert len(list(month.glob("part-*.parquet"))) == 2
+    assert first_file.stat().st_mtime_ns == written
+    assert [row["id"] for row in archive.list_by_patient("patient-1")] == [1, 3]
+
+
+def test_archive_deletes_only_confirmed_records(archived, monkeypatch):
+    """Lote não confirmado no arquivo: nada é removido do banco"""
+    local, archive, _ = archived
+    write = archive.write
+    monkeypatch.setattr(archive, "write", lambda records: (write(records)[0], set()))
+
+    with pytest.raises(OSError):
+        run(MedicalRecordService().archive_old_records(before=CUTOFF))
+
+    assert len(local.db.tables["RECORD_MEDICAL"]) == 5
+
+
+def test_archive_runs_one_job_at_a_time(archived):
+    """Outro job com a trava (outro worker ou processo): recusa sem gravar nem remover"""
+    local, archive, root = archived
+
+    with RecordArchive(str(root)).exclusive():
+        with pytest.raises(ArchiveInProgress):
+            run(MedicalRecordService().archive_old_records(before=CUTOFF))
+
+    assert len(local.db.tables["RECORD_MEDICAL"]) == 5
+    assert archive.partitions() == []
+
+    assert run(MedicalRecordService().archive_old_records(before=CUTOFF))["archived"] == 3
+
+
+def test_archive_reads_only_files_with_the_patient(archived, monkeypatch):
+    local, archive, root = archived
+    run(MedicalRecordService().archive_old_records(before=CUTOFF))
+
+    reads = []
+    original = archive_module.ds.dataset
+    monkeypatch.setattr(archive_module.ds, "dataset", lambda paths, **kw: reads.extend(paths) or original(paths, **kw))
+
+    assert archive.list_by_patient("patient-2") != []
+    assert [Path(path).parent for path in reads] == [root / "year=2024" / "month=01"]
+
+    reads.clear()
+    assert archive.list_by_patient("patient-x") == []
+    assert reads == []
+
+    # Arquivos reabertos por outro processo reconstroem o índice a partir do disco
+    assert RecordArchive(str(root)).get(3)["patient_id"] == "patient-1"
+
+
+def test_index_sees_files_written_by_other_processes(archived, monkeypatch):
+    """Índice já carregado em outro worker: recarregado após nova gravação"""
+    local, archive, root = archived
+    monkeypatch.setattr(record_module.settings, "ARCHIVE_BATCH_SIZE", 1)
+    other_worker = RecordArchive(str(root))
+    assert other_worker.get(1) is None
+
+    run(MedicalRecordService().archive_old_records(before=datetime(2024, 1, 15, tzinfo=timezone.utc)))
+    assert other_worker.get(1)["patient_id"] == "patient-1"
+
+    # Apenas os arquivos novos são lidos na revalidação
+    reads = []
+    original = archive_module.pq.read_table
+    monkeypatch.setattr(archive_module.pq, "read_table", lambda path, **kw: reads.append(path) or original(path, **kw))
+    run(MedicalRecordService().archive_old_records(before=CUTOFF))
+
+    reads.clear()
+    assert [row["id"] for row in other_worker.list_by_patient("patient-1")] == [1, 3]
+    assert len(reads) == 2  # os dois arquivos do segundo job (janeiro e fevereiro)
+
+
+def test_archive_endpoint_requires_configuration(archived, monkeypatch):
+    local, _, _ = archived
+    run(local.table("PROFILES").insert({"id": "admin-1", "role": "admin"}).execute())
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: "admin-1")
+
+    response = client.post("/api/v1/records/archive?before=2025-01-01T00:00:00Z")
+    assert response.status_code == 200
+    assert response.json()["archived"] == 3
+
+    with record_module.record_archive.exclusive():
+        response = client.post("/api/v1/records/archive")
+    assert response.status_code == 409
+
+    monkeypatch.setattr(record_module, "record_archive", None)
+    response = client.post("/api/v1/records/archive")
+    assert response.status_code == 503
@@ -4,6 +4,9 @@ from main import app
 from unittest.mock import MagicMock
 from app.services.record_medical_service import MedicalRecordService
 from app.core.dependencies import get_current_user
+from conftest import as_async
+from app.core.pagination import decode_cursor, encode_cursor, parse_fields
+from app.services.record_medical_service import RECORD_COLUMNS
 
 client = TestClient(app)
 
@@ -20,11 +23,57 @@ API = "/api/v1/records"
 # GET /records/
 # -------------------------------------
 def test_list_all_records_success(monkeypatch):
-    monkeypatch.setattr(MedicalRecordService, "list_all", lambda self: [{"id": 1}, {"id": 2}])
+    monkeypatch.setattr(MedicalRecordService, "list_all", as_async(lambda self, **kwargs: [{"id": 1}, {"id": 2}]))
 
     response = client.get(f"{API}/")
     assert response.status_code == 200
     assert response.json() == [{"id": 1}, {"id": 2}]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_list_all_records_next_cursor(monkeypatch):
+    """Página completa retorna o cursor da próxima página no header"""
+    received = {}
+
+    def mock_list_all(self, **kwargs):
+        received.update(kwargs)
+        return [
+            {"id": 1, "started_at": "2025-01-01T10:00:00+00:00"},
+            {"id": 2, "started_at": "2025-01-01T11:00:00+00:00"},
+        ]
+
+    monkeypatch.setattr(MedicalRecordService, "list_all", as_async(mock_list_all))
+
+    response = client.get(f"{API}/?limit=2&fields=patient_id,started_at")
+    assert response.status_code == 200
+    assert received["limit"] == 2
+    assert received["cursor"] is None
+    assert received["fields"] == "patient_id,started_at"
+    assert decode_cursor(response.headers["X-Next-Cursor"]) == ("2025-01-01T11:00:00+00:00", 2)
+
+
+def test_list_all_records_invalid_fields():
+    """Campos desconhecidos retornam 400"""
+    response = client.get(f"{API}/?fields=id,senha")
+    assert response.status_code == 400
+    assert "senha" in response.json()["detail"]
+
+
+def test_list_all_records_limit_bounded():
+    """Limite acima do máximo configurado é rejeitado"""
+    response = client.get(f"{API}/?limit=100000")
+    assert response.status_code == 422
+
+
+def test_cursor_and_fields_helpers():
+    """Cursor é reversível e a projeção sempre inclui id e coluna de ordenação"""
+    cursor = encode_cursor("2025-01-01T10:00:00+00:00", 7)
+    assert decode_cursor(cursor) == ("2025-01-01T10:00:00+00:00", 7)
+    assert parse_fields("patient_id", RECORD_COLUMNS, "started_at") == "id,started_at,patient_id"
+    assert parse_fields(None, RECORD_COLUMNS, "started_at") == "*"
+
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-um-cursor")
 
 # -------------------------------------
 # GET /records/me
@@ -33,7 +82,7 @@ def test_list_my_records_success(monkeypatch):
     monkeypatch.setattr(
         MedicalRecordService,
         "list_by_profile",
-        lambda self, uid: [{"rec": "r1", "user": uid}]
+        as_async(lambda self, uid: [{"rec": "r1", "user": uid}])
     )
 
     response = client.get(f"{API}/me")
@@ -47,7 +96,7 @@ def test_list_records_by_patient_success(monkeypatch):
     monkeypatch.setattr(
         MedicalRecordService,
         "list_by_profile",
-        lambda self, pid: [{"rec": "abc", "user": pid}]
+        as_async(lambda self, pid: [{"rec": "abc", "user": pid}])
     )
 
     response = client.get(f"{API}/by_patient/p123")
@@ -58,7 +107,7 @@ def test_list_records_by_patient_error(monkeypatch):
     def raise_exc(self, pid):
         raise Exception("Erro ao buscar paciente")
 
-    monkeypatch.setattr(MedicalRecordService, "list_by_profile", raise_exc)
+    monkeypatch.setattr(MedicalRecordService, "list_by_profile", as_async(raise_exc))
 
     response = client.get(f"{API}/by_patient/p123")
     assert response.status_code == 500
@@ -71,7 +120,7 @@ def test_get_record_success(monkeypatch):
     monkeypatch.setattr(
         MedicalRecordService,
         "get_by_id",
-        lambda self, rid: {"id": rid, "ok": True}
+        as_async(lambda self, rid: {"id": rid, "ok": True})
     )
 
     response = client.get(f"{API}/abc123")
@@ -83,9 +132,223 @@ def test_get_record_not_found(monkeypatch):
     monkeypatch.setattr(
         MedicalRecordService,
         "get_by_id",
-        lambda self, rid: None
+        as_async(lambda self, rid: None)
     )
 
     response = client.get(f"{API}/abc123")
     assert response.status_code == 404
     assert response.json()["detail"] == "Record not found"
+
+
+# -------------------------------------
+# GET /records/export
+# -------------------------------------
+@pytest.fixture
+def local_records(local, monkeypatch):
+    """Backend local (conftest) com 5 registros de 2 médicos"""
+    import asyncio
+
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, override_get_current_user)
+
+    table = local.table("RECORD_MEDICAL")
+    for i in range(5):
+        asyncio.run(table.insert({
+            "doctor_id": "doc-a" if i % 2 == 0 else "doc-b",
+            "patient_id": f"patient-{i}",
+            "started_at": f"2025-01-0{i + 1}T10:00:00+00:00",
+            "assessment": f"avaliação, {i}",
+        }).execute())
+
+    return local
+
+
+@pytest.fixture
+def admin(local_records):
+    """Usuário autenticado (mock_user) com papel de administrador"""
+    import asyncio
+
+    asyncio.run(local_records.table("PROFILES").insert({"id": "mock_user", "role": "admin"}).execute())
+    return local_records
+
+
+def test_export_records_requires_admin(local_records):
+    import asyncio
+
+    asyncio.run(local_records.table("PROFILES").insert({"id": "mock_user", "role": "doctor"}).execute())
+
+    assert client.get(f"{API}/export").status_code == 403
+
+
+def test_export_records_ndjson(admin, monkeypatch):
+    """NDJSON: um registro por linha, em ordem, lido em várias páginas"""
+    import json
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 2)
+    calls = admin.db.calls
+
+    response = client.get(f"{API}/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert "records.ndjson" in response.headers["content-disposition"]
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["patient_id"] for row in rows] == [f"patient-{i}" for i in range(5)]
+    assert admin.db.calls - calls == 1 + 3  # perfil do admin + 3 páginas
+
+
+def test_export_records_csv_with_filters(admin):
+    """CSV: cabeçalho com as colunas pedidas e filtros de médico e período"""
+    import csv
+    import io
+
+    response = client.get(f"{API}/export", params={
+        "format": "csv",
+        "doctor_id": "doc-a",
+        "started_from": "2025-01-02T00:00:00+00:00",
+        "started_to": "2025-01-05T10:00:00+00:00",
+        "fields": "patient_id,assessment",
+    })
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == ["id", "started_at", "patient_id", "assessment"]
+    assert [row["patient_id"] for row in rows] == ["patient-2"]
+    assert rows[0]["assessment"] == "avaliação, 2"
+
+
+def test_export_records_empty_csv_has_header(admin):
+    response = client.get(f"{API}/export", params={"format": "csv", "doctor_id": "nobody"})
+    assert response.status_code == 200
+    assert response.text.strip().split(",")[0] == "id"
+
+
+def test_export_records_invalid_params(admin):
+    assert client.get(f"{API}/export", params={"fields": "password"}).status_code == 400
+    assert client.get(f"{API}/export", params={"format": "xml"}).status_code == 422
+
+
+def test_list_all_records_filters(local_records):
+    """Filtros de médico, paciente, período e finalização aplicados na consulta"""
+    import asyncio
+
+    asyncio.run(local_records.table("RECORD_MEDICAL").update({
+        "end_at": "2025-01-03T10:30:00+00:00",
+    }).eq("patient_id", "patient-2").execute())
+
+    def patients(**params):
+        response = client.get(f"{API}/", params=params)
+        assert response.status_code == 200
+        return [record["patient_id"] for record in response.json()]
+
+    assert patients(doctor_id="doc-b") == ["patient-1", "patient-3"]
+    assert patients(patient_id="patient-4") == ["patient-4"]
+    assert patients(
+        started_from="2025-01-02T00:00:00-03:00",
+        started_to="2025-01-04T10:00:00+00:00",
+    ) == ["patient-1", "patient-2"]
+    assert patients(finished="true") == ["patient-2"]
+    assert patients(finished="false", doctor_id="doc-a") == ["patient-0", "patient-4"]
+
+
+@pytest.fixture
+def doctor(local_records):
+    """Usuário autenticado (mock_user) com papel de médico"""
+    import asyncio
+
+    asyncio.run(local_records.table("PROFILES").insert({"id": "mock_user", "role": "doctor"}).execute())
+    return local_records
+
+
+def test_search_records_requires_doctor_or_admin(local_records):
+    import asyncio
+
+    asyncio.run(local_records.table("PROFILES").insert({"id": "mock_user", "role": "patient"}).execute())
+
+    assert client.get(f"{API}/search", params={"q": "febre"}).status_code == 403
+
+
+def test_search_records_allows_admin(admin):
+    assert client.get(f"{API}/search", params={"q": "febre"}).status_code == 200
+
+
+def test_search_records(doctor):
+    """Busca textual: resultados ranqueados, com snippet e paginação por offset"""
+    import asyncio
+
+    table = doctor.table("RECORD_MEDICAL")
+    asyncio.run(table.update({"subjective": "Febre e tosse seca"}).eq("patient_id", "patient-1").execute())
+    asyncio.run(table.update({"assessment": "Febre amarela"}).eq("patient_id", "patient-3").execute())
+
+    response = client.get(f"{API}/search", params={"q": "febre", "limit": 1})
+    assert response.status_code == 200
+    hits = response.json()
+    assert [hit["patient_id"] for hit in hits] == ["patient-3"]
+    assert "<b>Febre</b>" in hits[0]["snippet"]
+    assert response.headers["X-Next-Offset"] == "1"
+
+    response = client.get(f"{API}/search", params={"q": "febre", "offset": 1})
+    assert [hit["patient_id"] for hit in response.json()] == ["patient-1"]
+    assert "X-Next-Offset" not in response.headers
+
+    response = client.get(f"{API}/search", params={"q": "febre", "doctor_id": "doc-a"})
+    assert response.json() == []
+
+
+def test_search_records_blank_query(doctor):
+    assert client.get(f"{API}/search", params={"q": "   "}).status_code == 400
+    assert client.get(f"{API}/search").status_code == 422
+
+
+def test_patient_summary_maintained_on_write(local_records):
+    """Resumo atualizado a cada registro inserido, alterado ou removido"""
+    import asyncio
+
+    table = local_records.table("RECORD_MEDICAL")
+    asyncio.run(table.insert({
+        "doctor_id": "doc-b",
+        "patient_id": "patient-0",
+        "started_at": "2025-02-01T10:00:00+00:00",
+        "end_at": "2025-02-01T10:20:00+00:00",
+        "assessment": "Retorno",
+    }).execute())
+    asyncio.run(table.update({
+        "end_at": "2025-01-01T10:40:00+00:00",
+    }).eq("patient_id", "patient-0").eq("doctor_id", "doc-a").execute())
+
+    response = client.get(f"{API}/by_patient/patient-0/summary")
+    assert response.status_code == 200
+    summary = response.json()
+    assert summary["visit_count"] == 2
+    assert summary["first_visit_at"].startswith("2025-01-01T10:00:00")
+    assert summary["last_visit_at"].startswith("2025-02-01T10:00:00")
+    assert summary["average_duration_seconds"] == 1800
+    assert summary["last_assessment"] == "Retorno"
+
+    asyncio.run(table.delete().eq("assessment", "Retorno").execute())
+    summary = client.get(f"{API}/by_patient/patient-0/summary").json()
+    assert summary["visit_count"] == 1
+    assert summary["last_assessment"] == "avaliação, 0"
+
+
+def test_patient_summary_without_records(local_records):
+    summary = client.get(f"{API}/by_patient/unknown/summary").json()
+    assert summary["visit_count"] == 0
+    assert summary["average_duration_seconds"] is None
+
+
+def test_patient_summary_table_name_matches_migration(monkeypatch):
+    """O serviço consulta, pelo PostgREST, a tabela criada pela migração"""
+    import re
+    from pathlib import Path
+    from postgrest import AsyncPostgrestClient
+    from app.services import record_medical_service as record_module
+
+    migration = Path(__file__).parents[2] / "database" / "migrations" / "005_patient_summary.sql"
+    created = re.search(r"create table if not exists public\.(\w+)", migration.read_text()).group(1)
+
+    monkeypatch.setattr(record_module, "supabase", AsyncPostgrestClient("http://localhost:54321/rest/v1"))
+    service = MedicalRecordService()
+
+    assert str(service.summaries.path) == f"http://localhost:54321/rest/v1/{created}"
@@ -0,0 +1,205 @@
+import asyncio
+import pytest
+from app.core.shared_cache import SharedCache
+from app.services import attendance_service as attendance_module
+from app.services import profile_service as profile_module
+from app.services import queue_service as queue_module
+from app.services.attendance_service import attendance_service
+from app.services.profile_service import profile_service
+from app.services.queue_events import QueueEventBroker
+from app.services.queue_index import queue_index
+from app.services.queue_service import queue_service
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_cache():
+    return SharedCache(fakeredis.FakeAsyncRedis(decode_responses=True), prefix="teste")
+
+
+def entry(profile_id, priority=False):
+    return {"id": f"q-{profile_id}", "profile_id": profile_id, "priority": priority}
+
+
+# -----------------------------
+# SharedCache
+# -----------------------------
+def test_store_and_read_positions():
+    """Snapshot gravado é lido por posição; fora da fila retorna None"""
+    async def scenario():
+        cache = make_cache()
+        assert await cache.get_position("p1") == (False, None)
+
+        version = await cache.queue_version()
+        assert await cache.store_queue([entry("p2", True), entry("p1")], version)
+
+        assert await cache.get_position("p1") == (True, 2)
+        assert await cache.get_position("p9") == (True, None)
+        assert await cache.get_priority("p2") is True
+        assert [e["profile_id"] for e in await cache.get_ordered_waiting()] == ["p2", "p1"]
+
+        await cache.invalidate_queue()
+        assert await cache.get_position("p1") == (False, None)
+
+    run(scenario())
+
+
+def test_empty_queue_is_cached():
+    """Fila vazia também é um snapshot válido (não força releitura do banco)"""
+    async def scenario():
+        cache = make_cache()
+        await cache.store_queue([], await cache.queue_version())
+        assert await cache.get_position("p1") == (True, None)
+
+    run(scenario())
+
+
+def test_stale_snapshot_is_not_stored():
+    """Leitura feita antes de uma alteração não sobrescreve o estado novo"""
+    async def scenario():
+        cache = make_cache()
+        version = await cache.queue_version()
+
+        await cache.invalidate_queue()  # outro worker alterou a fila
+
+        assert not await cache.store_queue([entry("p1")], version)
+        assert await cache.get_position("p1") == (False, None)
+
+    run(scenario())
+
+
+# -----------------------------
+# Serviços com cache compartilhado
+# -----------------------------
+def test_calls_counted_in_window():
+    """Chamadas registradas por qualquer worker entram no ritmo; antigas são descartadas"""
+    async def scenario():
+        cache = make_cache()
+        for timestamp in (100.0, 100.0, 500.0):
+            await cache.record_call(timestamp, window_seconds=600)
+
+        assert await cache.count_calls(since=0) == 3
+        assert await cache.count_calls(since=200) == 1
+
+        await cache.record_call(800.0, window_seconds=600)
+        assert await cache.count_calls(since=0) == 2
+
+    run(scenario())
+
+
+def test_queue_events_relayed_between_workers():
+    """Evento publicado em um worker chega aos streams do outro (uma vez em cada)"""
+    async def scenario():
+        server = fakeredis.FakeServer()
+        worker_a, worker_b = QueueEventBroker(), QueueEventBroker()
+        relays = [
+            asyncio.create_task(worker.relay(SharedCache(
+                fakeredis.FakeAsyncRedis(server=server, decode_responses=True), prefix="teste"
+            )))
+            for worker in (worker_a, worker_b)
+        ]
+        await asyncio.sleep(0.05)  # inscrição no canal
+
+        events_a, events_b = worker_a.subscribe(), worker_b.subscribe()
+        worker_a.publish({"type": "checkin", "profile_id": "p1"})
+
+        received_b = await asyncio.wait_for(events_b.get(), timeout=1)
+        received_a = await asyncio.wait_for(events_a.get(), timeout=1)
+        await asyncio.sleep(0.05)
+        duplicated = not events_a.empty()
+
+        for relay in relays:
+            relay.cancel()
+        await asyncio.gather(*relays, return_exceptions=True)
+        return received_a, received_b, duplicated
+
+    received_a, received_b, duplicated = run(scenario())
+
+    assert received_a == {"type": "checkin", "profile_id": "p1"}
+    assert received_b == {"type": "checkin", "profile_id": "p1", "remote": True}
+    assert not duplicated
+
+
+@pytest.fixture
+def shared(local, monkeypatch):
+    """Serviços sobre backend local (conftest) com um cache compartilhado em memória"""
+    cache = make_cache()
+
+    for module in (queue_module, attendance_module, profile_module):
+        monkeypatch.setattr(module, "shared_cache", cache)
+
+    return local, cache
+
+
+def test_positions_shared_between_workers(shared):
+    """Snapshot calculado uma vez e reaproveitado; alterações o invalidam"""
+    client, cache = shared
+
+    async def scenario():
+        await client.table("PROFILES").insert([
+            {"id": "p1"}, {"id": "p2", "priority": True},
+        ]).execute()
+        await queue_service.checkin_queue("p1")
+        await queue_service.checkin_queue("p2")
+
+        calls = client.db.calls
+        assert await queue_service.get_position("p1") == 2
+        assert client.db.calls == calls + 1  # snapshot calculado a partir do banco
+
+        # Índice local de outro worker vazio: a leitura vem do snapshot
+        queue_index.rebuild([])
+        assert await queue_service.get_position("p2") == 1
+        assert client.db.calls == calls + 1
+
+        # Chamada de paciente invalida o snapshot de todos os workers
+        await queue_service.advance_queue("d1")
+        assert await cache.get_position("p1") == (False, None)
+        assert await queue_service.get_position("p1") == 1
+
+        current = await attendance_service.get_current_attendance("d1")
+        await queue_service.get_position("p1")
+        await attendance_service.finish_attendance("d1", "S", "O", "A", "P", current["id"])
+        assert await cache.get_position("p1") == (False, None)
+
+    run(scenario())
+
+
+def test_priority_read_from_shared_cache(shared):
+    """Prioridade gravada por um worker é lida por outro sem consultar o banco"""
+    client, cache = shared
+
+    async def scenario():
+        await client.table("PROFILES").insert({"id": "p1", "priority": True}).execute()
+
+        assert await profile_service.get_priority("p1") is True
+
+        profile_service.clear_cache()  # outro worker, sem cache local
+        calls = client.db.calls
+        assert await profile_service.get_priority("p1") is True
+        assert client.db.calls == calls
+
+    run(scenario())
+
+
+def test_import_invalidates_cached_priorities(shared):
+    """Perfil removido e importado de novo: prioridade antiga em cache descartada"""
+    client, cache = shared
+    profile_id = "00000000-0000-0000-0000-000000000001"
+
+    async def rows():
+        yield 1, {"id": profile_id, "priority": True}, None
+
+    async def scenario():
+        await cache.set_priority(profile_id, False)
+
+        report = await profile_service.import_profiles(rows())
+        assert report.imported == 1
+
+        assert await cache.get_priority(profile_id) is None
+        assert await profile_service.get_priority(profile_id) is True
+
+    run(scenario())
@@ -0,0 +1,49 @@
+from app.core.text_search import SearchIndex, tokenize
+
+
+def record(record_id, **fields):
+    return {"id": record_id, "doctor_id": "doc", "patient_id": "patient", **fields}
+
+
+def test_tokenize_normalizes_accents_and_stopwords():
+    assert tokenize("Cefaléia TENSIONAL com dor de cabeça") == ["cefaleia", "tensional", "dor", "cabeca"]
+    assert tokenize(None) == []
+
+
+def test_search_requires_all_terms_and_ranks_by_field_weight():
+    """Avaliação pesa mais que os demais campos; empate favorece o mais recente"""
+    index = SearchIndex()
+    index.add(record(1, subjective="dor de cabeça", assessment="Enxaqueca"))
+    index.add(record(2, assessment="Cefaleia tensional, dor de cabeça"))
+    index.add(record(3, planning="dor de cabeça"))
+    index.add(record(4, planning="dor de cabeça"))
+    index.add(record(5, subjective="dor lombar"))
+
+    hits = index.search("Dor de CABEÇA", limit=10)
+
+    assert [row["id"] for _, row in hits] == [2, 1, 4, 3]
+    assert [row["id"] for _, row in index.search("dor cabeca", limit=2, offset=1)] == [1, 4]
+    assert index.search("de", limit=10) == []
+
+
+def test_index_follows_updates_and_removals():
+    index = SearchIndex()
+    row = record(1, assessment="gripe")
+    index.add(row)
+
+    index.add({**row, "assessment": "sinusite"})
+    assert index.search("gripe", limit=10) == []
+    assert len(index.search("sinusite", limit=10)) == 1
+
+    index.remove(1)
+    assert index.search("sinusite", limit=10) == []
+    assert len(index) == 0
+
+
+def test_snippet_highlights_terms():
+    row = record(1, subjective="Paciente relata febre alta há dois dias", assessment="Dengue")
+
+    snippet = SearchIndex.snippet(row, "febre dengue")
+
+    assert "<b>febre</b>" in snippet
+    assert "<b>Dengue</b>" in snippet
@@ -0,0 +1,67 @@
+-- ================================================
+-- FUNCTION: claim_next_patient
+-- Chama o próximo paciente da fila de forma atômica
+-- ================================================
+-- Regras de Negócio (CRÍTICAS):
+-- 1. Um médico pode atender apenas UM paciente por vez
+-- 2. Se o médico já está atendendo, retorna o paciente atual
+-- 3. Pacientes com priority = true são chamados primeiro
+-- 4. Dentro de cada grupo, ordem é por horário de check-in (mais antigo primeiro)
+--
+-- Concorrência:
+-- - Chamadas do mesmo médico são serializadas (advisory lock por médico)
+-- - A entrada escolhida é travada com FOR UPDATE SKIP LOCKED: dois médicos
+--   chamando ao mesmo tempo nunca recebem o mesmo paciente
+--
+-- Retorno (jsonb):
+-- - null se a fila estiver vazia
+-- - {"already_attending": true,  "patient": {...}} se o médico já está atendendo
+-- - {"already_attending": false, "patient": {...}} se chamou um novo paciente
+create or replace function public.claim_next_patient(p_doctor_id uuid)
+returns jsonb
+language plpgsql
+as $$
+declare
+    v_entry public.queue;
+    v_next_id uuid;
+    v_priority boolean;
+begin
+    perform pg_advisory_xact_lock(hashtext('claim_next_patient:' || p_doctor_id::text));
+
+    -- Médico já possui atendimento ativo
+    select * into v_entry
+    from public.queue
+    where assigned_doctor_id = p_doctor_id
+      and status = 'being_attended'
+    limit 1;
+
+    if found then
+        return jsonb_build_object('already_attending', true, 'patient', to_jsonb(v_entry));
+    end if;
+
+    -- Próximo da fila: prioritários primeiro, depois por check-in
+    select q.id, coalesce(p.priority, false)
+    into v_next_id, v_priority
+    from public.queue q
+    join public.profiles p on p.id = q.profile_id
+    where q.status = 'waiting'
+    order by p.priority desc nulls last, q.checkin asc
+    limit 1
+    for update of q skip locked;
+
+    if not found then
+        return null;
+    end if;
+
+    update public.queue
+    set status = 'being_attended',
+        assigned_doctor_id = p_doctor_id
+    where id = v_next_id
+    returning * into v_entry;
+
+    return jsonb_build_object(
+        'already_attending', false,
+        'patient', to_jsonb(v_entry) || jsonb_build_object('priority', v_priority)
+    );
+end;
+$$;
@@ -0,0 +1,81 @@
+-- ================================================
+-- FUNCTION: finish_attendance
+-- Finaliza o atendimento em uma única transação
+-- ================================================
+-- Regras de Negócio (CRÍTICAS):
+-- 1. Deve existir um atendimento ativo (being_attended) para o médico
+-- 2. Cria o registro médico (SOAP) a partir da entrada da fila
+-- 3. Remove a entrada da fila na mesma transação (nunca fica entrada órfã)
+-- 4. Data de início vem do check-in, data de fim é o momento atual
+--
+-- Idempotência:
+-- - O registro guarda a entrada da fila que o originou (queue_entry_id, único)
+-- - Repetir a chamada com o mesmo p_queue_entry_id após o sucesso retorna o
+--   registro já criado, em vez de falhar ou duplicar
+--
+-- Erros:
+-- - P0002 (no_data_found): nenhum atendimento ativo encontrado
+
+alter table public.record_medical
+    add column if not exists queue_entry_id uuid;
+
+create unique index if not exists record_medical_queue_entry_id_key
+    on public.record_medical (queue_entry_id);
+
+create or replace function public.finish_attendance(
+    p_doctor_id uuid,
+    p_subjective text,
+    p_objective_data text,
+    p_assessment text,
+    p_planning text,
+    p_queue_entry_id uuid default null
+)
+returns public.record_medical
+language plpgsql
+as $$
+declare
+    v_entry public.queue;
+    v_record public.record_medical;
+begin
+    -- Trava o atendimento ativo do médico (retentativas concorrentes aguardam)
+    select * into v_entry
+    from public.queue
+    where assigned_doctor_id = p_doctor_id
+      and status = 'being_attended'
+      and (p_queue_entry_id is null or id = p_queue_entry_id)
+    limit 1
+    for update;
+
+    if not found then
+        -- Retentativa de uma finalização já concluída
+        if p_queue_entry_id is not null then
+            select * into v_record
+            from public.record_medical
+            where queue_entry_id = p_queue_entry_id
+              and doctor_id = p_doctor_id;
+
+            if found then
+                return v_record;
+            end if;
+        end if;
+
+        raise exception 'Nenhum atendimento ativo encontrado.' using errcode = 'P0002';
+    end if;
+
+    insert into public.record_medical (
+        doctor_id, patient_id, started_at, end_at,
+        subjective, objective_data, assessment, planning,
+        queue_entry_id
+    )
+    values (
+        p_doctor_id, v_entry.profile_id, v_entry.checkin, now(),
+        p_subjective, p_objective_data, p_assessment, p_planning,
+        v_entry.id
+    )
+    returning * into v_record;
+
+    delete from public.queue where id = v_entry.id;
+
+    return v_record;
+end;
+$$;
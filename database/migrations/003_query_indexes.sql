@@ -0,0 +1,28 @@
+-- ================================================
+-- INDEXES: consultas filtradas de registros e fila
+-- ================================================
+-- Objetivo: custo das consultas proporcional ao tamanho do resultado,
+-- não ao tamanho da tabela.
+--
+-- record_medical:
+-- - Listagem/exportação filtrada por paciente ou médico, ordenada e paginada
+--   por (started_at, id): o índice atende filtro, intervalo de datas,
+--   ordenação e cursor (keyset) sem ordenação em memória
+--
+-- queue:
+-- - (status, checkin): fila de espera ordenada (status = 'waiting' order by checkin)
+--   e escolha do próximo paciente (claim_next_patient)
+-- - (assigned_doctor_id, status): atendimento atual do médico
+--   (get_current_patient, finish_attendance)
+
+create index if not exists record_medical_patient_started_at_idx
+    on public.record_medical (patient_id, started_at, id);
+
+create index if not exists record_medical_doctor_started_at_idx
+    on public.record_medical (doctor_id, started_at, id);
+
+create index if not exists queue_status_checkin_idx
+    on public.queue (status, checkin);
+
+create index if not exists queue_assigned_doctor_status_idx
+    on public.queue (assigned_doctor_id, status);
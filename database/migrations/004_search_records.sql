@@ -0,0 +1,93 @@
+-- ================================================
+-- FUNCTION: search_records
+-- Busca textual nos campos SOAP dos registros médicos
+-- ================================================
+-- Regras de Negócio:
+-- 1. Busca em subjective, objective_data, assessment e planning
+-- 2. Todos os termos devem aparecer (sintaxe de busca web: "frase exata",
+--    OR e -exclusão são aceitos)
+-- 3. Ordenação por relevância (ts_rank_cd), empate pelo registro mais recente
+-- 4. Filtros opcionais por médico e por paciente
+--
+-- Desempenho:
+-- - Índice GIN de expressão sobre record_search_vector(...): a busca lê apenas
+--   os registros que contêm os termos (sem coluna extra, "select *" inalterado)
+-- - A consulta deve usar exatamente a mesma expressão para usar o índice
+-- - Pesos: assessment (A) > subjective (B) > objective_data, planning (C)
+-- - O snippet (ts_headline, custoso) é calculado só para a página retornada
+
+create or replace function public.record_search_vector(
+    p_subjective text,
+    p_objective_data text,
+    p_assessment text,
+    p_planning text
+)
+returns tsvector
+language sql
+immutable
+as $$
+    select
+        setweight(to_tsvector('portuguese'::regconfig, coalesce(p_assessment, '')), 'A') ||
+        setweight(to_tsvector('portuguese'::regconfig, coalesce(p_subjective, '')), 'B') ||
+        setweight(to_tsvector('portuguese'::regconfig, coalesce(p_objective_data, '')), 'C') ||
+        setweight(to_tsvector('portuguese'::regconfig, coalesce(p_planning, '')), 'C');
+$$;
+
+create index if not exists record_medical_search_idx
+    on public.record_medical
+    using gin (public.record_search_vector(subjective, objective_data, assessment, planning));
+
+create or replace function public.search_records(
+    p_query text,
+    p_limit integer default 20,
+    p_offset integer default 0,
+    p_doctor_id uuid default null,
+    p_patient_id uuid default null
+)
+returns table (
+    id bigint,
+    doctor_id uuid,
+    patient_id uuid,
+    started_at timestamp with time zone,
+    end_at timestamp with time zone,
+    rank real,
+    snippet text
+)
+language sql
+stable
+as $$
+    with query as (
+        select websearch_to_tsquery('portuguese', p_query) as q
+    ),
+    page as (
+        select
+            r.*,
+            ts_rank_cd(
+                public.record_search_vector(r.subjective, r.objective_data, r.assessment, r.planning),
+                query.q
+            ) as rank,
+            query.q
+        from public.record_medical r, query
+        where public.record_search_vector(r.subjective, r.objective_data, r.assessment, r.planning) @@ query.q
+          and (p_doctor_id is null or r.doctor_id = p_doctor_id)
+          and (p_patient_id is null or r.patient_id = p_patient_id)
+        order by rank desc, r.id desc
+        limit p_limit
+        offset p_offset
+    )
+    select
+        page.id,
+        page.doctor_id,
+        page.patient_id,
+        page.started_at,
+        page.end_at,
+        page.rank,
+        ts_headline(
+            'portuguese',
+            concat_ws(' ', page.subjective, page.objective_data, page.assessment, page.planning),
+            page.q,
+            'StartSel=<b>, StopSel=</b>, MaxWords=20, MinWords=8'
+        ) as snippet
+    from page
+    order by page.rank desc, page.id desc;
+$$;
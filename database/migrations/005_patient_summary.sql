@@ -0,0 +1,136 @@
+-- ================================================
+-- TABLE: patient_summary
+-- Resumo do histórico de cada paciente, mantido incrementalmente
+-- ================================================
+-- Regras de Negócio:
+-- 1. Uma linha por paciente com ao menos um registro médico
+-- 2. visit_count: quantidade de registros; first/last_visit_at: menor e maior started_at
+-- 3. Duração média: total_duration_seconds / finished_count (apenas registros com end_at)
+-- 4. last_assessment: avaliação do registro mais recente (maior started_at)
+--
+-- Manutenção:
+-- - Inserção em record_medical (ex: finish_attendance): atualização incremental
+--   da linha do paciente (custo constante, independe do histórico)
+-- - Alteração ou remoção (raras): a linha do paciente é recalculada
+-- - O backfill ao final preenche o resumo dos registros já existentes
+
+create table if not exists public.patient_summary (
+    patient_id uuid primary key references public.profiles(id) on delete cascade,
+
+    visit_count integer not null default 0,
+    finished_count integer not null default 0,
+    total_duration_seconds double precision not null default 0,
+
+    first_visit_at timestamp with time zone,
+    last_visit_at timestamp with time zone,
+
+    last_record_id bigint,
+    last_assessment text,
+
+    updated_at timestamp with time zone default now()
+);
+
+-- Recalcula o resumo de um paciente a partir de todos os seus registros
+create or replace function public.refresh_patient_summary(p_patient_id uuid)
+returns void
+language plpgsql
+as $$
+begin
+    delete from public.patient_summary where patient_id = p_patient_id;
+
+    insert into public.patient_summary (
+        patient_id, visit_count, finished_count, total_duration_seconds,
+        first_visit_at, last_visit_at, last_record_id, last_assessment
+    )
+    select
+        p_patient_id,
+        count(*),
+        count(r.end_at),
+        coalesce(sum(extract(epoch from (r.end_at - r.started_at))), 0),
+        min(r.started_at),
+        max(r.started_at),
+        (array_agg(r.id order by r.started_at desc, r.id desc))[1],
+        (array_agg(r.assessment order by r.started_at desc, r.id desc))[1]
+    from public.record_medical r
+    where r.patient_id = p_patient_id
+    having count(*) > 0;
+end;
+$$;
+
+-- Trigger: atualização incremental na inserção, recálculo nos demais casos
+create or replace function public.record_medical_summary_trigger()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        insert into public.patient_summary as s (
+            patient_id, visit_count, finished_count, total_duration_seconds,
+            first_visit_at, last_visit_at, last_record_id, last_assessment
+        )
+        values (
+            new.patient_id,
+            1,
+            case when new.end_at is null then 0 else 1 end,
+            coalesce(extract(epoch from (new.end_at - new.started_at)), 0),
+            new.started_at,
+            new.started_at,
+            new.id,
+            new.assessment
+        )
+        on conflict (patient_id) do update set
+            visit_count = s.visit_count + 1,
+            finished_count = s.finished_count + excluded.finished_count,
+            total_duration_seconds = s.total_duration_seconds + excluded.total_duration_seconds,
+            first_visit_at = least(s.first_visit_at, excluded.first_visit_at),
+            last_visit_at = greatest(s.last_visit_at, excluded.last_visit_at),
+            last_record_id = case
+                when excluded.last_visit_at >= s.last_visit_at then excluded.last_record_id
+                else s.last_record_id
+            end,
+            last_assessment = case
+                when excluded.last_visit_at >= s.last_visit_at then excluded.last_assessment
+                else s.last_assessment
+            end,
+            updated_at = now();
+
+        return new;
+    end if;
+
+    if tg_op = 'UPDATE' then
+        perform public.refresh_patient_summary(new.patient_id);
+        if new.patient_id is distinct from old.patient_id then
+            perform public.refresh_patient_summary(old.patient_id);
+        end if;
+        return new;
+    end if;
+
+    perform public.refresh_patient_summary(old.patient_id);
+    return old;
+end;
+$$;
+
+drop trigger if exists record_medical_patient_summary on public.record_medical;
+
+create trigger record_medical_patient_summary
+after insert or update or delete on public.record_medical
+for each row
+execute procedure public.record_medical_summary_trigger();
+
+-- Backfill dos registros existentes
+insert into public.patient_summary (
+    patient_id, visit_count, finished_count, total_duration_seconds,
+    first_visit_at, last_visit_at, last_record_id, last_assessment
+)
+select
+    r.patient_id,
+    count(*),
+    count(r.end_at),
+    coalesce(sum(extract(epoch from (r.end_at - r.started_at))), 0),
+    min(r.started_at),
+    max(r.started_at),
+    (array_agg(r.id order by r.started_at desc, r.id desc))[1],
+    (array_agg(r.assessment order by r.started_at desc, r.id desc))[1]
+from public.record_medical r
+group by r.patient_id
+on conflict (patient_id) do nothing;
@@ -0,0 +1,51 @@
+-- ================================================
+-- FUNCTION: archive_delete_records
+-- Remove da tabela record_medical os registros já gravados no arquivo frio
+-- ================================================
+-- Regras de Negócio:
+-- 1. Chamada pelo job de arquivamento (MedicalRecordService.archive_old_records)
+--    somente depois que os registros foram gravados e confirmados (lidos de
+--    volta) nos arquivos Parquet
+-- 2. Apenas registros finalizados (end_at preenchido) são removidos
+-- 3. O resumo do paciente (patient_summary) NÃO é recalculado: as visitas
+--    arquivadas continuam contando no histórico (visit_count, duração média,
+--    primeira visita)
+--
+-- Observação: registros médicos são permanentes (não são alterados nem
+-- removidos fora do arquivamento); um recálculo do resumo
+-- (refresh_patient_summary) considera apenas os registros não arquivados
+
+create or replace function public.archive_delete_records(p_ids bigint[])
+returns integer
+language plpgsql
+as $$
+declare
+    v_deleted integer;
+begin
+    -- Sinaliza ao trigger do resumo que a remoção é um arquivamento
+    -- (válido apenas nesta transação)
+    perform set_config('app.archiving', 'on', true);
+
+    delete from public.record_medical
+    where id = any(p_ids)
+      and end_at is not null;
+
+    get diagnostics v_deleted = row_count;
+
+    perform set_config('app.archiving', 'off', true);
+
+    return v_deleted;
+end;
+$$;
+
+-- Trigger do resumo (005_patient_summary.sql): mesma função, mas não
+-- disparado nas remoções do arquivamento (o registro continua existindo no
+-- arquivo frio). A condição vale para todas as operações; app.archiving só é
+-- ligado dentro de archive_delete_records, que apenas remove registros.
+drop trigger if exists record_medical_patient_summary on public.record_medical;
+
+create trigger record_medical_patient_summary
+after insert or update or delete on public.record_medical
+for each row
+when (coalesce(current_setting('app.archiving', true), '') <> 'on')
+execute procedure public.record_medical_summary_trigger();
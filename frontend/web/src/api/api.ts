@@ -37,9 +37,26 @@ interface CheckinQueueProps {
   assigned_doctor_id?: string | undefined;
 }
 
+export interface OrderedQueueEntry {
+  id: string;
+  checkin: string;
+  profile_id: string;
+  status: string;
+  rank: number;
+  wait_seconds: number;
+  priority: boolean;
+  patient: {
+    full_name: string | null;
+    document_number: string | null;
+    date_of_birth: string | null;
+    gender: string | null;
+  } | null;
+}
+
 export interface GetPositionQueueProps {
   position?: number;
   status?: string;
+  poll_interval_seconds?: number;
 }
 
 export interface RecordsSummaryProps {
@@ -54,6 +71,16 @@ export interface RecordsSummaryProps {
   planning: string;
 }
 
+export interface PatientSummaryProps {
+  patient_id: string;
+  visit_count: number;
+  first_visit_at: string | null;
+  last_visit_at: string | null;
+  average_duration_seconds: number | null;
+  last_record_id: number | null;
+  last_assessment: string | null;
+}
+
 export interface CallNextResponse {
   message: string;
   called: {
@@ -108,6 +135,38 @@ async function apiFetch(input: RequestInfo, init?: RequestInit): Promise<Respons
   return response;
 }
 
+/**
+ * Busca todas as páginas de uma listagem paginada por cursor.
+ * 
+ * Regras de Paginação:
+ * 1. Cada resposta traz no máximo `limit` itens
+ * 2. O header "X-Next-Cursor" indica que há uma próxima página
+ * 3. A busca termina quando o header não é enviado
+ * 
+ * @param url - URL da listagem (pode conter query string, ex: "?fields=id,role")
+ * @returns Promise com todos os itens concatenados
+ */
+async function fetchAllPages<T>(url: string): Promise<T[]> {
+  const items: T[] = [];
+  const separator = url.includes("?") ? "&" : "?";
+  let cursor: string | null = null;
+
+  do {
+    const pageUrl: string = cursor
+      ? `${url}${separator}limit=1000&cursor=${encodeURIComponent(cursor)}`
+      : `${url}${separator}limit=1000`;
+
+    const response = await apiFetch(pageUrl, {
+      method: "GET",
+    });
+
+    items.push(...((await response.json()) as T[]));
+    cursor = response.headers.get("X-Next-Cursor");
+  } while (cursor);
+
+  return items;
+}
+
 /**
  * API de Perfis de Usuários.
  * 
@@ -134,11 +193,7 @@ export const ProfilesAPI = {
    * Regra: Endpoint público, não requer autenticação
    */
   getAllProfiles: async (): Promise<ProfilesSummary[]> => {
-    const response = await apiFetch(`${config.baseUrl}/profiles/`, {
-      method: "GET",
-    });
-
-    return (await response.json()) as ProfilesSummary[];
+    return fetchAllPages<ProfilesSummary>(`${config.baseUrl}/profiles/`);
   },
 
   /**
@@ -163,8 +218,10 @@ export const ProfilesAPI = {
  * - checkIn: Paciente entra na fila (requer autenticação)
  * - cancel: Paciente cancela check-in (requer autenticação)
  * - getMyPosition: Retorna posição considerando priorização (requer autenticação)
+ * - subscribePosition: Recebe a posição por SSE a cada alteração da fila (requer autenticação)
  * - callNext: Médico chama próximo paciente (requer autenticação de médico)
  * - getAllQueue: Lista toda a fila (público)
+ * - getOrderedQueue: Fila de espera ordenada, com posição e resumo do paciente (requer autenticação)
  */
 export const QueueAPI = {
   /**
@@ -179,6 +236,19 @@ export const QueueAPI = {
     return (await response.json()) as CheckinQueueProps[];
   },
 
+  /**
+   * Lista a fila de espera já ordenada (prioritários primeiro, depois por check-in).
+   * Regra: Cada entrada traz rank, tempo de espera e resumo do perfil do paciente,
+   * dispensando a busca de perfis e a ordenação no cliente
+   */
+  getOrderedQueue: async (): Promise<OrderedQueueEntry[]> => {
+    const response = await apiFetch(`${config.baseUrl}/queue/ordered`, {
+      method: "GET",
+    });
+
+    return (await response.json()) as OrderedQueueEntry[];
+  },
+
   /**
    * Realiza check-in do paciente na fila.
    * Regra: Requer autenticação, registra paciente com status "waiting"
@@ -213,6 +283,25 @@ export const QueueAPI = {
     return response.json() as GetPositionQueueProps;
   },
 
+  /**
+   * Acompanha a posição do paciente via Server-Sent Events (/queue/stream).
+   * Regra: EventSource não envia headers, então o token JWT vai no parâmetro
+   * access_token; o navegador reconecta automaticamente se a conexão cair
+   *
+   * @param onPosition - Chamado na conexão e sempre que a posição mudar
+   * @returns EventSource aberto (o chamador deve fechá-lo com close())
+   */
+  subscribePosition: (onPosition: (position: GetPositionQueueProps) => void): EventSource => {
+    const token = localStorage.getItem("access_token") ?? "";
+    const source = new EventSource(`${config.baseUrl}/queue/stream?access_token=${encodeURIComponent(token)}`);
+
+    source.addEventListener("position", (event: MessageEvent<string>) => {
+      onPosition(JSON.parse(event.data) as GetPositionQueueProps);
+    });
+
+    return source;
+  },
+
   /**
    * Médico chama próximo paciente da fila.
    * Regra: Requer autenticação de médico, aplica priorização
@@ -245,12 +334,12 @@ export const RecordsAPI = {
   /**
    * Lista todos os registros médicos do sistema.
    * Regra: Endpoint público, utilizado por admin
+   * 
+   * @param fields - Colunas desejadas (ex: "patient_id,started_at"); omite os campos SOAP
    */
-  getAllRecords: async (): Promise<RecordsSummaryProps[]> => {
-    const response = await apiFetch(`${config.baseUrl}/records/`, {
-      method: "GET",
-    });
-    return (await response.json()) as RecordsSummaryProps[];
+  getAllRecords: async (fields?: string): Promise<RecordsSummaryProps[]> => {
+    const query = fields ? `?fields=${encodeURIComponent(fields)}` : "";
+    return fetchAllPages<RecordsSummaryProps>(`${config.baseUrl}/records/${query}`);
   },
 
   /**
@@ -277,6 +366,18 @@ export const RecordsAPI = {
     return (await response.json()) as RecordsSummaryProps[];
   },
 
+  /**
+   * Resumo do histórico de um paciente (atendimentos, última visita, duração média).
+   * Regra: Endpoint público; não transfere o histórico completo
+   */
+  getPatientSummary: async (patientId: string): Promise<PatientSummaryProps> => {
+    const response = await apiFetch(`${config.baseUrl}/records/by_patient/${patientId}/summary`, {
+      method: "GET",
+    });
+
+    return (await response.json()) as PatientSummaryProps;
+  },
+
   /**
    * Busca um registro médico específico por ID.
    * Regra: Endpoint público, retorna detalhes completos incluindo dados SOAP
@@ -310,6 +411,7 @@ export const AttendanceAPI = {
    * - Todos os campos SOAP são obrigatórios
    * - Cria registro permanente no banco de dados
    * - Remove paciente da fila após criar registro
+   * - Com queue_entry_id, repetir a chamada retorna o registro já criado
    * 
    * @param payload - Dados do atendimento em formato SOAP
    * @returns Registro médico criado
@@ -319,6 +421,7 @@ export const AttendanceAPI = {
     objective_data: string;   // SOAP: Dados objetivos
     assessment: string;       // SOAP: Avaliação e diagnóstico
     planning: string;         // SOAP: Plano de tratamento
+    queue_entry_id?: string;  // Entrada da fila em atendimento (retentativa idempotente)
   }): Promise<RecordsSummaryProps> => {
     const response = await apiFetch(`${config.baseUrl}/attendance/finish`, {
       method: "POST",
@@ -119,7 +119,10 @@ export const AttendanceContent = () => {
       assessment: string;
       planning: string;
     }) => {
-      return AttendanceAPI.finish(data);
+      return AttendanceAPI.finish({
+        ...data,
+        queue_entry_id: attendanceId ?? undefined,
+      });
     },
 
     onSuccess: () => {
@@ -31,9 +31,16 @@ export const DoctorDashboard = () => {
     refetchInterval: 10000,
   });
 
+  const {data: orderedQueue} = useQuery({
+    queryKey: ["ordered-queue"],
+    queryFn: QueueAPI.getOrderedQueue,
+    refetchInterval: 10000,
+  });
+
   const {data: allRecords} = useQuery({
     queryKey: ["all-records"],
-    queryFn: RecordsAPI.getAllRecords,
+    // Apenas as colunas usadas no painel (sem os campos SOAP)
+    queryFn: () => RecordsAPI.getAllRecords("id,patient_id,doctor_id,started_at,end_at"),
     refetchInterval: 10000,
   });
 
@@ -164,7 +171,7 @@ export const DoctorDashboard = () => {
                   </Button>
                 </div>
 
-                <CardQueue queue={patientsWaiting} profiles={patients} />
+                <CardQueue queue={orderedQueue ?? []} />
               </div>
             )}
       </div>
@@ -1,3 +1,4 @@
+import {useEffect, useState} from "react";
 import {useMutation, useQuery, useQueryClient} from "@tanstack/react-query";
 import {toast} from "sonner";
 
@@ -11,7 +12,9 @@ import {Spinner} from "@/components/ui/spinner";
  * Regras de Negócio Implementadas:
  * 1. Paciente pode fazer check-in apenas se não estiver na fila
  * 2. Paciente pode cancelar check-in apenas se estiver aguardando
- * 3. Posição na fila é atualizada automaticamente a cada 10 segundos
+ * 3. Posição na fila é recebida via stream (SSE) a cada alteração da fila; se o
+ *    stream cair, volta ao polling no intervalo sugerido pelo backend
+ *    (frequente perto do início da fila, raro no fim)
  * 4. Status da fila: "not_in_queue", "waiting", "called"
  * 
  * Estados da Fila:
@@ -21,10 +24,33 @@ import {Spinner} from "@/components/ui/spinner";
  */
 export const CheckinSection = () => {
   const queryClient = useQueryClient();
+  const [streaming, setStreaming] = useState(false);
+
+  /**
+   * Assina o stream da fila enquanto o componente estiver montado
+   * Cada evento "position" substitui a posição em cache, sem nova requisição
+   */
+  useEffect(() => {
+    const source = QueueAPI.subscribePosition((position) => {
+      queryClient.setQueryData(["my-queue-position"], position);
+    });
+
+    source.onopen = () => {
+      setStreaming(true);
+    };
+    source.onerror = () => {
+      setStreaming(false);
+    };
+
+    return () => {
+      source.close();
+    };
+  }, [queryClient]);
 
   /**
    * Consulta a posição do paciente na fila
-   * Atualiza automaticamente a cada 10 segundos para manter informação atualizada
+   * Com o stream conectado, não há polling; sem ele, atualiza no intervalo
+   * sugerido pelo backend (poll_interval_seconds) ou, sem sugestão, a cada 10 segundos
    * Considera priorização: pacientes prioritários aparecem primeiro
    */
   const {
@@ -32,7 +58,9 @@ export const CheckinSection = () => {
   } = useQuery({
     queryKey: ["my-queue-position"],
     queryFn: QueueAPI.getMyPosition,
-    refetchInterval: 10000, // Atualiza a cada 10 segundos
+    refetchInterval: (query) => streaming
+      ? false
+      : (query.state.data?.poll_interval_seconds ?? 10) * 1000,
   });
 
   /**
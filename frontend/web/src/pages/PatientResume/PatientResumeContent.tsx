@@ -5,11 +5,11 @@ import {useNavigate, useParams} from "react-router";
 import {RecordsList} from "./components/RecordList";
 import {CardInfoPatient} from "../../components/custom/CardInfoPatient";
 
-import {ProfilesAPI} from "@/api/api";
+import {ProfilesAPI, RecordsAPI} from "@/api/api";
 import {Button} from "@/components/ui/button";
 import {Spinner} from "@/components/ui/spinner";
 import {Tabs, TabsContent, TabsList, TabsTrigger} from "@/components/ui/tabs";
-import {formatCPF} from "@/utils/functions";
+import {formatCPF, formatDateTime} from "@/utils/functions";
 import routes from "@/utils/routes";
 
 export const PatientResumeContent = () => {
@@ -22,6 +22,12 @@ export const PatientResumeContent = () => {
     enabled: !!patientId,
   });
 
+  const {data: summary} = useQuery({
+    queryKey: ["patient-summary", patientId],
+    queryFn: () => RecordsAPI.getPatientSummary(patientId ?? ""),
+    enabled: !!patientId,
+  });
+
   return (
     <div className="px-6 w-full flex justify-center mt-7 lg:items-center">
       <div className="w-full max-w-[369px] flex flex-col items-start lg:max-w-[954px]">
@@ -56,6 +62,15 @@ export const PatientResumeContent = () => {
                       {" "}
                       {formatCPF(patient?.document_number ?? "")}
                     </span>
+                    {summary && summary.visit_count > 0 && (
+                      <span className="text-sm text-gray-500">
+                        {summary.visit_count}
+                        {" "}
+                        {summary.visit_count === 1 ? "atendimento" : "atendimentos"}
+                        {summary.last_visit_at && ` · Última visita: ${formatDateTime(summary.last_visit_at)}`}
+                        {summary.last_assessment && ` · ${summary.last_assessment}`}
+                      </span>
+                    )}
                   </div>
                 </div>
 